@@ -0,0 +1,91 @@
+"""
+Compare parse time of the supported feed formats.
+
+The same synthetic feeds are written as a JSON array, NDJSON, CSV and (when
+pyarrow is installed) Parquet, then read with JsonDataReader.read, both in
+full and for a single week, to show the cost of each format and how much
+date pruning saves.
+
+Usage:
+    python -m benchmarks.bench_formats --scale 1000x90 --repeat 3
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_suite import generate_feeds, parse_scale
+from src.data_reader import JsonDataReader
+
+EXTENSIONS = {"json": "json", "ndjson": "jsonl", "csv": "csv", "parquet": "parquet"}
+
+
+def write_format(df: pd.DataFrame, path: str, fmt: str):
+    """Write a feed frame in one of the supported formats."""
+    if fmt == "json":
+        df.to_json(path, orient="records", date_format="iso")
+    elif fmt == "ndjson":
+        df.to_json(path, orient="records", lines=True, date_format="iso")
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False, row_group_size=50_000)
+
+
+def best_of(repeat: int, func) -> float:
+    """Best wall time of `func()` over `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=parse_scale, default=(1000, 90))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    formats = ["json", "ndjson", "csv"]
+    try:
+        import pyarrow  # noqa: F401
+
+        formats.append("parquet")
+    except ImportError:
+        print("pyarrow is not installed; skipping Parquet")
+
+    logging.disable(logging.INFO)
+    campaigns, days = args.scale
+    reader = JsonDataReader()
+    with tempfile.TemporaryDirectory() as tmp:
+        spend_json, conv_json = generate_feeds(tmp, campaigns, days)
+        feeds = {"spend": pd.read_json(spend_json), "conv": pd.read_json(conv_json)}
+        dates = sorted(feeds["spend"]["date"].dt.strftime("%Y-%m-%d").unique())
+        week = (dates[len(dates) // 2], dates[min(len(dates) // 2 + 6, len(dates) - 1)])
+
+        print(f"{'format':>8} {'MiB':>8} {'full s':>8} {'week s':>8} {'rows':>10}")
+        for fmt in formats:
+            paths = {}
+            for side, df in feeds.items():
+                paths[side] = os.path.join(tmp, f"{side}.{EXTENSIONS[fmt]}")
+                write_format(df, paths[side], fmt)
+            size = sum(os.path.getsize(p) for p in paths.values()) / 2**20
+            rows = len(reader.read(paths["spend"], paths["conv"]))
+            full_s = best_of(
+                args.repeat, lambda: reader.read(paths["spend"], paths["conv"])
+            )
+            week_s = best_of(
+                args.repeat,
+                lambda: reader.read(paths["spend"], paths["conv"], *week),
+            )
+            print(f"{fmt:>8} {size:>8.1f} {full_s:>8.3f} {week_s:>8.3f} {rows:>10}")
+
+
+if __name__ == "__main__":
+    main()
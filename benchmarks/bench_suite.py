@@ -0,0 +1,308 @@
+"""
+Time the reader, calculator, repository and full run on synthetic feeds.
+
+For each scale (CAMPAIGNSxDAYS) a seeded generator writes fb_spend.json and
+network_conv.json, then JsonDataReader.read, CpaCalculator.process,
+SqliteRepository.upsert and run.main are each timed separately against a
+throwaway SQLite database. The best of --repeat runs is kept. Results are
+written as JSON and compared with the committed baseline
+(benchmarks/baseline.json, or --baseline): any step slower than the baseline
+by more than --tolerance, or missing from it, fails the run with exit code 1.
+
+Usage:
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --update-baseline  # record a new baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import JsonDataReader
+from src.db_repository import SqliteRepository
+
+# Results of the default scales on the reference machine, kept in the repo
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def generate_feeds(
+    out_dir: str,
+    campaigns: int,
+    days: int,
+    overlap: float = 0.8,
+    skew: float = 1.0,
+    seed: int = 42,
+    start: str = "2025-01-01",
+) -> Tuple[str, str]:
+    """
+    Write synthetic spend and conversion feeds in the production JSON layout.
+
+    Args:
+        out_dir (str): Directory for fb_spend.json and network_conv.json.
+        campaigns (int): Number of campaigns.
+        days (int): Number of consecutive days starting at `start`.
+        overlap (float, optional): Share of (date, campaign) keys present in
+                                   both feeds; the rest is split evenly
+                                   between spend-only and conversion-only keys.
+        skew (float, optional): Zipf exponent of campaign size; 0 makes all
+                                campaigns the same size.
+        seed (int, optional): Random seed. Defaults to 42.
+        start (str, optional): First date. Defaults to "2025-01-01".
+
+    Returns:
+        Tuple[str, str]: Paths of the spend and conversion files.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days).strftime("%Y-%m-%d")
+    keys = pd.MultiIndex.from_product(
+        [dates, [f"CAMP-{i}" for i in range(campaigns)]],
+        names=["date", "campaign_id"],
+    ).to_frame(index=False)
+
+    # Campaign i is (i + 1) ** -skew times the size of the largest one
+    scale = np.tile(np.arange(1, campaigns + 1, dtype=float) ** -skew, days)
+    side = rng.random(len(keys))
+    only = (1 - overlap) / 2
+    has_spend = side >= only
+    has_conv = (side < only) | (side >= 2 * only)
+
+    spend = keys[has_spend].assign(
+        spend=np.round(rng.gamma(2.0, 50.0, len(keys)) * scale, 2)[has_spend]
+    )
+    conv = keys[has_conv].assign(
+        conversions=rng.poisson(np.maximum(10 * scale, 0.01))[has_conv]
+    )
+
+    spend_path = os.path.join(out_dir, "fb_spend.json")
+    conv_path = os.path.join(out_dir, "network_conv.json")
+    spend.to_json(spend_path, orient="records")
+    conv.to_json(conv_path, orient="records")
+    return spend_path, conv_path
+
+
+def best_of(repeat: int, setup: Callable, func: Callable) -> float:
+    """Best wall time of `func(setup())` over `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_main(spend_path: str, conv_path: str, db_url: str, dates: List[str]):
+    """Run the full CLI flow once with output suppressed."""
+    import run
+
+    env = {"DB_URL": db_url, "SPEND_PATH": spend_path, "CONV_PATH": conv_path}
+    saved_env = {key: os.environ.get(key) for key in env}
+    saved_argv = sys.argv
+    os.environ.update(env)
+    sys.argv = ["run.py", "--start-date", dates[0], "--end-date", dates[-1]]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run.main()
+    except SystemExit as e:
+        raise RuntimeError("run.main failed; see app.log") from e
+    finally:
+        sys.argv = saved_argv
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def bench_scale(
+    campaigns: int, days: int, repeat: int, overlap: float, skew: float, seed: int
+) -> Dict[str, dict]:
+    """Time each step at one scale; return results keyed by step name."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        spend_path, conv_path = generate_feeds(
+            tmp, campaigns, days, overlap=overlap, skew=skew, seed=seed
+        )
+        reader = JsonDataReader()
+        merged = reader.read(spend_path, conv_path)
+        computed = CpaCalculator().process(merged.copy())
+        dates = sorted(merged["date"].dt.strftime("%Y-%m-%d").unique())
+        rows = len(merged)
+
+        def fresh_db() -> str:
+            fd, path = tempfile.mkstemp(suffix=".db", dir=tmp)
+            os.close(fd)
+            os.remove(path)
+            return f"sqlite:///{path}"
+
+        steps = {
+            "read": (
+                lambda: None,
+                lambda _: reader.read(spend_path, conv_path),
+            ),
+            "process": (
+                lambda: merged.copy(),
+                lambda df: CpaCalculator().process(df),
+            ),
+            "upsert": (
+                lambda: SqliteRepository(create_engine(fresh_db())),
+                lambda repository: repository.upsert(computed),
+            ),
+            "run": (
+                fresh_db,
+                lambda db_url: run_main(spend_path, conv_path, db_url, dates),
+            ),
+        }
+        for step, (setup, func) in steps.items():
+            seconds = best_of(repeat, setup, func)
+            results[f"{step}/{campaigns}x{days}"] = {
+                "seconds": seconds,
+                "rows": rows,
+                "rows_per_sec": rows / seconds if seconds else None,
+            }
+    return results
+
+
+def find_regressions(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    tolerance: float,
+    min_delta: float = 0.005,
+) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Args:
+        results: Current results keyed by benchmark name.
+        baseline: Baseline results keyed by benchmark name.
+        tolerance: Allowed slowdown, e.g. 0.25 for 25%.
+        min_delta: Slowdowns below this many seconds are treated as noise.
+
+    Returns:
+        List[str]: One message per benchmark slower than allowed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limit = max(
+            baseline[name]["seconds"] * (1 + tolerance),
+            baseline[name]["seconds"] + min_delta,
+        )
+        if result["seconds"] > limit:
+            regressions.append(
+                f"{name}: {result['seconds']:.3f}s > {limit:.3f}s "
+                f"(baseline {baseline[name]['seconds']:.3f}s + {tolerance:.0%})"
+            )
+    return regressions
+
+
+def parse_scale(value: str) -> Tuple[int, int]:
+    """Parse CAMPAIGNSxDAYS."""
+    try:
+        campaigns, days = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid scale: '{value}'. Expected CAMPAIGNSxDAYS, e.g. 1000x30."
+        )
+    return campaigns, days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scales", type=parse_scale, nargs="+", default=[(100, 30), (1000, 90)]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--overlap", type=float, default=0.8)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="Fail if slower than this results file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-baseline", action="store_true", help="Skip the regression check"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to the baseline file instead of checking them",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    check = not (args.no_baseline or args.update_baseline)
+    if check and not os.path.exists(args.baseline):
+        # Checked before timing anything, so a missing baseline fails fast
+        parser.exit(
+            1,
+            f"No benchmark baseline at {args.baseline}. Record one with "
+            "--update-baseline, or pass --no-baseline to only measure.\n",
+        )
+
+    # Progress logging would dominate the timings of small scales
+    logging.disable(logging.INFO)
+
+    results: Dict[str, dict] = {}
+    for campaigns, days in args.scales:
+        results.update(
+            bench_scale(
+                campaigns, days, args.repeat, args.overlap, args.skew, args.seed
+            )
+        )
+
+    print(f"{'benchmark':>22} {'rows':>10} {'seconds':>10} {'rows/s':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:>22} {result['rows']:>10} {result['seconds']:>10.3f} "
+            f"{result['rows_per_sec']:>12,.0f}"
+        )
+
+    if args.update_baseline:
+        args.output = args.baseline
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "params": {
+                "repeat": args.repeat,
+                "overlap": args.overlap,
+                "skew": args.skew,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if check:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        missing = [name for name in results if name not in baseline]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name in missing:
+            print(f"NO BASELINE {name}: record it with --update-baseline")
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if missing or regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,34 @@
+from __future__ import annotations
+
 import argparse
 import logging
 import os
+import signal
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from dotenv import load_dotenv
 
-import pandas as pd
-from sqlalchemy import create_engine
+# pandas, SQLAlchemy, APScheduler and the src modules that use them are
+# imported where needed, so `--help` and argument errors return at once
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.summary import SummaryStats
 
-from src.data_reader import JsonDataReader
-from src.cpa_calculator import CpaCalculator
-from src.db_repository import PostgresRepository
-from src.scheduler import Scheduler
+# Metric names accepted by --kpis; must match src.cpa_calculator.RATIOS
+KPI_NAMES = ("cpa", "cpc", "cvr", "roas")
 
 # Configure logging
 logger = logging.getLogger()
@@ -43,6 +59,18 @@ def validate_date(date_str: str) -> str:
         )
 
 
+def validate_kpis(kpis: str) -> Tuple[str, ...]:
+    """Ensure every name in a comma-separated metric list is known."""
+    names = tuple(name.strip().lower() for name in kpis.split(",") if name.strip())
+    unknown = [name for name in names if name not in KPI_NAMES]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError(
+            f"Invalid metrics: '{kpis}'. Expected a comma-separated list of "
+            f"{', '.join(KPI_NAMES)}."
+        )
+    return names
+
+
 def parse_arguments():
     """Parse and return validated command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -51,109 +79,694 @@ def parse_arguments():
     parser.add_argument(
         "--start-date",
         type=validate_date,
-        help="Start date (YYYY-MM-DD)",
-        required=True,
+        help="Start date (YYYY-MM-DD). On the daily schedule, where the first "
+        "catch-up starts when no date has been processed yet (default: yesterday)",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=validate_date,
+        help="End date (YYYY-MM-DD). On the daily schedule, the last date ever "
+        "processed (default: none)",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read feeds in bounded memory, one date partition at a time",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Records parsed per chunk in streaming mode (default: 100000)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge on integer key codes and keep campaign IDs categorical "
+        "and conversions as int32 until the database write",
+    )
+
+    parser.add_argument(
+        "--kpis",
+        type=validate_kpis,
+        default=("cpa",),
+        help="Comma-separated metrics to calculate and store, from "
+        f"{', '.join(KPI_NAMES)} (default: cpa)",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("FEED_CACHE_DIR", ".feed_cache"),
+        help="Directory of the parsed-feed cache (default: $FEED_CACHE_DIR "
+        "or .feed_cache)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="Size cap of the feed cache; least recently used entries are "
+        "evicted (default: 1024)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse the feeds without reading or writing the feed cache",
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="Re-parse the feeds and overwrite their cache entry",
+    )
+
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Write through COPY into a staging table instead of INSERT ... VALUES",
+    )
+
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only write rows that are new or whose values changed, and "
+        "report inserted, updated and unchanged counts",
+    )
+    parser.add_argument(
+        "--spool-dir",
+        default=os.getenv("SPOOL_DIR"),
+        help="Write behind: append computed partitions to a durable local spool "
+        "and replay it to the database in the background (default: $SPOOL_DIR)",
+    )
+    parser.add_argument(
+        "--spool-drain-seconds",
+        type=float,
+        default=30.0,
+        help="How long a spooled run waits at exit for the replay to finish "
+        "(default: 30); the rest is replayed by a later run",
+    )
+
+    parser.add_argument(
+        "--partition-by-month",
+        action="store_true",
+        help="Keep daily_stats range-partitioned by month (PostgreSQL only)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap reading, CPA computation and DB writes using worker threads",
+    )
+    parser.add_argument(
+        "--compute-workers",
+        type=int,
+        default=1,
+        help="CPA computation threads in pipeline mode (default: 1)",
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=4,
+        help="DB writer threads in pipeline mode (default: 4)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=4,
+        help="Partitions buffered between pipeline stages (default: 4)",
+    )
+
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Process shards of the range on worker processes, claiming "
+        "dates through leases so several instances can share the work",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes in backfill mode (default: CPU count)",
+    )
+    parser.add_argument(
+        "--shard-days",
+        type=int,
+        help="Dates per backfill shard (default: range split evenly across workers)",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=120,
+        help="Backfill lease duration; abandoned dates are retried after it "
+        "expires (default: 120)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Run continuously instead of daily: tail records appended to the "
+        "NDJSON feeds and upsert the keys they touch in micro-batches",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks of the feeds in watch mode (default: 1)",
+    )
+    parser.add_argument(
+        "--flush-rows",
+        type=int,
+        default=10_000,
+        help="Pending (date, campaign_id) keys that trigger a write in watch "
+        "mode (default: 10000)",
+    )
+    parser.add_argument(
+        "--flush-seconds",
+        type=float,
+        default=60.0,
+        help="Longest a changed key waits for its write in watch mode (default: 60)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Write cProfile and tracemalloc snapshots of this run to DIR",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        default=os.getenv("METRICS_TEXTFILE"),
+        help="Write Prometheus metrics to PATH after the run "
+        "(default: $METRICS_TEXTFILE)",
     )
+
     parser.add_argument(
-        "--end-date", type=validate_date, help="End date (YYYY-MM-DD)", required=True
+        "--misfire-grace-seconds",
+        type=int,
+        default=3600,
+        help="How late a scheduled run may still start; missed runs are "
+        "coalesced into one (default: 3600)",
+    )
+    parser.add_argument(
+        "--jitter-seconds",
+        type=int,
+        default=300,
+        help="Random delay of up to this many seconds per scheduled run, so "
+        "replicas do not start at once (default: 300)",
     )
 
     args = parser.parse_args()
 
     # Optional: Ensure start_date <= end_date
-    if args.start_date > args.end_date:
+    if args.start_date and args.end_date and args.start_date > args.end_date:
         parser.error("Start date must be earlier than or equal to end date.")
+    if args.spool_dir and args.backfill:
+        parser.error("--spool-dir cannot be combined with --backfill.")
+    if args.watch and args.backfill:
+        parser.error("--watch cannot be combined with --backfill.")
 
     return args
 
 
-def print_summary(records: int, cpa_values: List[float]) -> None:
+def format_cpa(value: Optional[float]) -> str:
+    """Format an optional CPA for display."""
+    return f"{value:.2f}" if value is not None else "N/A"
+
+
+def print_summary(
+    records: int,
+    stats: Union[SummaryStats, Iterable[float]],
+    top_campaigns: int = 10,
+) -> None:
     """
-    Print and log a summary of processed records and average CPA.
+    Print and log a summary of processed records and CPA statistics.
 
     Args:
         records: Total number of processed records.
-        cpa_values: List of CPA values (excluding None/NaN).
+        stats: Streaming summary of the run, or bare CPA values
+               (excluding None/NaN).
+        top_campaigns: Campaigns listed in the per-campaign breakdown,
+                       highest spend first.
     """
+    from src.summary import SummaryStats
+
+    if not isinstance(stats, SummaryStats):
+        stats = SummaryStats.from_values(stats)
+
+    lines = []
     if records > 0:
-        avg_cpa: Optional[float] = (
-            sum(cpa_values) / len(cpa_values) if cpa_values else None
+        lines.append(
+            f"Summary: Processed {records} records, "
+            f"Average CPA: {format_cpa(stats.average_cpa)}"
         )
-        cpa_display = f"{avg_cpa:.2f}" if avg_cpa is not None else "N/A"
-        summary = f"Summary: Processed {records} records, Average CPA: {cpa_display}"
+        if stats.cpa_count:
+            p50, p95, p99 = stats.percentiles().values()
+            lines.append(
+                f"CPA min/p50/p95/p99/max: {format_cpa(stats.cpa_min)}"
+                f"/{format_cpa(p50)}/{format_cpa(p95)}/{format_cpa(p99)}"
+                f"/{format_cpa(stats.cpa_max)}"
+            )
+        if stats.conversions:
+            lines.append(
+                f"Overall CPA (spend / conversions): {format_cpa(stats.overall_cpa)}"
+            )
+        for campaign_id, count, spend, conversions in stats.top_campaigns(
+            top_campaigns
+        ):
+            cpa = spend / conversions if spend and conversions else None
+            lines.append(
+                f"  {campaign_id}: {count} records, spend {spend:.2f}, "
+                f"conversions {conversions:g}, CPA {format_cpa(cpa)}"
+            )
+        hidden = len(stats.campaigns) - top_campaigns
+        if hidden > 0:
+            lines.append(f"  ... and {hidden} more campaigns")
     else:
-        summary = "Summary: No records processed."
+        lines.append("Summary: No records processed.")
+
+    for line in lines:
+        print(line)
+        logging.info(line)
 
-    print(summary)
-    logging.info(summary)
 
+def select_changed_partitions(
+    partitions: Iterator[Tuple[str, pd.DataFrame]],
+    fingerprints: Dict[str, Optional[str]],
+    start_date: str,
+    end_date: str,
+    found: Optional[List[str]] = None,
+    metrics: Tuple[str, ...] = ("cpa",),
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Yield the date partitions whose input or metrics changed since they were stored.
 
-def main():
+    Args:
+        partitions: (date string, merged partition) pairs in date order.
+        fingerprints: Stored fingerprints keyed by date string.
+        start_date: First date of the run (YYYY-MM-DD).
+        end_date: Last date of the run (YYYY-MM-DD).
+        found: If given, every date that has data is appended to it.
+        metrics: Metrics the run calculates; a date stored without one of
+                 them is reprocessed.
+
+    Yields:
+        Tuple[str, pd.DataFrame]: Partitions that need to be (re)processed.
+    """
+    from src.data_reader import align_to_dates, partition_fingerprint
+
+    for date_str, df in align_to_dates(partitions, start_date, end_date):
+        if df is None or df.empty:
+            logging.info(f"No data found for {date_str}.")
+            continue
+        if found is not None:
+            found.append(date_str)
+
+        # Only dates whose input or metrics changed since the last run are
+        # reprocessed
+        if fingerprints.get(date_str) == partition_fingerprint(df, metrics):
+            logging.info(f"Skipping {date_str}: already processed.")
+            continue
+
+        yield date_str, df
+
+
+def main(args: Optional[argparse.Namespace] = None, worker: Optional[Worker] = None):
     """
     Main workflow:
-    - Parse command-line arguments
-    - Load data, process CPA, save results if not already in DB
+    - Parse command-line arguments (unless already parsed)
+    - Load data, process CPA, save results for dates whose input changed
+
+    Args:
+        args: Parsed command-line arguments; parsed from `sys.argv` if None.
+        worker: Resources of a resident process to reuse; built and
+                released within the run if None.
     """
-    args = parse_arguments()
+    from src.metrics import profile_run
+
+    if args is None:
+        args = parse_arguments()
 
     load_dotenv()
 
-    data_reader = JsonDataReader()
-    cpa_calculator = CpaCalculator()
-    db_engine = create_engine(os.getenv("DB_URL"))
-    repository = PostgresRepository(db_engine)
-    spend_path = os.getenv("SPEND_PATH")
-    conv_path = os.getenv("CONV_PATH")
+    if args.watch:
+        run = watch
+    else:
+
+        def run(args):
+            process(args, worker)
+
+    if args.profile:
+        with profile_run(args.profile):
+            run(args)
+    else:
+        run(args)
 
-    logging.info(f"Started processing from {args.start_date} to {args.end_date}")
 
-    total_records = 0
-    cpa_values = []
+class Worker:
+    """
+    Resources a resident process builds once and reuses for every run.
+
+    The engine and its connection pool, the reader and the calculator are
+    created at boot. The schema is checked and migrated on the first run
+    that needs the database, so the process starts even while the database
+    is not up yet; a failed attempt is repeated by the next run. Each later
+    run then only plans and processes its range. Pooled connections are
+    pre-pinged, so connections dropped by the database between runs are
+    replaced instead of failing the run.
+
+    Attributes:
+        args (argparse.Namespace): Parsed command-line arguments.
+        reader: Reader (or feed cache) used by every run.
+        calculator (CpaCalculator): Calculator used by every run.
+        repository (LazyRepository): Repository on the pooled engine, built
+            on first use.
+        replayer (SpoolReplayer, optional): Write-behind replayer, if spooling.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        """
+        Build the shared resources.
+
+        Args:
+            args: Parsed command-line arguments.
+        """
+        from src.cpa_calculator import CpaCalculator
+        from src.data_reader import JsonDataReader, StreamingJsonDataReader
+        from src.feed_cache import CachedDataReader
+
+        self.args = args
+        if args.stream:
+            self.reader = StreamingJsonDataReader(
+                chunk_size=args.chunk_size, compact=args.compact
+            )
+        else:
+            self.reader = JsonDataReader(compact=args.compact)
+        if not args.no_cache:
+            self.reader = CachedDataReader(
+                self.reader,
+                args.cache_dir,
+                max_bytes=args.cache_max_mb << 20,
+                rebuild=args.rebuild_cache,
+            )
+        self.calculator = CpaCalculator(args.kpis)
+        # Pipeline writers each hold a pooled connection while they upsert
+        self.repository, self.replayer = open_repository(
+            args, max(5, args.write_workers)
+        )
+
+    def run(self):
+        """
+        Process every day since the watermark with the shared resources.
+
+        The range is planned by `plan_catch_up`, so a run after downtime
+        covers all missed days at once and a run with nothing left to do
+        returns without reading the feeds.
+        """
+        from src.scheduler import plan_catch_up
+
+        planned = plan_catch_up(
+            self.repository.get_watermark(),
+            datetime.now().date(),
+            self.args.start_date,
+            self.args.end_date,
+        )
+        if planned is None:
+            logging.info("Scheduled run skipped: every complete day is processed.")
+            return
+        start_date, end_date = planned
+        logging.info(f"Scheduled run catching up from {start_date} to {end_date}")
+        args = argparse.Namespace(
+            **{**vars(self.args), "start_date": start_date, "end_date": end_date}
+        )
+        main(args, self)
+
+    def close(self):
+        """Drain the write-behind spool and close the pooled connections."""
+        if self.replayer is not None:
+            self.replayer.stop(timeout=self.args.spool_drain_seconds)
+        self.repository.engine.dispose()
 
+
+def open_repository(args: argparse.Namespace, pool_size: int = 5):
+    """
+    Create the repository for the parsed arguments.
+
+    The database is not contacted until the repository is first used, so a
+    process can start while it is down. With `--spool-dir`, upserts go to a
+    local spool that a started background replayer writes to the database.
+
+    Args:
+        args: Parsed command-line arguments.
+        pool_size: Connections kept in the engine's pool.
+
+    Returns:
+        Tuple[DatabaseRepository, Optional[SpoolReplayer]]: The repository
+            and the replayer to stop at exit, if any.
+    """
+    from sqlalchemy import create_engine
+
+    from src.db_repository import create_repository
+    from src.spool import LazyRepository, Spool, SpooledRepository, SpoolReplayer
+
+    db_engine = create_engine(
+        os.getenv("DB_URL"), pool_size=pool_size, pool_pre_ping=True
+    )
+
+    def connect(engine):
+        return create_repository(
+            engine,
+            bulk=args.bulk,
+            partition_by_month=args.partition_by_month,
+            delta=args.delta,
+        )
+
+    # Schema setup waits for the first use, within a run's error handling
+    repository = LazyRepository(db_engine, connect)
+    if not args.spool_dir:
+        return repository, None
+    # Upserts only reach the local spool; a background thread replays it and
+    # sets up the schema once the database is reachable
+    replayer = SpoolReplayer(Spool(args.spool_dir), repository)
+    replayer.start()
+    return SpooledRepository(repository, replayer.spool, replayer), replayer
+
+
+def watch(args: argparse.Namespace) -> None:
+    """
+    Keep the database current with appended feed records until interrupted.
+
+    Args:
+        args: Parsed command-line arguments.
+    """
+    from src.cpa_calculator import CpaCalculator
+    from src.metrics import registry
+    from src.watcher import FeedWatcher
+
+    repository, replayer = open_repository(args)
+    watcher = FeedWatcher(
+        os.getenv("SPEND_PATH"),
+        os.getenv("CONV_PATH"),
+        CpaCalculator(args.kpis),
+        repository,
+        flush_rows=args.flush_rows,
+        flush_seconds=args.flush_seconds,
+        poll_interval=args.poll_interval,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    registry.start_run()
+    started = time.time()
+    success = False
     try:
-        for date in pd.date_range(args.start_date, args.end_date):
-            date_str = date.strftime("%Y-%m-%d")
+        watcher.run(stop, lambda rows: print(f"Flushed {rows} records"))
+        success = True
+    except Exception as e:
+        logging.exception("An error occurred while watching the feeds.")
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    finally:
+        if replayer is not None:
+            replayer.stop(timeout=args.spool_drain_seconds)
+        registry.finish_run(started, success)
+        registry.log_summary()
+        if args.metrics_textfile:
+            registry.write_textfile(args.metrics_textfile)
 
-            if repository.check_date_exists(date_str):
-                logging.info(f"Skipping {date_str}: already processed.")
-                continue
 
-            df = data_reader.read(spend_path, conv_path)
-            df = df[df["date"] == date_str]
+def process(args: argparse.Namespace, worker: Optional[Worker] = None) -> None:
+    """
+    Run one backfill for the parsed arguments, recording stage metrics.
 
-            if df.empty:
-                logging.info(f"No data found for {date_str}.")
-                continue
+    Args:
+        args: Parsed command-line arguments.
+        worker: Resources of a resident process to reuse; if None, they are
+                built for this run and released at its end.
+    """
+    import pandas as pd
+
+    from src.backfill import ShardedBackfill
+    from src.metrics import registry
+    from src.pipeline import ConcurrentPipeline
+    from src.summary import SummaryStats
+
+    owned = worker is None
+    if owned:
+        worker = Worker(args)
+    data_reader = worker.reader
+    cpa_calculator = worker.calculator
+    repository = worker.repository
+    spend_path = os.getenv("SPEND_PATH")
+    conv_path = os.getenv("CONV_PATH")
 
-            df = cpa_calculator.process(df)
-            repository.upsert(df)
-            total_records += len(df)
-            cpa_values.extend(df["cpa"].dropna().tolist())
+    # Running totals and CPA distribution, independent of the backfill size
+    stats = SummaryStats()
+    registry.start_run()
+    started = time.time()
+    success = False
 
-            logging.info(f"Processed and stored data for {date_str}.")
-            print(f"Processed {date_str}: {len(df)} records")
+    def report(date_str: str, df: pd.DataFrame) -> None:
+        stats.update(df)
 
-        print_summary(total_records, cpa_values)
+        logging.info(f"Processed and stored data for {date_str}.")
+        print(f"Processed {date_str}: {len(df)} records")
+
+    # Dates of the range that had feed data; only they can move the watermark
+    found: List[str] = []
+    try:
+        if args.start_date is None or args.end_date is None:
+            raise ValueError("A run needs both a start date and an end date")
+        logging.info(f"Started processing from {args.start_date} to {args.end_date}")
+
+        if args.backfill:
+            # Worker processes read their own shards and claim dates by lease
+            backfill = ShardedBackfill(
+                os.getenv("DB_URL"),
+                spend_path,
+                conv_path,
+                workers=args.workers,
+                shard_days=args.shard_days,
+                lease_seconds=args.lease_seconds,
+                stream=args.stream,
+                chunk_size=args.chunk_size,
+                compact=args.compact,
+                kpis=args.kpis,
+                bulk=args.bulk,
+                partition_by_month=args.partition_by_month,
+                delta=args.delta,
+                cache_dir=None if args.no_cache else args.cache_dir,
+                cache_max_bytes=args.cache_max_mb << 20,
+                rebuild_cache=args.rebuild_cache,
+            )
+            stats.merge(
+                backfill.run(
+                    args.start_date,
+                    args.end_date,
+                    lambda date_str, records: print(
+                        f"Processed {date_str}: {records} records"
+                    ),
+                )
+            )
+            found = sorted(
+                set(pd.date_range(args.start_date, args.end_date).strftime("%Y-%m-%d"))
+                - set(backfill.empty_dates)
+            )
+        else:
+            # Plan the run up front with a single lookup of stored fingerprints
+            fingerprints = repository.get_fingerprints(args.start_date, args.end_date)
+
+            # Read and merge the feeds once, then hand out one partition per date
+            partitions = data_reader.read_partitions(
+                spend_path, conv_path, args.start_date, args.end_date
+            )
+            changed = select_changed_partitions(
+                partitions,
+                fingerprints,
+                args.start_date,
+                args.end_date,
+                found,
+                args.kpis,
+            )
+
+            if args.pipeline:
+                pipeline = ConcurrentPipeline(
+                    cpa_calculator,
+                    repository,
+                    compute_workers=args.compute_workers,
+                    write_workers=args.write_workers,
+                    queue_size=args.queue_size,
+                )
+                pipeline.run(changed, report)
+            else:
+                for date_str, df in changed:
+                    with registry.timed("compute", date_str, len(df)):
+                        df = cpa_calculator.process(df)
+                    with registry.timed("upsert", date_str, len(df)):
+                        repository.upsert(df)
+                    report(date_str, df)
+
+        # Trailing dates without data may just not have landed yet, so the
+        # watermark stops at the last date with data and they are retried
+        if found:
+            try:
+                repository.advance_watermark(args.start_date, found[-1])
+            except Exception:
+                # Not fatal: the next scheduled run just covers these dates again
+                logging.warning("Could not advance the watermark.", exc_info=True)
+        print_summary(stats.records, stats)
+        success = True
 
     except Exception as e:
         logging.exception("An error occurred during processing.")
         print(f"Error: {str(e)}")
         sys.exit(1)
+    finally:
+        if owned:
+            worker.close()
+        registry.finish_run(started, success)
+        registry.log_summary()
+        if args.metrics_textfile:
+            registry.write_textfile(args.metrics_textfile)
 
 
 if __name__ == "__main__":
-    scheduler = Scheduler(main)
+    # Parsed first, so --help and invalid arguments exit before any heavy import
+    args = parse_arguments()
+    load_dotenv()
+    # Expose metrics for scraping while the scheduler is running
+    if os.getenv("METRICS_PORT"):
+        from src.metrics import MetricsServer
+
+        MetricsServer(
+            int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST", "127.0.0.1")
+        ).start()
+
+    if args.watch:
+        # Watch mode runs in the foreground until SIGINT/SIGTERM
+        main(args)
+        sys.exit(0)
+
+    from src.scheduler import Scheduler
+
+    # Engine, pool, schema check, reader and calculator outlive each run
+    worker = Worker(args)
+    # Runs once at start to catch up on days missed while the process was down
+    scheduler = Scheduler(
+        worker.run,
+        misfire_grace_time=args.misfire_grace_seconds,
+        jitter=args.jitter_seconds,
+        run_at_start=True,
+    )
     scheduler.start()
 
+    exit_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *args: exit_event.set())
+    signal.signal(signal.SIGTERM, lambda *args: exit_event.set())
     try:
-        import signal
-        from threading import Event
-
-        exit_event = Event()
-        signal.signal(signal.SIGINT, lambda *args: exit_event.set())
-        signal.signal(signal.SIGTERM, lambda *args: exit_event.set())
         exit_event.wait()
     except KeyboardInterrupt:
-        logging.info("Shutting down scheduler")
-        scheduler.scheduler.shutdown()
-        logging.info("Scheduler shut down")
+        pass
+    logging.info("Shutting down scheduler")
+    scheduler.scheduler.shutdown()
+    worker.close()
+    logging.info("Scheduler shut down")
@@ -0,0 +1,413 @@
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import (
+    JsonDataReader,
+    StreamingJsonDataReader,
+    partition_fingerprint,
+)
+from src.db_repository import DatabaseRepository, create_repository
+from src.feed_cache import CachedDataReader
+from src.summary import SummaryStats
+
+
+class ShardResult:
+    """
+    Outcome of one shard, returned from a worker process.
+
+    Attributes:
+        processed (List[tuple]): (date, records) stored by this worker.
+        skipped (List[str]): Dates whose stored fingerprint already matched.
+        empty (List[str]): Dates without input data.
+        busy (List[str]): Dates leased by another worker.
+        failed (Dict[str, str]): Error message per date that failed.
+        stats (SummaryStats): Summary of the processed records.
+    """
+
+    def __init__(self):
+        self.processed: List[tuple] = []
+        self.skipped: List[str] = []
+        self.empty: List[str] = []
+        self.busy: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.stats = SummaryStats()
+
+
+class LeaseHeartbeat:
+    """
+    Background thread that keeps a worker's leases from expiring.
+
+    Attributes:
+        repository (DatabaseRepository): Repository holding the lease table.
+        owner (str): Identifier of the worker holding the leases.
+        lease_seconds (float): Lease duration; renewed every third of it.
+    """
+
+    def __init__(
+        self, repository: DatabaseRepository, owner: str, lease_seconds: float
+    ):
+        self.repository = repository
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="lease-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def hold(self, date: str):
+        """Start renewing the lease on a date."""
+        with self._lock:
+            self._held.add(date)
+
+    def drop(self, date: str):
+        """Stop renewing the lease on a date."""
+        with self._lock:
+            self._held.discard(date)
+
+    def stop(self):
+        """Stop the heartbeat thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = set(self._held)
+            try:
+                renewed = self.repository.renew_leases(
+                    held, self.owner, self.lease_seconds
+                )
+            except Exception:
+                logging.exception("Failed to renew leases")
+                continue
+            if renewed < len(held):
+                logging.warning(
+                    f"{self.owner} lost {len(held) - renewed} leases; "
+                    "another worker may take over those dates"
+                )
+
+
+def _make_reader(settings: dict, rebuild_cache: bool = False):
+    """Build the feed reader described by the backfill settings."""
+    if settings["stream"]:
+        reader = StreamingJsonDataReader(
+            chunk_size=settings["chunk_size"], compact=settings["compact"]
+        )
+    else:
+        reader = JsonDataReader(compact=settings["compact"])
+    if settings["cache_dir"]:
+        reader = CachedDataReader(
+            reader,
+            settings["cache_dir"],
+            max_bytes=settings["cache_max_bytes"],
+            rebuild=rebuild_cache,
+        )
+    return reader
+
+
+# Per-process state of a backfill worker, set up by `_init_worker`
+_worker: Optional[dict] = None
+
+
+def _init_worker(settings: dict):
+    """Create this worker process's engine, repository, reader and heartbeat."""
+    global _worker
+    engine = create_engine(settings["db_url"])
+    repository = create_repository(
+        engine,
+        bulk=settings["bulk"],
+        partition_by_month=settings["partition_by_month"],
+        delta=settings["delta"],
+    )
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    _worker = {
+        "settings": settings,
+        "repository": repository,
+        "reader": _make_reader(settings),
+        "calculator": CpaCalculator(settings["kpis"]),
+        "owner": owner,
+        "heartbeat": LeaseHeartbeat(repository, owner, settings["lease_seconds"]),
+    }
+
+
+def process_shard(dates: List[str]) -> ShardResult:
+    """
+    Process a contiguous run of dates in a worker process.
+
+    The feeds are read once for the shard's range. Each date is then claimed
+    through the lease table, checked against its stored fingerprint (which
+    may have been written by another worker since the run was planned),
+    computed, stored and released.
+
+    Args:
+        dates (List[str]): Consecutive dates (YYYY-MM-DD) in ascending order.
+
+    Returns:
+        ShardResult: What happened to every date of the shard.
+    """
+    settings = _worker["settings"]
+    repository: DatabaseRepository = _worker["repository"]
+    heartbeat: LeaseHeartbeat = _worker["heartbeat"]
+    owner = _worker["owner"]
+    result = ShardResult()
+
+    partitions = dict(
+        _worker["reader"].read_partitions(
+            settings["spend_path"], settings["conv_path"], dates[0], dates[-1]
+        )
+    )
+    for date_str in dates:
+        df = partitions.pop(date_str, None)
+        if df is None or df.empty:
+            result.empty.append(date_str)
+            continue
+
+        attempt = repository.claim_date(date_str, owner, settings["lease_seconds"])
+        if attempt is None:
+            result.busy.append(date_str)
+            continue
+        if attempt > 1:
+            logging.warning(f"Retrying {date_str} (attempt {attempt})")
+
+        heartbeat.hold(date_str)
+        completed = False
+        try:
+            stored = repository.get_fingerprints(date_str, date_str).get(date_str)
+            if stored == partition_fingerprint(df, settings["kpis"]):
+                result.skipped.append(date_str)
+            else:
+                df = _worker["calculator"].process(df)
+                repository.upsert(df)
+                result.processed.append((date_str, len(df)))
+                result.stats.update(df)
+            completed = True
+        except Exception as e:
+            logging.exception(f"Failed to process {date_str}")
+            result.failed[date_str] = str(e)
+        finally:
+            heartbeat.drop(date_str)
+            repository.release_date(date_str, owner, completed)
+    return result
+
+
+def split_shards(dates: List[str], shard_days: int) -> List[List[str]]:
+    """Split dates into consecutive shards of at most `shard_days` dates."""
+    return [dates[i : i + shard_days] for i in range(0, len(dates), shard_days)]
+
+
+class ShardedBackfill:
+    """
+    Backfills a date range on a pool of worker processes.
+
+    The range is split into shards of consecutive dates, each processed by a
+    `ProcessPoolExecutor` worker with its own engine. Dates are claimed
+    through the `date_leases` table and kept alive by a heartbeat, so several
+    processes or replicas running the same backfill never store a date at
+    the same time. Dates that failed, or whose lease was held elsewhere, are
+    retried in later rounds; a lease abandoned by a crashed worker expires
+    after `lease_seconds` and is claimed again.
+
+    Attributes:
+        db_url (str): Database URL used by every worker.
+        spend_path (str): Path to the spend feed.
+        conv_path (str): Path to the conversions feed.
+        workers (int): Number of worker processes.
+        shard_days (int, optional): Dates per shard; by default the range is
+                                    split evenly across the workers.
+        lease_seconds (float): Lease duration.
+        max_attempts (int): Rounds before remaining dates are given up.
+        retry_interval (float): Pause between rounds.
+        empty_dates (List[str]): Dates of the last run without feed data.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        spend_path: str,
+        conv_path: str,
+        workers: int = 4,
+        shard_days: Optional[int] = None,
+        lease_seconds: float = 120,
+        max_attempts: int = 3,
+        retry_interval: Optional[float] = None,
+        stream: bool = False,
+        chunk_size: int = 100_000,
+        compact: bool = False,
+        kpis: Tuple[str, ...] = ("cpa",),
+        bulk: bool = False,
+        partition_by_month: bool = False,
+        delta: bool = False,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 1 << 30,
+        rebuild_cache: bool = False,
+    ):
+        """
+        Initialize the backfill.
+
+        Args:
+            db_url (str): Database URL used by every worker.
+            spend_path (str): Path to the spend feed.
+            conv_path (str): Path to the conversions feed.
+            workers (int, optional): Worker processes. Defaults to 4.
+            shard_days (int, optional): Dates per shard. Defaults to an even split.
+            lease_seconds (float, optional): Lease duration. Defaults to 120.
+            max_attempts (int, optional): Retry rounds. Defaults to 3.
+            retry_interval (float, optional): Pause between rounds.
+                                              Defaults to `lease_seconds`.
+            stream (bool, optional): Use the streaming reader. Defaults to False.
+            chunk_size (int, optional): Streaming chunk size. Defaults to 100000.
+            compact (bool, optional): Use the compact dtypes. Defaults to False.
+            kpis (Tuple[str, ...], optional): Metrics to calculate, from
+                                              `RATIOS`. Defaults to CPA only.
+            bulk (bool, optional): Write through COPY. Defaults to False.
+            partition_by_month (bool, optional): Partition daily_stats by month.
+            delta (bool, optional): Skip writes of unchanged rows.
+            cache_dir (str, optional): Feed cache directory; None disables it.
+            cache_max_bytes (int, optional): Feed cache size cap.
+            rebuild_cache (bool, optional): Rewrite the feed cache entry first.
+        """
+        if (
+            workers < 1
+            or max_attempts < 1
+            or (shard_days is not None and shard_days < 1)
+        ):
+            raise ValueError("workers, shard_days and max_attempts must be at least 1")
+        self.db_url = db_url
+        self.spend_path = spend_path
+        self.conv_path = conv_path
+        self.workers = workers
+        self.shard_days = shard_days
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_interval = (
+            lease_seconds if retry_interval is None else retry_interval
+        )
+        self._settings = {
+            "db_url": db_url,
+            "spend_path": spend_path,
+            "conv_path": conv_path,
+            "lease_seconds": lease_seconds,
+            "stream": stream,
+            "chunk_size": chunk_size,
+            "compact": compact,
+            "kpis": tuple(kpis),
+            "bulk": bulk,
+            "partition_by_month": partition_by_month,
+            "delta": delta,
+            "cache_dir": cache_dir,
+            "cache_max_bytes": cache_max_bytes,
+        }
+        self.rebuild_cache = rebuild_cache
+        self.empty_dates: List[str] = []
+
+    def run(
+        self,
+        start_date: str,
+        end_date: str,
+        on_processed: Optional[Callable[[str, int], None]] = None,
+    ) -> SummaryStats:
+        """
+        Backfill every date in an inclusive range.
+
+        Args:
+            start_date (str): First date (YYYY-MM-DD).
+            end_date (str): Last date (YYYY-MM-DD).
+            on_processed: Called with (date, records) for each stored date,
+                          in date order within a shard.
+
+        Returns:
+            SummaryStats: Summary merged from all workers.
+
+        Raises:
+            RuntimeError: If some dates still failed after `max_attempts` rounds.
+        """
+        stats = SummaryStats()
+        pending = [d.strftime("%Y-%m-%d") for d in pd.date_range(start_date, end_date)]
+        failed: Dict[str, str] = {}
+        busy: List[str] = []
+        empty: List[str] = []
+
+        if self._settings["cache_dir"]:
+            # Parse the feeds once here so that workers all hit the cache
+            _make_reader(self._settings, self.rebuild_cache).ensure(
+                self.spend_path, self.conv_path
+            )
+
+        for attempt in range(1, self.max_attempts + 1):
+            shard_days = self.shard_days or math.ceil(len(pending) / self.workers)
+            shards = split_shards(pending, shard_days)
+            logging.info(
+                f"Backfill round {attempt}: {len(pending)} dates in "
+                f"{len(shards)} shards on {self.workers} workers"
+            )
+            failed, busy = {}, []
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(shards)),
+                initializer=_init_worker,
+                initargs=(self._settings,),
+            ) as pool:
+                futures = {pool.submit(process_shard, shard): shard for shard in shards}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker died; its leases expire and are retried
+                        logging.error(f"Shard {futures[future][0]} crashed: {e}")
+                        failed.update({d: str(e) for d in futures[future]})
+                        continue
+                    self._report(result, on_processed)
+                    stats.merge(result.stats)
+                    failed.update(result.failed)
+                    busy.extend(result.busy)
+                    empty.extend(result.empty)
+
+            self.empty_dates = sorted(empty)
+            pending = sorted(set(failed) | set(busy))
+            if not pending:
+                break
+            if attempt < self.max_attempts:
+                logging.info(
+                    f"{len(pending)} dates left; retrying in {self.retry_interval}s"
+                )
+                time.sleep(self.retry_interval)
+
+        if busy:
+            logging.warning(
+                f"{len(busy)} dates are still leased by other workers: "
+                f"{', '.join(sorted(busy))}"
+            )
+        if failed:
+            raise RuntimeError(
+                f"Backfill failed for {len(failed)} dates: {', '.join(sorted(failed))}"
+            )
+        return stats
+
+    @staticmethod
+    def _report(
+        result: ShardResult, on_processed: Optional[Callable[[str, int], None]]
+    ):
+        """Log a shard's outcome and report its stored dates."""
+        for date_str in result.empty:
+            logging.info(f"No data found for {date_str}.")
+        for date_str in result.skipped:
+            logging.info(f"Skipping {date_str}: already processed.")
+        for date_str in result.busy:
+            logging.info(f"Deferring {date_str}: leased by another worker.")
+        for date_str, records in result.processed:
+            logging.info(f"Processed and stored data for {date_str}.")
+            if on_processed is not None:
+                on_processed(date_str, records)
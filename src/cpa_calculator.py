@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import logging
+from typing import Dict, Iterable, Tuple, Union
 
 
 def calculate_cpa(spend: float, conversions: float) -> float | None:
@@ -19,23 +21,165 @@ def calculate_cpa(spend: float, conversions: float) -> float | None:
     return spend / conversions
 
 
+def ratio_vectorized(
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    null_if_zero_numerator: bool = False,
+) -> np.ndarray:
+    """
+    Divide two columns, with NaN wherever the ratio is undefined.
+
+    Args:
+        numerator: Array of numerator values.
+        denominator: Array of denominator values.
+        null_if_zero_numerator: Also return NaN where the numerator is zero.
+
+    Returns:
+        Array of ratios, NaN where the denominator (or, optionally, the
+        numerator) is zero.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    defined = denominator != 0
+    if null_if_zero_numerator:
+        defined &= numerator != 0
+    result = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=result, where=defined)
+    return result
+
+
+def calculate_cpa_vectorized(spend: np.ndarray, conversions: np.ndarray) -> np.ndarray:
+    """
+    Vectorized counterpart of `calculate_cpa` over whole columns.
+
+    Args:
+        spend: Array of amounts spent.
+        conversions: Array of conversion counts.
+
+    Returns:
+        Array of CPA values, NaN where spend or conversions is zero.
+    """
+    return ratio_vectorized(spend, conversions, null_if_zero_numerator=True)
+
+
+class Ratio:
+    """
+    A metric declared as `numerator / denominator` over input columns.
+
+    Attributes:
+        numerator (str): Column divided.
+        denominator (str): Column divided by; zero gives NULL.
+        null_if_zero_numerator (bool): Also give NULL where the numerator is
+                                       zero (CPA keeps its historic rule).
+    """
+
+    def __init__(
+        self, numerator: str, denominator: str, null_if_zero_numerator: bool = False
+    ):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.null_if_zero_numerator = null_if_zero_numerator
+
+    @classmethod
+    def compile(cls, expression: str) -> "Ratio":
+        """
+        Build a ratio from an expression such as "spend / clicks".
+
+        Args:
+            expression (str): Two column names separated by "/".
+
+        Returns:
+            Ratio: The compiled metric.
+
+        Raises:
+            ValueError: If the expression is not a ratio of two columns.
+        """
+        parts = [part.strip() for part in expression.split("/")]
+        if len(parts) != 2 or not all(part.isidentifier() for part in parts):
+            raise ValueError(
+                f"Invalid ratio expression: '{expression}'. Expected 'column / column'."
+            )
+        return cls(*parts)
+
+    def __repr__(self) -> str:
+        return f"Ratio('{self.numerator} / {self.denominator}')"
+
+
+# Built-in metrics; each has a matching nullable column in `daily_stats`
+RATIOS: Dict[str, Ratio] = {
+    "cpa": Ratio("spend", "conversions", null_if_zero_numerator=True),
+    "cpc": Ratio("spend", "clicks"),
+    "cvr": Ratio("conversions", "clicks"),
+    "roas": Ratio("revenue", "spend"),
+}
+
+
 class CpaCalculator:
-    """Calculates CPA for a given DataFrame."""
+    """
+    Calculates CPA, and optionally further ratio metrics, for a DataFrame.
+
+    Attributes:
+        metrics (Dict[str, Ratio]): Output column name -> ratio, in order.
+    """
+
+    def __init__(self, metrics: Iterable[Union[str, Tuple[str, str]]] = ("cpa",)):
+        """
+        Initialize the calculator.
+
+        Args:
+            metrics: Names from `RATIOS`, or (name, "column / column") pairs
+                     for custom ratios. Defaults to CPA only.
+
+        Raises:
+            ValueError: If a name is unknown or an expression is invalid.
+        """
+        self.metrics: Dict[str, Ratio] = {}
+        for metric in metrics:
+            if isinstance(metric, str):
+                if metric not in RATIOS:
+                    raise ValueError(
+                        f"Unknown metric: '{metric}'. "
+                        f"Expected one of {', '.join(RATIOS)}."
+                    )
+                self.metrics[metric] = RATIOS[metric]
+            else:
+                name, expression = metric
+                self.metrics[name] = Ratio.compile(expression)
 
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Adds a 'cpa' column to the DataFrame by calculating CPA for each row.
+        Adds one column per configured metric using column-wise arithmetic.
+
+        Every input column is converted to float64 once and shared by all
+        metrics, so the partition is evaluated in a single pass.
 
         Args:
-            df: DataFrame with 'spend' and 'conversions' columns.
+            df: DataFrame with the metrics' input columns.
 
         Returns:
-            DataFrame with an added 'cpa' column.
+            DataFrame with an added column per metric (NaN where undefined).
+
+        Raises:
+            ValueError: If an input column of a metric is missing.
         """
-        df["cpa"] = df.apply(
-            # JsonDataReader ensures "spend" and "conversions" (filled with 0 if missing) exist
-            lambda row: calculate_cpa(row["spend"], row["conversions"]),
-            axis=1,
-        )
-        logging.info(f"Calculated CPA for {len(df)} records")
+        inputs: Dict[str, np.ndarray] = {}
+        for name, ratio in self.metrics.items():
+            for column in (ratio.numerator, ratio.denominator):
+                if column in inputs:
+                    continue
+                if column not in df.columns:
+                    raise ValueError(
+                        f"Metric '{name}' needs column '{column}', "
+                        "which the feeds do not provide"
+                    )
+                inputs[column] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        for name, ratio in self.metrics.items():
+            df[name] = ratio_vectorized(
+                inputs[ratio.numerator],
+                inputs[ratio.denominator],
+                ratio.null_if_zero_numerator,
+            )
+        names = ", ".join(name.upper() for name in self.metrics)
+        logging.info(f"Calculated {names} for {len(df)} records")
         return df
@@ -1,7 +1,289 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
 import pandas as pd
+import hashlib
+import inspect
+import json
 import logging
+import os
+import pickle
+import tempfile
 from functools import wraps
-from typing import Callable
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.metrics import registry
+
+MERGE_KEYS = ["date", "campaign_id"]
+
+# Columns a feed may contribute; anything else is ignored when reading.
+# 'clicks' and 'revenue' are optional inputs of the extra ratio metrics.
+FEED_COLUMNS = MERGE_KEYS + ["spend", "conversions", "clicks", "revenue"]
+
+# Value columns holding whole counts, stored as integers
+COUNT_COLUMNS = ["conversions", "clicks"]
+
+
+def value_columns(df: pd.DataFrame) -> List[str]:
+    """Return the feed value columns present in `df`, in `FEED_COLUMNS` order."""
+    return [c for c in FEED_COLUMNS if c in df.columns and c not in MERGE_KEYS]
+
+
+def merge_feeds(spend_df: pd.DataFrame, conv_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Outer-merges spend and conversions data on 'date' and 'campaign_id'.
+
+    Missing values in the value columns ('spend', 'conversions' and the
+    optional 'clicks' and 'revenue') are filled with zeroes.
+
+    Args:
+        spend_df (pd.DataFrame): Spending data.
+        conv_df (pd.DataFrame): Conversions data.
+
+    Returns:
+        pd.DataFrame: The merged DataFrame.
+    """
+    merged_df = spend_df.merge(conv_df, on=MERGE_KEYS, how="outer")
+    return merged_df.fillna({column: 0 for column in value_columns(merged_df)})
+
+
+def collapse_duplicates(df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """
+    Sums the rows of a feed that share a ('date', 'campaign_id') key.
+
+    Feeds may list a campaign several times per day (e.g. one row per ad
+    set). Merging such rows would multiply them, and the upsert would then
+    touch the same key twice in one statement, so they are summed first
+    with a single hash groupby. Missing values count as zero, as they do
+    after the merge.
+
+    Args:
+        df (pd.DataFrame): One feed; its value columns (see `value_columns`)
+                           are summed.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: The feed with one row per key, and the
+                                  number of rows collapsed into another.
+    """
+    if df.empty or not set(MERGE_KEYS) <= set(df.columns):
+        return df, 0
+    groups = df.groupby(MERGE_KEYS, sort=False, dropna=False)
+    collapsed = len(df) - groups.ngroups
+    if not collapsed:
+        return df, 0
+    return groups[value_columns(df)].sum().reset_index(), collapsed
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts a merged DataFrame to the compact dtypes.
+
+    'campaign_id' becomes categorical and the count columns ('conversions'
+    and 'clicks') become int32 when every value is a whole number in range;
+    other columns are unchanged.
+
+    Args:
+        df (pd.DataFrame): Merged DataFrame.
+
+    Returns:
+        pd.DataFrame: The same rows with compact dtypes.
+    """
+    if df.empty or "campaign_id" not in df.columns:
+        return df
+    return df.assign(
+        campaign_id=df["campaign_id"].astype(str).astype("category"),
+        **{
+            column: downcast_counts(df[column].to_numpy())
+            for column in COUNT_COLUMNS
+            if column in df.columns
+        },
+    )
+
+
+def downcast_counts(values: np.ndarray) -> np.ndarray:
+    """Return `values` as int32 if that is lossless, otherwise unchanged."""
+    info = np.iinfo(np.int32)
+    if values.dtype == np.int32:
+        return values
+    if (
+        len(values)
+        and np.isfinite(values).all()
+        and (values == np.round(values)).all()
+        and values.min() >= info.min
+        and values.max() <= info.max
+    ):
+        return values.astype(np.int32)
+    return values
+
+
+def merge_feeds_compact(spend_df: pd.DataFrame, conv_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Same rows and order as `merge_feeds`, joined on integer key codes.
+
+    Both keys are encoded against the union of their values in both feeds
+    and combined into one int64 code per row, so the join is a sorted
+    integer union instead of a hash merge on strings. The result has a
+    categorical 'campaign_id' and int32 'conversions' where lossless (see
+    `compact_frame`). Feeds with duplicate keys fall back to `merge_feeds`.
+
+    Args:
+        spend_df (pd.DataFrame): Spending data.
+        conv_df (pd.DataFrame): Conversions data.
+
+    Returns:
+        pd.DataFrame: The merged DataFrame with compact dtypes.
+    """
+    if not all(
+        set(MERGE_KEYS) <= set(df.columns) and len(df) for df in (spend_df, conv_df)
+    ):
+        return compact_frame(merge_feeds(spend_df, conv_df))
+
+    n_spend = len(spend_df)
+    date_codes, dates = pd.factorize(
+        np.concatenate([spend_df["date"].to_numpy(), conv_df["date"].to_numpy()]),
+        sort=True,
+    )
+    campaign_codes, campaigns = pd.factorize(
+        pd.concat([spend_df["campaign_id"], conv_df["campaign_id"]]).astype(str),
+        sort=True,
+    )
+    combined = date_codes.astype(np.int64) * len(campaigns) + campaign_codes
+    spend_keys, conv_keys = combined[:n_spend], combined[n_spend:]
+
+    key_space = len(dates) * len(campaigns)
+    if key_space <= 4 * len(combined):
+        # Dense keys: a presence mask yields the sorted union without a sort
+        has_spend = np.zeros(key_space, dtype=bool)
+        has_spend[spend_keys] = True
+        has_conv = np.zeros(key_space, dtype=bool)
+        has_conv[conv_keys] = True
+        unique = has_spend.sum() == len(spend_keys) and has_conv.sum() == len(conv_keys)
+        keys = np.flatnonzero(has_spend | has_conv)
+    else:
+        unique = pd.Index(spend_keys).is_unique and pd.Index(conv_keys).is_unique
+        keys = np.union1d(spend_keys, conv_keys)
+    if not unique:
+        # Duplicate keys multiply rows in a merge; keep those semantics
+        return compact_frame(merge_feeds(spend_df, conv_df))
+
+    columns = {
+        "date": dates[keys // len(campaigns)],
+        "campaign_id": pd.Categorical.from_codes(
+            keys % len(campaigns), categories=campaigns
+        ),
+    }
+    for df, df_keys in ((spend_df, spend_keys), (conv_df, conv_keys)):
+        positions = np.searchsorted(keys, df_keys)
+        for column in value_columns(df):
+            values = np.zeros(len(keys))
+            values[positions] = np.nan_to_num(
+                df[column].to_numpy(dtype=np.float64, na_value=0.0), nan=0.0
+            )
+            if column in COUNT_COLUMNS:
+                values = downcast_counts(values)
+            columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def log_collapsed(path: str, collapsed: int) -> None:
+    """Warn about duplicate keys summed by `collapse_duplicates`."""
+    if collapsed:
+        logging.warning(
+            f"Collapsed {collapsed} duplicate (date, campaign_id) rows in {path}"
+        )
+
+
+def partition_by_date(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Splits a merged DataFrame into per-date partitions in a single groupby pass.
+
+    Args:
+        df (pd.DataFrame): Merged DataFrame with a 'date' column.
+
+    Returns:
+        Dict[str, pd.DataFrame]: Partitions keyed by date string (YYYY-MM-DD).
+    """
+    if df.empty or "date" not in df.columns:
+        return {}
+    keys = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    return {date_str: part for date_str, part in df.groupby(keys, sort=True)}
+
+
+def partition_fingerprint(df: pd.DataFrame, metrics: Iterable[str] = ("cpa",)) -> str:
+    """
+    Computes a content fingerprint for one date partition.
+
+    The fingerprint covers the row count and a hash of the rows sorted by
+    campaign, using only the input columns ('campaign_id' and the value
+    columns), so it is unaffected by row order, dtype or derived columns
+    such as 'cpa'. Partitions without 'clicks' or 'revenue' hash exactly
+    as they did before those columns existed.
+
+    It also covers the set of metrics calculated for the partition, so a
+    date stored with fewer metrics than now configured is reprocessed. The
+    default set (CPA only) adds nothing, leaving earlier fingerprints valid.
+
+    Args:
+        df (pd.DataFrame): Rows of a single date.
+        metrics (Iterable[str], optional): Names of the calculated metrics.
+            Defaults to CPA only.
+
+    Returns:
+        str: Hex digest identifying the partition's content.
+    """
+    values = ["spend", "conversions"] + [
+        c for c in value_columns(df) if c not in ("spend", "conversions")
+    ]
+    rows = (
+        df[["campaign_id"] + values]
+        .astype({"campaign_id": str, **{column: "float64" for column in values}})
+        .sort_values(["campaign_id"] + values)
+    )
+    row_hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    digest = hashlib.sha256(len(rows).to_bytes(8, "little"))
+    digest.update(row_hashes.tobytes())
+    metrics = sorted(set(metrics))
+    if metrics != ["cpa"]:
+        digest.update(("metrics:" + ",".join(metrics)).encode())
+    return digest.hexdigest()
+
+
+def in_range(
+    date_str: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> bool:
+    """Check whether an ISO date string lies within an optional inclusive range."""
+    if start_date is not None and date_str < start_date:
+        return False
+    if end_date is not None and date_str > end_date:
+        return False
+    return True
+
+
+def align_to_dates(
+    partitions: Iterator[Tuple[str, pd.DataFrame]], start_date: str, end_date: str
+) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+    """
+    Walks every date in a range alongside an ordered stream of partitions.
+
+    Args:
+        partitions: (date string, partition) pairs in ascending date order.
+        start_date (str): First date of the range (YYYY-MM-DD).
+        end_date (str): Last date of the range (YYYY-MM-DD).
+
+    Yields:
+        Tuple[str, Optional[pd.DataFrame]]: Each date in the range with its
+                                            partition, or None if it has no data.
+    """
+    pending = next(partitions, None)
+    for date in pd.date_range(start_date, end_date):
+        date_str = date.strftime("%Y-%m-%d")
+        while pending is not None and pending[0] < date_str:
+            pending = next(partitions, None)
+        if pending is not None and pending[0] == date_str:
+            yield date_str, pending[1]
+            pending = next(partitions, None)
+        else:
+            yield date_str, None
 
 
 def handle_exceptions(func: Callable) -> Callable:
@@ -9,7 +291,9 @@ def handle_exceptions(func: Callable) -> Callable:
     Decorator for handling exceptions in functions or methods.
 
     If an exception is raised during execution, it logs the error and
-    returns an empty DataFrame instead of propagating the exception.
+    returns an empty DataFrame instead of propagating the exception. A
+    wrapped generator function stops yielding instead, so readers that
+    stream their partitions fail the same way as those that return a frame.
 
     Args:
         func (Callable): The target function to wrap.
@@ -18,13 +302,27 @@ def handle_exceptions(func: Callable) -> Callable:
         Callable: The wrapped function with exception handling.
     """
 
+    def report(e: Exception):
+        logging.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
+        print(f"Error: {str(e)}")
+
+    if inspect.isgeneratorfunction(func):
+
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            try:
+                yield from func(*args, **kwargs)
+            except Exception as e:
+                report(e)
+
+        return generator_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs) -> pd.DataFrame:
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            logging.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
-            print(f"Error: {str(e)}")
+            report(e)
             return pd.DataFrame()
 
     return wrapper
@@ -34,29 +332,703 @@ class JsonDataReader:
     """
     A class responsible for reading and merging JSON data files
     related to campaign spending and conversions.
+
+    Attributes:
+        compact (bool): Merge on integer key codes and return a categorical
+                        'campaign_id' and int32 'conversions' where lossless.
     """
 
+    def __init__(self, compact: bool = False):
+        """
+        Initialize the reader.
+
+        Args:
+            compact (bool, optional): Use the compact dtypes. Defaults to False.
+        """
+        self.compact = compact
+
     @handle_exceptions
-    def read(self, spend_path: str, conv_path: str) -> pd.DataFrame:
+    def read(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
         """
-        Reads two JSON files and merges them on 'date' and 'campaign_id'.
+        Reads two feed files and merges them on 'date' and 'campaign_id'.
 
-        Missing values for 'spend' and 'conversions' are filled with zeroes.
+        Each file's format (JSON array, NDJSON, CSV or Parquet) is picked
+        from its extension or contents; see `detect_format`. Rows sharing a
+        key within one file are summed before the merge (see
+        `collapse_duplicates`). Missing values in the value columns are
+        filled with zeroes.
 
         Args:
-            spend_path (str): Path to the JSON file containing spending data.
-            conv_path (str): Path to the JSON file containing conversions data.
+            spend_path (str): Path to the file containing spending data.
+            conv_path (str): Path to the file containing conversions data.
+            start_date (str, optional): Drop rows before this date (YYYY-MM-DD).
+            end_date (str, optional): Drop rows after this date (YYYY-MM-DD).
 
         Returns:
             pd.DataFrame: A merged DataFrame containing both spend and
                           conversion data, with missing values handled.
         """
-        spend_df = pd.read_json(spend_path)
-        conv_df = pd.read_json(conv_path)
+        with registry.timed("read") as timer:
+            spend_df = load_feed(spend_path, start_date, end_date)
+            conv_df = load_feed(conv_path, start_date, end_date)
+            timer.rows = len(spend_df) + len(conv_df)
+
+        with registry.timed("dedupe", rows=timer.rows):
+            spend_df, spend_dupes = collapse_duplicates(spend_df)
+            conv_df, conv_dupes = collapse_duplicates(conv_df)
+        log_collapsed(spend_path, spend_dupes)
+        log_collapsed(conv_path, conv_dupes)
 
-        merged_df = spend_df.merge(
-            conv_df, on=["date", "campaign_id"], how="outer"
-        ).fillna({"spend": 0, "conversions": 0})
+        with registry.timed("merge") as timer:
+            merge = merge_feeds_compact if self.compact else merge_feeds
+            merged_df = merge(spend_df, conv_df)
+            timer.rows = len(merged_df)
 
         logging.info(f"Read and merged {len(merged_df)} records")
         return merged_df
+
+    def read_partitions(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Reads and merges both files once and splits the result by date.
+
+        Args:
+            spend_path (str): Path to the file containing spending data.
+            conv_path (str): Path to the file containing conversions data.
+            start_date (str, optional): First date to yield (YYYY-MM-DD).
+            end_date (str, optional): Last date to yield (YYYY-MM-DD).
+
+        Yields:
+            Tuple[str, pd.DataFrame]: (date string, merged partition) pairs
+                                      in ascending date order.
+        """
+        merged_df = self.read(spend_path, conv_path, start_date, end_date)
+        with registry.timed("partition", rows=len(merged_df)):
+            partitions = partition_by_date(merged_df)
+        logging.info(f"Split merged data into {len(partitions)} date partitions")
+        for date_str, df in partitions.items():
+            if in_range(date_str, start_date, end_date):
+                yield date_str, df
+
+
+def iter_json_records(path: str, block_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Incrementally parses records from a JSON array or an NDJSON file.
+
+    The format is detected from the first non-whitespace character: '['
+    starts a JSON array, anything else is treated as one object per line.
+    At most one block plus one record is held in memory at a time. A
+    malformed record is reported as soon as more data cannot complete it,
+    without reading the rest of the file.
+
+    Args:
+        path (str): Path to the JSON or NDJSON file.
+        block_size (int): Number of characters read from disk per block.
+
+    Yields:
+        dict: One parsed record at a time.
+
+    Raises:
+        ValueError: If the file is not valid JSON, naming the byte offset.
+    """
+    decoder = json.JSONDecoder()
+    # No newline translation, so that character counts map back to bytes
+    with open(path, encoding="utf-8", newline="") as f:
+        buf = f.read(block_size)
+        pos = len(buf) - len(buf.lstrip())
+        if not buf.startswith("[", pos):
+            # NDJSON: re-read line by line from the start of the file
+            f.seek(0)
+            offset = 0
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        at = offset + len(line[: e.pos].encode("utf-8"))
+                        raise ValueError(
+                            f"Invalid JSON record in {path} at byte {at}: {e.msg}"
+                        ) from e
+                offset += len(line.encode("utf-8"))
+            return
+
+        base = 0  # Bytes of the file before `buf`
+        pos += 1
+        eof = False
+        # What may come next: a value or ']' ("first"), a value after a
+        # ',' ("value"), or ',' or ']' after a value ("separator")
+        expect = "first"
+        failed_at = None
+
+        def byte_offset(index: int) -> int:
+            return base + len(buf[:index].encode("utf-8"))
+
+        def read_more():
+            """Drop the parsed text and append the next block."""
+            nonlocal buf, pos, base, eof
+            more = f.read(block_size)
+            eof = not more
+            base = byte_offset(pos)
+            buf, pos = buf[pos:] + more, 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    raise ValueError(
+                        f"Unterminated JSON array in {path} at byte {byte_offset(pos)}"
+                    )
+                read_more()
+                continue
+
+            char = buf[pos]
+            if expect == "separator":
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ValueError(
+                        f"Expected ',' or ']' in {path} at byte {byte_offset(pos)}"
+                    )
+                expect = "value"
+                pos += 1
+                continue
+            if char == "]" and expect == "first":
+                return
+            if char in ",]":
+                raise ValueError(
+                    f"Unexpected '{char}' in {path} at byte {byte_offset(pos)}"
+                )
+
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # The record may be cut off by the end of the buffer: read one
+                # more block, and give up if the error stays where it was
+                at = byte_offset(e.pos)
+                truncated = e.pos >= len(buf) or e.msg.startswith("Unterminated")
+                if not eof and (truncated or at != failed_at):
+                    failed_at = at
+                    read_more()
+                    continue
+                raise ValueError(
+                    f"Invalid JSON record in {path} at byte {at}: {e.msg}"
+                ) from e
+            failed_at = None
+            # A value touching the end of the buffer may be truncated
+            if end == len(buf) and not eof:
+                read_more()
+                continue
+
+            yield record
+            pos = end
+            expect = "separator"
+            if pos > block_size:
+                base = byte_offset(pos)
+                buf, pos = buf[pos:], 0
+
+
+def iter_json_chunks(
+    path: str, chunk_size: int, block_size: int = 1 << 20
+) -> Iterator[pd.DataFrame]:
+    """
+    Groups incrementally parsed records into fixed-size DataFrames.
+
+    Args:
+        path (str): Path to the JSON or NDJSON file.
+        chunk_size (int): Maximum number of records per chunk.
+        block_size (int): Number of characters read from disk per block.
+
+    Yields:
+        pd.DataFrame: Chunks of at most `chunk_size` raw records.
+    """
+    chunk: List[dict] = []
+    for record in iter_json_records(path, block_size):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame.from_records(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame.from_records(chunk)
+
+
+def filter_date_range(
+    df: pd.DataFrame, start_date: Optional[str], end_date: Optional[str]
+) -> pd.DataFrame:
+    """
+    Keeps only rows whose 'date' falls within an inclusive range.
+
+    Args:
+        df (pd.DataFrame): Feed rows with a datetime 'date' column.
+        start_date (str, optional): First date to keep (YYYY-MM-DD).
+        end_date (str, optional): Last date to keep (YYYY-MM-DD).
+
+    Returns:
+        pd.DataFrame: The rows within the range.
+    """
+    if df.empty or (start_date is None and end_date is None):
+        return df
+    days = pd.to_datetime(df["date"]).dt.normalize()
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= days >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= days <= pd.Timestamp(end_date)
+    return df[mask]
+
+
+def normalize_feed(df: pd.DataFrame) -> pd.DataFrame:
+    """Gives a non-JSON feed the column types `pd.read_json` produces."""
+    df = df[[c for c in FEED_COLUMNS if c in df.columns]]
+    if "date" in df.columns:
+        df = df.assign(date=pd.to_datetime(df["date"]))
+    if "campaign_id" in df.columns:
+        df = df.assign(campaign_id=df["campaign_id"].astype(str))
+    return df
+
+
+class FeedFormat(ABC):
+    """
+    Reads one input file format; register instances with `register_format`.
+
+    Attributes:
+        name (str): Format name.
+        extensions (Tuple[str, ...]): File extensions mapped to this format.
+    """
+
+    name = ""
+    extensions: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def load(
+        self,
+        path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Loads a whole feed, optionally restricted to a date range.
+
+        Args:
+            path (str): Path to the feed.
+            start_date (str, optional): First date to keep (YYYY-MM-DD).
+            end_date (str, optional): Last date to keep (YYYY-MM-DD).
+
+        Returns:
+            pd.DataFrame: Feed rows.
+        """
+        pass
+
+    @abstractmethod
+    def iter_chunks(
+        self, path: str, chunk_size: int, block_size: int = 1 << 20
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields a feed in chunks of at most `chunk_size` rows.
+
+        Args:
+            path (str): Path to the feed.
+            chunk_size (int): Maximum rows per chunk.
+            block_size (int): Bytes read from disk per block, where applicable.
+
+        Yields:
+            pd.DataFrame: Chunks of feed rows.
+        """
+        pass
+
+
+class JsonArrayFormat(FeedFormat):
+    """A single JSON array of records, read exactly as before."""
+
+    name = "json"
+    extensions = (".json",)
+
+    def load(self, path, start_date=None, end_date=None):
+        # Parse like `json` does, so the chunked parser yields the same values
+        df = pd.read_json(path, dtype={"campaign_id": str}, precise_float=True)
+        return filter_date_range(df, start_date, end_date)
+
+    def iter_chunks(self, path, chunk_size, block_size=1 << 20):
+        return iter_json_chunks(path, chunk_size, block_size)
+
+
+class NdjsonFormat(FeedFormat):
+    """One JSON record per line, parsed in line chunks."""
+
+    name = "ndjson"
+    extensions = (".ndjson", ".jsonl")
+
+    def load(self, path, start_date=None, end_date=None):
+        # Filtering chunk by chunk keeps memory bounded by the requested range
+        parts = [
+            filter_date_range(chunk, start_date, end_date)
+            for chunk in self.iter_chunks(path, 100_000)
+        ]
+        if not parts:
+            return pd.DataFrame(columns=MERGE_KEYS)
+        return pd.concat(parts, ignore_index=True)
+
+    def iter_chunks(self, path, chunk_size, block_size=1 << 20):
+        with pd.read_json(
+            path,
+            lines=True,
+            chunksize=chunk_size,
+            dtype={"campaign_id": str},
+            precise_float=True,
+        ) as reader:
+            for chunk in reader:
+                yield normalize_feed(chunk)
+
+
+class CsvFormat(FeedFormat):
+    """Comma-separated values with a header row."""
+
+    name = "csv"
+    extensions = (".csv",)
+
+    def load(self, path, start_date=None, end_date=None):
+        try:
+            import pyarrow  # noqa: F401
+
+            df = pd.read_csv(path, engine="pyarrow", dtype={"campaign_id": str})
+        except ImportError:
+            df = pd.read_csv(path, dtype={"campaign_id": str})
+        return filter_date_range(normalize_feed(df), start_date, end_date)
+
+    def iter_chunks(self, path, chunk_size, block_size=1 << 20):
+        with pd.read_csv(
+            path, chunksize=chunk_size, dtype={"campaign_id": str}
+        ) as reader:
+            for chunk in reader:
+                yield normalize_feed(chunk)
+
+
+class ParquetFormat(FeedFormat):
+    """
+    Apache Parquet, read with pyarrow.
+
+    Only feed columns are read, and a date range is pushed down as a filter
+    so that row groups outside it are skipped using their statistics.
+    """
+
+    name = "parquet"
+    extensions = (".parquet", ".pq")
+
+    def load(self, path, start_date=None, end_date=None):
+        pq = _import_parquet()
+        schema = pq.read_schema(path)
+        columns = [c for c in FEED_COLUMNS if c in schema.names]
+        filters = self._date_filters(schema, start_date, end_date)
+        table = pq.read_table(path, columns=columns, filters=filters or None)
+        return filter_date_range(
+            normalize_feed(table.to_pandas()), start_date, end_date
+        )
+
+    def iter_chunks(self, path, chunk_size, block_size=1 << 20):
+        pq = _import_parquet()
+        parquet_file = pq.ParquetFile(path)
+        columns = [c for c in FEED_COLUMNS if c in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield normalize_feed(batch.to_pandas())
+
+    @staticmethod
+    def _date_filters(schema, start_date, end_date) -> list:
+        """Build pyarrow filters on 'date' matching the column's type."""
+        import pyarrow as pa
+
+        if "date" not in schema.names:
+            return []
+        kind = schema.field("date").type
+        if pa.types.is_timestamp(kind):
+            convert = pd.Timestamp
+        elif pa.types.is_date(kind):
+
+            def convert(value):
+                return pd.Timestamp(value).date()
+
+        else:
+            # ISO strings sort like the dates they hold
+            convert = str
+        filters = []
+        if start_date is not None:
+            filters.append(("date", ">=", convert(start_date)))
+        if end_date is not None:
+            end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+            value = convert(end.strftime("%Y-%m-%d"))
+            filters.append(("date", "<", value))
+        return filters
+
+
+def _import_parquet():
+    """Import pyarrow.parquet, which is only needed for Parquet feeds."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet feeds requires pyarrow") from e
+    return pq
+
+
+# Registered formats by name; extend with `register_format`
+FEED_FORMATS: Dict[str, FeedFormat] = {}
+
+
+def register_format(feed_format: FeedFormat) -> FeedFormat:
+    """
+    Makes a format available to `detect_format` and the readers.
+
+    Args:
+        feed_format (FeedFormat): Format to register under its name.
+
+    Returns:
+        FeedFormat: The registered format.
+    """
+    FEED_FORMATS[feed_format.name] = feed_format
+    return feed_format
+
+
+for _feed_format in (JsonArrayFormat(), NdjsonFormat(), CsvFormat(), ParquetFormat()):
+    register_format(_feed_format)
+
+
+def detect_format(path: str) -> FeedFormat:
+    """
+    Picks the format of a feed from its extension or, failing that, its content.
+
+    `.json` files starting with '{' are treated as NDJSON, matching
+    `iter_json_records`. Unknown extensions are sniffed: Parquet's magic
+    bytes, then '[' for a JSON array, '{' for NDJSON, otherwise CSV.
+
+    Args:
+        path (str): Path to the feed.
+
+    Returns:
+        FeedFormat: The registered format for the file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    is_json = extension in FEED_FORMATS["json"].extensions
+    if not is_json:
+        for feed_format in FEED_FORMATS.values():
+            if extension in feed_format.extensions:
+                return feed_format
+
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if head.startswith(b"PAR1"):
+        return FEED_FORMATS["parquet"]
+    first = head.lstrip()[:1]
+    if first == b"[":
+        return FEED_FORMATS["json"]
+    if first == b"{":
+        return FEED_FORMATS["ndjson"]
+    return FEED_FORMATS["json" if is_json else "csv"]
+
+
+def load_feed(
+    path: str, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Loads a feed in whatever registered format it is in.
+
+    Args:
+        path (str): Path to the feed.
+        start_date (str, optional): First date to keep (YYYY-MM-DD).
+        end_date (str, optional): Last date to keep (YYYY-MM-DD).
+
+    Returns:
+        pd.DataFrame: Feed rows.
+    """
+    return detect_format(path).load(path, start_date, end_date)
+
+
+class StreamingJsonDataReader(JsonDataReader):
+    """
+    Bounded-memory variant of JsonDataReader for very large feeds.
+
+    Both feeds are parsed in fixed-size chunks and their rows are spilled
+    to per-date pickle files in a temporary directory. Each date is then
+    merged on its own, so peak memory depends on the largest single day
+    rather than on the size of the whole file.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 100_000,
+        spill_dir: Optional[str] = None,
+        block_size: int = 1 << 20,
+        compact: bool = False,
+    ):
+        """
+        Initialize the streaming reader.
+
+        Args:
+            chunk_size (int): Number of records parsed per chunk.
+            spill_dir (str, optional): Parent directory for spill files.
+                                       Defaults to the system temp directory.
+            block_size (int): Number of characters read from disk per block.
+            compact (bool): Use the compact dtypes (see JsonDataReader).
+        """
+        super().__init__(compact=compact)
+        self.chunk_size = chunk_size
+        self.spill_dir = spill_dir
+        self.block_size = block_size
+
+    @handle_exceptions
+    def read(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads and merges both files, returning the same frame as JsonDataReader.
+
+        Prefer `read_partitions` for large inputs; this method concatenates
+        every partition and is kept for interface compatibility.
+
+        Args:
+            spend_path (str): Path to the file containing spending data.
+            conv_path (str): Path to the file containing conversions data.
+            start_date (str, optional): Drop rows before this date (YYYY-MM-DD).
+            end_date (str, optional): Drop rows after this date (YYYY-MM-DD).
+
+        Returns:
+            pd.DataFrame: The merged DataFrame.
+        """
+        parts = [
+            df
+            for _, df in self.read_partitions(
+                spend_path, conv_path, start_date, end_date
+            )
+        ]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    @handle_exceptions
+    def read_partitions(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Streams both files to per-date spill files and merges one date at a time.
+
+        As with JsonDataReader, an unreadable feed is logged and yields no
+        partitions.
+
+        Args:
+            spend_path (str): Path to the file containing spending data.
+            conv_path (str): Path to the file containing conversions data.
+            start_date (str, optional): First date to yield (YYYY-MM-DD).
+            end_date (str, optional): Last date to yield (YYYY-MM-DD).
+
+        Yields:
+            Tuple[str, pd.DataFrame]: (date string, merged partition) pairs
+                                      in ascending date order.
+        """
+        with tempfile.TemporaryDirectory(dir=self.spill_dir) as spill_dir:
+            spend_dates, spend_columns = self._spill(
+                spend_path, "spend", spill_dir, start_date, end_date
+            )
+            conv_dates, conv_columns = self._spill(
+                conv_path, "conv", spill_dir, start_date, end_date
+            )
+            dates = spend_dates | conv_dates
+            logging.info(f"Spilled feeds into {len(dates)} date partitions")
+
+            collapsed = {spend_path: 0, conv_path: 0}
+            for date_str in sorted(dates):
+                with registry.timed("merge", partition=date_str) as timer:
+                    spend_df, dupes = collapse_duplicates(
+                        self._load_spill(spill_dir, "spend", date_str, spend_columns)
+                    )
+                    collapsed[spend_path] += dupes
+                    conv_df, dupes = collapse_duplicates(
+                        self._load_spill(spill_dir, "conv", date_str, conv_columns)
+                    )
+                    collapsed[conv_path] += dupes
+                    merged_df = merge_feeds(spend_df, conv_df)
+                    merged_df["date"] = pd.to_datetime(merged_df["date"])
+                    if self.compact:
+                        merged_df = compact_frame(merged_df)
+                    timer.rows = len(merged_df)
+                yield date_str, merged_df
+            for path, count in collapsed.items():
+                log_collapsed(path, count)
+
+    def _spill(
+        self,
+        path: str,
+        side: str,
+        spill_dir: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+    ) -> Tuple[set, List[str]]:
+        """
+        Append each chunk's rows to one spill file per date.
+
+        Frames are pickled, so values and dtypes come back exactly as parsed.
+
+        Returns the dates spilled and the value columns seen, so dates where
+        this side has no rows still merge with the same columns.
+        """
+        dates = set()
+        columns = {}
+        with registry.timed("read") as timer:
+            chunks = detect_format(path).iter_chunks(
+                path, self.chunk_size, self.block_size
+            )
+            for chunk in chunks:
+                timer.rows += len(chunk)
+                columns.update(dict.fromkeys(value_columns(chunk)))
+                keys = pd.to_datetime(chunk["date"]).dt.strftime("%Y-%m-%d")
+                for date_str, part in chunk.groupby(keys):
+                    if not in_range(date_str, start_date, end_date):
+                        continue
+                    spill_path = os.path.join(spill_dir, f"{side}-{date_str}.pkl")
+                    with open(spill_path, "ab") as f:
+                        pickle.dump(
+                            part.assign(date=date_str), f, pickle.HIGHEST_PROTOCOL
+                        )
+                    dates.add(date_str)
+        return dates, list(columns) or ["spend" if side == "spend" else "conversions"]
+
+    @staticmethod
+    def _load_spill(
+        spill_dir: str, side: str, date_str: str, columns: List[str]
+    ) -> pd.DataFrame:
+        """Load one date's spill file, or an empty frame if the side has no rows."""
+        path = os.path.join(spill_dir, f"{side}-{date_str}.pkl")
+        if not os.path.exists(path):
+            return pd.DataFrame(
+                {
+                    "date": pd.Series(dtype=str),
+                    "campaign_id": pd.Series(dtype=str),
+                    **{column: pd.Series(dtype=float) for column in columns},
+                }
+            )
+        parts = []
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    parts.append(pickle.load(f))
+                except EOFError:
+                    break
+        df = pd.concat(parts, ignore_index=True)
+        df["date"] = df["date"].astype(str)
+        df["campaign_id"] = df["campaign_id"].astype(str)
+        return df
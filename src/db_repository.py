@@ -1,34 +1,384 @@
 from abc import ABC, abstractmethod
+import io
+import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import Column, String, Float, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime
 from sqlalchemy.ext.declarative import declarative_base
+import numpy as np
 import pandas as pd
+from src.cpa_calculator import RATIOS, calculate_cpa_vectorized
+from src.data_reader import partition_fingerprint
+from src.metrics import count_retry, registry
 from tenacity import retry, stop_after_attempt, wait_fixed
 import logging
 
 Base = declarative_base()
 
+# PostgreSQL accepts at most 65535 bind parameters per statement
+MAX_BIND_PARAMS = 65535
+
+
+def iter_batches(data: pd.DataFrame, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Split a DataFrame into consecutive row slices of at most `batch_size` rows.
+
+    Args:
+        data (pd.DataFrame): Data to split.
+        batch_size (int): Maximum number of rows per slice.
+
+    Yields:
+        pd.DataFrame: Row slices in their original order.
+    """
+    for start in range(0, len(data), batch_size):
+        yield data.iloc[start : start + batch_size]
+
 
 class DailyStats(Base):
     """
     SQLAlchemy ORM model representing daily campaign statistics.
 
     Attributes:
-        date (str): The date of the record (ISO format).
-        campaign_id (str): Unique identifier of the campaign.
+        date (date): The date of the record.
+        campaign_id (str): Unique identifier of the campaign (indexed).
         spend (float): Amount spent on the campaign.
         conversions (int): Number of conversions for the campaign.
         cpa (float, optional): Cost per acquisition (calculated).
+        clicks (int, optional): Number of clicks, if the feeds provide it.
+        revenue (float, optional): Revenue, if the feeds provide it.
+        cpc (float, optional): Cost per click (calculated, if configured).
+        cvr (float, optional): Conversions per click (calculated, if configured).
+        roas (float, optional): Revenue per unit spent (calculated, if configured).
     """
 
     __tablename__ = "daily_stats"
 
-    date = Column(String, primary_key=True)
-    campaign_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    campaign_id = Column(String, primary_key=True, index=True)
     spend = Column(Float)
     conversions = Column(Integer)
     cpa = Column(Float, nullable=True)
+    clicks = Column(Integer, nullable=True)
+    revenue = Column(Float, nullable=True)
+    cpc = Column(Float, nullable=True)
+    cvr = Column(Float, nullable=True)
+    roas = Column(Float, nullable=True)
+
+
+class ProcessedPartition(Base):
+    """
+    SQLAlchemy ORM model recording which dates have been fully stored.
+
+    Acts as a watermark table so that existence checks never scan
+    `daily_stats`, and keeps a content fingerprint per date so that only
+    dates whose input changed are reprocessed.
+
+    Attributes:
+        date (str): The processed date (YYYY-MM-DD).
+        records (int): Number of rows written for the date.
+        fingerprint (str, optional): Content fingerprint of the stored rows.
+        processed_at (datetime): When the date was last written.
+    """
+
+    __tablename__ = "processed_partitions"
+
+    date = Column(String, primary_key=True)
+    records = Column(Integer)
+    fingerprint = Column(String(64), nullable=True)
+    processed_at = Column(DateTime, server_default=sa.func.now())
+
+
+class RunWatermark(Base):
+    """
+    SQLAlchemy ORM model holding the high-water mark of scheduled runs.
+
+    Every date up to and including `date` has been fully processed, so a
+    scheduled run only needs to cover the days after it.
+
+    Attributes:
+        name (str): Watermark name; "daily" for the daily schedule.
+        date (str): Last date of the contiguous processed range (YYYY-MM-DD).
+        updated_at (datetime): When the watermark last advanced.
+    """
+
+    __tablename__ = "run_watermarks"
+
+    name = Column(String, primary_key=True)
+    date = Column(String, nullable=False)
+    updated_at = Column(DateTime, server_default=sa.func.now())
+
+
+class DateLease(Base):
+    """
+    SQLAlchemy ORM model for time-limited claims on dates during a backfill.
+
+    A worker may only process a date while it holds an unexpired lease on
+    it, so any number of processes or replicas can share a backfill. A lease
+    left behind by a crashed worker expires and is claimed by another one.
+
+    Attributes:
+        date (str): The leased date (YYYY-MM-DD).
+        owner (str, optional): Worker currently holding the lease.
+        expires_at (datetime): UTC time after which the lease can be taken over.
+        attempts (int): Claims since the date was last completed.
+    """
+
+    __tablename__ = "date_leases"
+
+    date = Column(String, primary_key=True)
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+
+
+def utcnow() -> datetime.datetime:
+    """Current UTC time as a naive datetime, as stored in lease columns."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class WeeklyStats(Base):
+    """
+    Per-campaign totals for each Monday-to-Sunday week, maintained on upsert.
+
+    Attributes:
+        period_start (date): Monday that starts the week.
+        campaign_id (str): Unique identifier of the campaign.
+        spend (float): Total spend over the week.
+        conversions (int): Total conversions over the week.
+        cpa (float, optional): spend / conversions of the totals.
+    """
+
+    __tablename__ = "weekly_stats"
+
+    period_start = Column(Date, primary_key=True)
+    campaign_id = Column(String, primary_key=True)
+    spend = Column(Float, nullable=False, default=0)
+    conversions = Column(Integer, nullable=False, default=0)
+    cpa = Column(Float, nullable=True)
+
+
+class MonthlyStats(Base):
+    """
+    Per-campaign totals for each calendar month, maintained on upsert.
+
+    Attributes:
+        period_start (date): First day of the month.
+        campaign_id (str): Unique identifier of the campaign.
+        spend (float): Total spend over the month.
+        conversions (int): Total conversions over the month.
+        cpa (float, optional): spend / conversions of the totals.
+    """
+
+    __tablename__ = "monthly_stats"
+
+    period_start = Column(Date, primary_key=True)
+    campaign_id = Column(String, primary_key=True)
+    spend = Column(Float, nullable=False, default=0)
+    conversions = Column(Integer, nullable=False, default=0)
+    cpa = Column(Float, nullable=True)
+
+
+# Rollup tables with the pandas period frequency and SQL unit of their buckets
+ROLLUPS = ((WeeklyStats, "W-SUN", "week"), (MonthlyStats, "M", "month"))
+
+
+def plan_rollup_segments(
+    start_date: str, end_date: str
+) -> List[Tuple[str, datetime.date, datetime.date]]:
+    """
+    Tile a date range with the coarsest whole buckets available.
+
+    Whole calendar months come from `monthly_stats`, whole weeks of what
+    remains from `weekly_stats`, and leftover days from `daily_stats`.
+
+    Args:
+        start_date (str): First date of the range (ISO format).
+        end_date (str): Last date of the range (ISO format).
+
+    Returns:
+        List[Tuple[str, date, date]]: (grain, first bucket start, last bucket
+            start) segments, with grain one of "month", "week" or "day".
+    """
+
+    def tile(start, end, freq, grain, finer):
+        if start > end:
+            return []
+        first = pd.Period(start, freq=freq)
+        if first.start_time != start:
+            first += 1
+        last = pd.Period(end, freq=freq)
+        if last.end_time.normalize() != end:
+            last -= 1
+        if first > last:
+            return finer(start, end)
+        return (
+            finer(start, first.start_time - pd.Timedelta(days=1))
+            + [(grain, first.start_time.date(), last.start_time.date())]
+            + finer(last.end_time.normalize() + pd.Timedelta(days=1), end)
+        )
+
+    def days(start, end):
+        return [] if start > end else [("day", start.date(), end.date())]
+
+    def weeks(start, end):
+        return tile(start, end, "W-SUN", "week", days)
+
+    return tile(pd.Timestamp(start_date), pd.Timestamp(end_date), "M", "month", weeks)
+
+
+def migrate_schema(engine: sa.Engine):
+    """
+    Bring tables created by earlier versions up to the current schema.
+
+    - Adds `processed_partitions.fingerprint`.
+    - Seeds an empty `processed_partitions` with the dates already stored in
+      `daily_stats`, with a NULL fingerprint, so an upgraded install does
+      not treat its history as unprocessed.
+    - Adds the optional metric columns of `daily_stats` ('clicks',
+      'revenue', 'cpc', 'cvr' and 'roas') as nullable columns.
+    - Converts a text `daily_stats.date` column to a native DATE, truncating
+      values such as '2025-06-04 00:00:00' to the day.
+    - Creates the `campaign_id` index on an existing `daily_stats` table.
+
+    Each step is skipped when already applied, so this is safe at every start.
+
+    Args:
+        engine (sa.Engine): SQLAlchemy database engine.
+    """
+    inspector = sa.inspect(engine)
+    fingerprint_missing = "fingerprint" not in {
+        c["name"] for c in inspector.get_columns("processed_partitions")
+    }
+    daily_columns = inspector.get_columns("daily_stats")
+    metric_columns_missing = [
+        c
+        for c in DailyStats.__table__.columns
+        if c.name not in {column["name"] for column in daily_columns}
+    ]
+    date_column = next(c for c in daily_columns if c["name"] == "date")
+    date_is_text = isinstance(date_column["type"], sa.String)
+    legacy_indexes = inspector.get_indexes("daily_stats") if date_is_text else []
+
+    with engine.begin() as conn:
+        if fingerprint_missing:
+            conn.exec_driver_sql(
+                "ALTER TABLE processed_partitions ADD COLUMN fingerprint VARCHAR(64)"
+            )
+        for column in metric_columns_missing:
+            conn.exec_driver_sql(
+                f"ALTER TABLE daily_stats ADD COLUMN {column.name} "
+                f"{column.type.compile(dialect=engine.dialect)}"
+            )
+        if date_is_text and engine.dialect.name == "postgresql":
+            conn.exec_driver_sql(
+                "ALTER TABLE daily_stats ALTER COLUMN date TYPE DATE "
+                "USING CAST(LEFT(date, 10) AS DATE)"
+            )
+        elif date_is_text:
+            # SQLite cannot change a column type in place; rebuild the table
+            conn.exec_driver_sql("ALTER TABLE daily_stats RENAME TO daily_stats_legacy")
+            for index in legacy_indexes:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index['name']}")
+            DailyStats.__table__.create(conn)
+            values = [c.name for c in DailyStats.__table__.columns][1:]
+            conn.exec_driver_sql(
+                f"INSERT OR REPLACE INTO daily_stats (date, {', '.join(values)}) "
+                f"SELECT substr(date, 1, 10), {', '.join(values)} "
+                "FROM daily_stats_legacy"
+            )
+            conn.exec_driver_sql("DROP TABLE daily_stats_legacy")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_daily_stats_campaign_id "
+            "ON daily_stats (campaign_id)"
+        )
+        processed = ProcessedPartition.__table__
+        seeded = conn.execute(
+            processed.insert().from_select(
+                ["date", "records", "fingerprint"],
+                sa.select(sa.cast(DailyStats.date, String), sa.func.count(), sa.null())
+                .where(~sa.exists(sa.select(processed.c.date)))
+                .group_by(DailyStats.date),
+            )
+        ).rowcount
+    if seeded and seeded > 0:
+        logging.info(f"Seeded processed_partitions with {seeded} stored dates.")
+    if date_is_text:
+        logging.info("Migrated daily_stats.date to a DATE column.")
+
+
+def create_partitioned_daily_stats(conn: sa.Connection, name: str = "daily_stats"):
+    """
+    Create `daily_stats` as a PostgreSQL table range-partitioned by `date`.
+
+    Args:
+        conn (sa.Connection): Open PostgreSQL connection.
+        name (str, optional): Table name to create. Defaults to "daily_stats".
+    """
+    ddl = str(CreateTable(DailyStats.__table__).compile(dialect=conn.dialect))
+    ddl = ddl.strip().replace("daily_stats", name, 1)
+    conn.exec_driver_sql(f"{ddl} PARTITION BY RANGE (date)")
+
+
+def create_month_partitions(conn: sa.Connection, months: Iterable[str]):
+    """
+    Create the monthly partitions of `daily_stats` that do not exist yet.
+
+    Args:
+        conn (sa.Connection): Open PostgreSQL connection.
+        months (Iterable[str]): Months as YYYY-MM strings.
+    """
+    for month in sorted(months):
+        period = pd.Period(month, freq="M")
+        start = period.start_time.strftime("%Y-%m-%d")
+        end = (period + 1).start_time.strftime("%Y-%m-%d")
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS daily_stats_{period.strftime('y%Ym%m')} "
+            f"PARTITION OF daily_stats FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+
+def partition_daily_stats(engine: sa.Engine):
+    """
+    Convert an existing plain `daily_stats` table to monthly range partitions.
+
+    Rows are copied into a new partitioned table in one transaction and the
+    old table is dropped. Does nothing if the table is already partitioned.
+
+    Args:
+        engine (sa.Engine): SQLAlchemy engine for a PostgreSQL database.
+    """
+    with engine.begin() as conn:
+        partitioned = conn.exec_driver_sql(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'daily_stats'"
+        ).first()
+        if partitioned:
+            return
+        conn.exec_driver_sql("ALTER TABLE daily_stats RENAME TO daily_stats_legacy")
+        conn.exec_driver_sql(
+            "ALTER TABLE daily_stats_legacy "
+            "RENAME CONSTRAINT daily_stats_pkey TO daily_stats_legacy_pkey"
+        )
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_daily_stats_campaign_id")
+        create_partitioned_daily_stats(conn)
+        months = conn.exec_driver_sql(
+            "SELECT DISTINCT to_char(date, 'YYYY-MM') FROM daily_stats_legacy"
+        ).scalars()
+        create_month_partitions(conn, months)
+        column_list = ", ".join(c.name for c in DailyStats.__table__.columns)
+        conn.exec_driver_sql(
+            f"INSERT INTO daily_stats ({column_list}) "
+            f"SELECT {column_list} FROM daily_stats_legacy"
+        )
+        conn.exec_driver_sql("DROP TABLE daily_stats_legacy")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_daily_stats_campaign_id "
+            "ON daily_stats (campaign_id)"
+        )
+    logging.info("Converted daily_stats to a monthly partitioned table.")
 
 
 class DatabaseRepository(ABC):
@@ -60,60 +410,1042 @@ class DatabaseRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_processed_dates(self, start_date: str, end_date: str) -> Set[str]:
+        """
+        Return every already-processed date within an inclusive range.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+
+        Returns:
+            Set[str]: Processed dates as YYYY-MM-DD strings.
+        """
+        pass
+
+    @abstractmethod
+    def get_fingerprints(
+        self, start_date: str, end_date: str
+    ) -> Dict[str, Optional[str]]:
+        """
+        Return the stored content fingerprint of every processed date in a range.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+
+        Returns:
+            Dict[str, Optional[str]]: Fingerprints keyed by YYYY-MM-DD date.
+        """
+        pass
+
+    @abstractmethod
+    def read_totals(
+        self,
+        start_date: str,
+        end_date: str,
+        campaign_ids: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Return per-campaign spend, conversions and CPA totals over a date range.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+            campaign_ids (List[str], optional): Restrict to these campaigns.
+
+        Returns:
+            pd.DataFrame: One row per campaign with 'campaign_id', 'spend',
+                          'conversions' and 'cpa' columns.
+        """
+        pass
+
+    @abstractmethod
+    def read_range(
+        self,
+        start_date: str,
+        end_date: str,
+        campaign_ids: Optional[Iterable[str]] = None,
+        chunk_size: int = 100_000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream the stored daily rows of a date range in bounded-size chunks.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+            campaign_ids (Iterable[str], optional): Restrict to these campaigns.
+            chunk_size (int, optional): Most rows per chunk. Defaults to 100000.
+
+        Yields:
+            pd.DataFrame: Rows ordered by date and campaign, with one column
+                          per `daily_stats` column.
+        """
+        pass
+
+    @abstractmethod
+    def get_watermark(self, name: str = "daily") -> Optional[str]:
+        """
+        Return the last date through which every date was fully processed.
+
+        Args:
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            Optional[str]: The date (YYYY-MM-DD), or None before the first run.
+        """
+        pass
+
+    @abstractmethod
+    def advance_watermark(
+        self, start_date: str, end_date: str, name: str = "daily"
+    ) -> bool:
+        """
+        Move the watermark to the end of a fully processed range.
+
+        The first processed range sets the watermark. Later ranges move
+        it only forward, and only if they start no later than the day
+        after it, so a gap is never skipped over.
+
+        Args:
+            start_date (str): First date of the processed range (ISO format).
+            end_date (str): Last date of the processed range (ISO format).
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            bool: True if the watermark moved.
+        """
+        pass
+
+    @abstractmethod
+    def claim_date(self, date: str, owner: str, lease_seconds: float) -> Optional[int]:
+        """
+        Take the lease on a date unless another owner holds an unexpired one.
+
+        Args:
+            date (str): The date to claim (ISO format).
+            owner (str): Identifier of the claiming worker.
+            lease_seconds (float): Lease duration.
+
+        Returns:
+            Optional[int]: The attempt number if claimed, otherwise None.
+        """
+        pass
+
+    @abstractmethod
+    def renew_leases(
+        self, dates: Iterable[str], owner: str, lease_seconds: float
+    ) -> int:
+        """
+        Extend the leases an owner still holds.
+
+        Args:
+            dates (Iterable[str]): Dates whose leases to extend.
+            owner (str): Identifier of the worker holding the leases.
+            lease_seconds (float): New lease duration from now.
+
+        Returns:
+            int: Number of leases extended.
+        """
+        pass
+
+    @abstractmethod
+    def release_date(self, date: str, owner: str, completed: bool):
+        """
+        Give up a lease so the date can be claimed again immediately.
+
+        Args:
+            date (str): The leased date (ISO format).
+            owner (str): Identifier of the worker holding the lease.
+            completed (bool): Whether the date was stored successfully.
+        """
+        pass
+
+
+class SqlRepository(DatabaseRepository):
+    """
+    Shared SQLAlchemy implementation of the DatabaseRepository.
+
+    Subclasses provide the dialect-specific `dialect_insert` construct
+    (used for `ON CONFLICT` upserts) and the `upsert` write path.
+
+    In delta mode, `upsert` first compares the rows with the stored ones
+    and only writes (and rolls up) keys that are new or whose values
+    changed. The conflict update additionally carries `WHERE ... IS
+    DISTINCT FROM`, so a row changed to the same values concurrently is
+    not rewritten either. Each upsert then returns and logs its inserted,
+    updated and unchanged counts.
+
+    Attributes:
+        engine (sa.Engine): SQLAlchemy database engine.
+        delta (bool): Skip writes of unchanged rows.
+    """
+
+    dialect_insert = staticmethod(postgresql.insert)
+
+    def __init__(self, engine: sa.Engine, delta: bool = False):
+        """
+        Initialize the repository and create necessary tables if not present.
+
+        Args:
+            engine (sa.Engine): SQLAlchemy database engine.
+            delta (bool, optional): Skip writes of unchanged rows. Defaults to False.
+        """
+        self.engine = engine
+        self.delta = delta
+        new_rollups = not sa.inspect(engine).has_table(WeeklyStats.__tablename__)
+        self._create_schema()
+        migrate_schema(engine)
+        if new_rollups:
+            self.rebuild_rollups()
+
+    def _create_schema(self):
+        """Create any missing tables and their indexes."""
+        Base.metadata.create_all(self.engine)
+
+    @staticmethod
+    def _columns(data: pd.DataFrame) -> List[str]:
+        """Return the `daily_stats` columns present in the DataFrame, in table order."""
+        return [c.name for c in DailyStats.__table__.columns if c.name in data.columns]
+
+    @staticmethod
+    def _records(batch: pd.DataFrame) -> List[dict]:
+        """Convert rows to bind parameters, with NaN as NULL and dates as `date`."""
+        if "date" in batch.columns:
+            batch = batch.assign(date=pd.to_datetime(batch["date"]).dt.date)
+        # NaN (undefined CPA) must be written as NULL, not as a float NaN
+        return batch.astype(object).where(batch.notna(), None).to_dict("records")
+
+    @staticmethod
+    def _value_columns(columns: List[str]) -> List[str]:
+        """The written columns other than the primary key."""
+        return [c for c in columns if c not in ("date", "campaign_id")]
+
+    def _changed_where(
+        self, excluded, columns: List[str]
+    ) -> Optional[sa.ColumnElement]:
+        """Conflict-update condition limiting delta mode to changed rows."""
+        if not self.delta:
+            return None
+        table = DailyStats.__table__
+        return sa.or_(
+            *(
+                table.c[c].is_distinct_from(excluded[c])
+                for c in self._value_columns(columns)
+            )
+        )
+
+    def _diff(
+        self, conn: sa.Connection, data: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, Dict[str, int]]:
+        """
+        Compare rows with the stored ones.
+
+        Returns:
+            Tuple[pd.DataFrame, Dict[str, int]]: The new or changed rows, and
+                the 'inserted', 'updated' and 'unchanged' counts.
+        """
+        columns = self._value_columns(self._columns(data))
+        keys = pd.MultiIndex.from_arrays(
+            [pd.to_datetime(data["date"]).dt.date, data["campaign_id"].astype(str)]
+        )
+        stored = []
+        for start in range(0, len(keys), MAX_BIND_PARAMS // 2):
+            touched = sa.tuple_(DailyStats.date, DailyStats.campaign_id).in_(
+                keys[start : start + MAX_BIND_PARAMS // 2].tolist()
+            )
+            stored.extend(
+                conn.execute(
+                    sa.select(
+                        DailyStats.date,
+                        DailyStats.campaign_id,
+                        *(DailyStats.__table__.c[c] for c in columns),
+                    ).where(touched)
+                ).all()
+            )
+        stored = pd.DataFrame(
+            stored, columns=["date", "campaign_id", *columns]
+        ).set_index(["date", "campaign_id"])
+
+        exists = keys.isin(stored.index)
+        same = exists.copy()
+        current = stored.reindex(keys)
+        for column in columns:
+            new = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=float)
+            old = pd.to_numeric(current[column], errors="coerce").to_numpy(dtype=float)
+            same &= (new == old) | (np.isnan(new) & np.isnan(old))
+        counts = {
+            "inserted": int((~exists).sum()),
+            "updated": int((exists & ~same).sum()),
+            "unchanged": int(same.sum()),
+        }
+        return data[~same], counts
+
+    def _write(
+        self, conn: sa.Connection, data: pd.DataFrame, write_rows: Callable
+    ) -> Optional[Dict[str, int]]:
+        """
+        Run a dialect-specific row write together with its bookkeeping.
+
+        Subtracts the stored values of the touched keys from the rollups,
+        writes the rows, adds the new values back and records the processed
+        dates, all on the caller's transaction. In delta mode only new and
+        changed rows are written and rolled up.
+
+        Returns:
+            Optional[Dict[str, int]]: Inserted, updated and unchanged counts
+                                      in delta mode, otherwise None.
+        """
+        counts = None
+        changed = data
+        if self.delta and not data.empty:
+            changed, counts = self._diff(conn, data)
+            registry.record_writes(counts)
+        self._retract_rollups(conn, changed)
+        if not changed.empty:
+            write_rows(conn, changed)
+        self._apply_rollups(conn, changed)
+        self._mark_processed(conn, data)
+        return counts
+
+    @staticmethod
+    def _log_upsert(data: pd.DataFrame, counts: Optional[Dict[str, int]], how: str):
+        """Log the outcome of an upsert."""
+        if counts is None:
+            logging.info(f"{how} {len(data)} records.")
+        else:
+            logging.info(
+                f"{how} {len(data)} records: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['unchanged']} unchanged."
+            )
+
+    def _period_start(self, column: sa.ColumnElement, unit: str) -> sa.ColumnElement:
+        """SQL expression for the first day (Monday) of the week or month of a date."""
+        if self.engine.dialect.name == "sqlite":
+            if unit == "week":
+                return sa.func.date(column, "weekday 0", "-6 days")
+            return sa.func.date(column, "start of month")
+        return sa.cast(sa.func.date_trunc(unit, column), Date)
+
+    @staticmethod
+    def _rollup_cpa(spend, conversions) -> sa.ColumnElement:
+        """SQL CPA of rollup totals, NULL where spend or conversions is zero."""
+        return sa.case(
+            ((spend == 0) | (conversions == 0), sa.null()),
+            else_=spend / sa.cast(conversions, Float),
+        )
+
+    def _rollup_upsert(self, model, rows) -> sa.Insert:
+        """Build an insert into a rollup table that adds to existing totals."""
+        table = model.__table__
+        stmt = self.dialect_insert(model)
+        if rows is not None:
+            stmt = stmt.from_select(
+                ["period_start", "campaign_id", "spend", "conversions", "cpa"], rows
+            )
+        spend = table.c.spend + stmt.excluded.spend
+        conversions = table.c.conversions + stmt.excluded.conversions
+        return stmt.on_conflict_do_update(
+            index_elements=["period_start", "campaign_id"],
+            set_={
+                "spend": spend,
+                "conversions": conversions,
+                # CPA comes from the new totals, never from averaged daily CPAs
+                "cpa": self._rollup_cpa(spend, conversions),
+            },
+        )
+
+    def _retract_rollups(self, conn: sa.Connection, data: pd.DataFrame):
+        """Subtract the currently stored values of the touched keys from the rollups."""
+        keys = list(
+            zip(pd.to_datetime(data["date"]).dt.date, data["campaign_id"].astype(str))
+        )
+        for start in range(0, len(keys), MAX_BIND_PARAMS // 2):
+            touched = sa.tuple_(DailyStats.date, DailyStats.campaign_id).in_(
+                keys[start : start + MAX_BIND_PARAMS // 2]
+            )
+            for model, _, unit in ROLLUPS:
+                period_start = self._period_start(DailyStats.date, unit)
+                spend = -sa.func.coalesce(sa.func.sum(DailyStats.spend), 0)
+                conversions = -sa.func.coalesce(sa.func.sum(DailyStats.conversions), 0)
+                rows = (
+                    sa.select(
+                        period_start,
+                        DailyStats.campaign_id,
+                        spend,
+                        conversions,
+                        self._rollup_cpa(spend, conversions),
+                    )
+                    .where(touched)
+                    .group_by(period_start, DailyStats.campaign_id)
+                )
+                conn.execute(self._rollup_upsert(model, rows))
+
+    def _apply_rollups(self, conn: sa.Connection, data: pd.DataFrame):
+        """Add the spend and conversions of the written rows to the rollups."""
+        if data.empty:
+            return
+        values = data[["campaign_id", "spend", "conversions"]].fillna(0)
+        dates = pd.to_datetime(data["date"])
+
+        for model, freq, _ in ROLLUPS:
+            buckets = (
+                values.groupby(
+                    [
+                        dates.dt.to_period(freq).dt.start_time.dt.date.rename(
+                            "period_start"
+                        ),
+                        "campaign_id",
+                    ]
+                )[["spend", "conversions"]]
+                .sum()
+                .reset_index()
+            )
+            buckets["spend"] = buckets["spend"].astype(float)
+            buckets["conversions"] = buckets["conversions"].round().astype(int)
+            # Buckets inserted rather than added to need their CPA as well
+            buckets["cpa"] = calculate_cpa_vectorized(
+                buckets["spend"], buckets["conversions"]
+            )
+            conn.execute(
+                self._rollup_upsert(model, None),
+                buckets.astype(object).where(buckets.notna(), None).to_dict("records"),
+            )
+
+    def rebuild_rollups(self, chunk_size: int = 100_000):
+        """
+        Recompute `weekly_stats` and `monthly_stats` from `daily_stats`.
+
+        Used when the rollup tables are first created next to existing data.
+
+        Args:
+            chunk_size (int, optional): Daily rows aggregated per round.
+        """
+        with self.engine.begin() as conn:
+            for model, _, _ in ROLLUPS:
+                conn.execute(sa.delete(model))
+            query = sa.select(
+                DailyStats.date,
+                DailyStats.campaign_id,
+                DailyStats.spend,
+                DailyStats.conversions,
+            )
+            for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+                self._apply_rollups(conn, chunk)
+        logging.info("Rebuilt weekly and monthly rollups.")
+
+    def _mark_processed(self, conn: sa.Connection, data: pd.DataFrame):
+        """Record the dates and fingerprints written by an upsert."""
+        if data.empty:
+            return
+        keys = pd.to_datetime(data["date"]).dt.strftime("%Y-%m-%d")
+        metrics = [name for name in RATIOS if name in data.columns]
+        stmt = self.dialect_insert(ProcessedPartition).values(
+            [
+                {
+                    "date": date_str,
+                    "records": len(part),
+                    "fingerprint": partition_fingerprint(part, metrics),
+                }
+                for date_str, part in data.groupby(keys)
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date"],
+            set_={
+                "records": stmt.excluded.records,
+                "fingerprint": stmt.excluded.fingerprint,
+                "processed_at": sa.func.now(),
+            },
+        )
+        conn.execute(stmt)
+
+    def check_date_exists(self, date: str) -> bool:
+        """
+        Check if data for the given date already exists in the database.
+
+        Args:
+            date (str): Date string in ISO format.
+
+        Returns:
+            bool: True if the date is recorded in `processed_partitions`.
+        """
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                sa.select(ProcessedPartition.date).where(
+                    ProcessedPartition.date == date
+                )
+            ).fetchone()
+            return result is not None
+
+    def get_processed_dates(self, start_date: str, end_date: str) -> Set[str]:
+        """
+        Fetch all processed dates in a range with a single primary-key range scan.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+
+        Returns:
+            Set[str]: Processed dates as YYYY-MM-DD strings.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sa.select(ProcessedPartition.date).where(
+                    ProcessedPartition.date.between(start_date, end_date)
+                )
+            )
+            return {row.date for row in rows}
+
+    def get_fingerprints(
+        self, start_date: str, end_date: str
+    ) -> Dict[str, Optional[str]]:
+        """
+        Fetch stored fingerprints for a range with a single primary-key range scan.
+
+        Dates processed before fingerprints were recorded map to None.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+
+        Returns:
+            Dict[str, Optional[str]]: Fingerprints keyed by YYYY-MM-DD date.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sa.select(
+                    ProcessedPartition.date, ProcessedPartition.fingerprint
+                ).where(ProcessedPartition.date.between(start_date, end_date))
+            )
+            return {row.date: row.fingerprint for row in rows}
+
+    def claim_date(self, date: str, owner: str, lease_seconds: float) -> Optional[int]:
+        """
+        Atomically take the lease on a date if it is free or expired.
+
+        The claim is a single `INSERT ... ON CONFLICT DO UPDATE ... WHERE`,
+        so concurrent claimers cannot both succeed.
 
-class PostgresRepository(DatabaseRepository):
+        Args:
+            date (str): The date to claim (ISO format).
+            owner (str): Identifier of the claiming worker.
+            lease_seconds (float): Lease duration.
+
+        Returns:
+            Optional[int]: The attempt number if claimed, otherwise None.
+        """
+        now = utcnow()
+        expires_at = now + datetime.timedelta(seconds=lease_seconds)
+        leases = DateLease.__table__
+        stmt = self.dialect_insert(leases).values(
+            date=date, owner=owner, expires_at=expires_at, attempts=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date"],
+            set_={
+                "owner": owner,
+                "expires_at": expires_at,
+                "attempts": leases.c.attempts + 1,
+            },
+            where=leases.c.expires_at <= now,
+        ).returning(leases.c.attempts)
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).scalar()
+
+    def renew_leases(
+        self, dates: Iterable[str], owner: str, lease_seconds: float
+    ) -> int:
+        """
+        Extend the leases an owner still holds.
+
+        Args:
+            dates (Iterable[str]): Dates whose leases to extend.
+            owner (str): Identifier of the worker holding the leases.
+            lease_seconds (float): New lease duration from now.
+
+        Returns:
+            int: Number of leases extended.
+        """
+        dates = list(dates)
+        if not dates:
+            return 0
+        expires_at = utcnow() + datetime.timedelta(seconds=lease_seconds)
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                sa.update(DateLease)
+                .where(DateLease.date.in_(dates), DateLease.owner == owner)
+                .values(expires_at=expires_at)
+            )
+            return result.rowcount
+
+    def get_watermark(self, name: str = "daily") -> Optional[str]:
+        """
+        Return the last date through which every date was fully processed.
+
+        Args:
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            Optional[str]: The date (YYYY-MM-DD), or None before the first run.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(
+                sa.select(RunWatermark.date).where(RunWatermark.name == name)
+            ).scalar()
+
+    def advance_watermark(
+        self, start_date: str, end_date: str, name: str = "daily"
+    ) -> bool:
+        """
+        Move the watermark to the end of a fully processed range.
+
+        A single conditional upsert, so concurrent runs cannot move it back
+        or past a gap.
+
+        Args:
+            start_date (str): First date of the processed range (ISO format).
+            end_date (str): Last date of the processed range (ISO format).
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            bool: True if the watermark moved.
+        """
+        previous = datetime.date.fromisoformat(start_date) - datetime.timedelta(days=1)
+        stmt = self.dialect_insert(RunWatermark).values(name=name, date=end_date)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"date": stmt.excluded.date, "updated_at": sa.func.now()},
+            where=(RunWatermark.date >= previous.isoformat())
+            & (RunWatermark.date < stmt.excluded.date),
+        )
+        with self.engine.begin() as conn:
+            advanced = conn.execute(stmt).rowcount > 0
+        if advanced:
+            logging.info(f"Watermark '{name}' advanced to {end_date}.")
+        return advanced
+
+    def release_date(self, date: str, owner: str, completed: bool):
+        """
+        Give up a lease so the date can be claimed again immediately.
+
+        Completed dates reset their attempt count; failed ones keep it so
+        repeated failures stay visible.
+
+        Args:
+            date (str): The leased date (ISO format).
+            owner (str): Identifier of the worker holding the lease.
+            completed (bool): Whether the date was stored successfully.
+        """
+        values = {"owner": None, "expires_at": utcnow()}
+        if completed:
+            values["attempts"] = 0
+        with self.engine.begin() as conn:
+            conn.execute(
+                sa.update(DateLease)
+                .where(DateLease.date == date, DateLease.owner == owner)
+                .values(**values)
+            )
+
+    def read_totals(
+        self,
+        start_date: str,
+        end_date: str,
+        campaign_ids: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Aggregate per-campaign totals from the coarsest tables covering the range.
+
+        Whole months are read from `monthly_stats`, remaining whole weeks from
+        `weekly_stats` and only the leftover edge days from `daily_stats`.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+            campaign_ids (List[str], optional): Restrict to these campaigns.
+
+        Returns:
+            pd.DataFrame: One row per campaign with 'campaign_id', 'spend',
+                          'conversions' and 'cpa' columns.
+        """
+        sources = {
+            "month": (MonthlyStats, MonthlyStats.period_start),
+            "week": (WeeklyStats, WeeklyStats.period_start),
+            "day": (DailyStats, DailyStats.date),
+        }
+        frames = []
+        with self.engine.connect() as conn:
+            for grain, first, last in plan_rollup_segments(start_date, end_date):
+                model, period = sources[grain]
+                query = (
+                    sa.select(
+                        model.campaign_id,
+                        sa.func.sum(model.spend).label("spend"),
+                        sa.func.sum(model.conversions).label("conversions"),
+                    )
+                    .where(period.between(first, last))
+                    .group_by(model.campaign_id)
+                )
+                if campaign_ids is not None:
+                    query = query.where(model.campaign_id.in_(campaign_ids))
+                frames.append(pd.DataFrame(conn.execute(query).all()))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=["campaign_id", "spend", "conversions", "cpa"])
+        totals = (
+            pd.concat(frames)
+            .astype({"spend": "float64", "conversions": "int64"})
+            .groupby("campaign_id", as_index=False)[["spend", "conversions"]]
+            .sum()
+        )
+        totals["cpa"] = calculate_cpa_vectorized(
+            totals["spend"].to_numpy(), totals["conversions"].to_numpy()
+        )
+        return totals
+
+    def read_range(
+        self,
+        start_date: str,
+        end_date: str,
+        campaign_ids: Optional[Iterable[str]] = None,
+        chunk_size: int = 100_000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream `daily_stats` rows through a server-side cursor.
+
+        The date range and campaign filter become predicates on the primary
+        key `(date, campaign_id)`, which also provides the row order, so the
+        database neither scans nor sorts outside the range. Rows are fetched
+        `chunk_size` at a time (`stream_results`/`yield_per`), so memory is
+        bounded by one chunk however long the range is, and the first chunk
+        arrives before the query has finished. The connection stays open
+        until the iterator is exhausted or closed.
+
+        Args:
+            start_date (str): First date of the range (ISO format).
+            end_date (str): Last date of the range (ISO format).
+            campaign_ids (Iterable[str], optional): Restrict to these campaigns.
+            chunk_size (int, optional): Most rows per chunk. Defaults to 100000.
+
+        Yields:
+            pd.DataFrame: Rows ordered by date and campaign. 'date' is
+                          datetime64, integer columns are nullable Int64
+                          and float columns are float64 with NaN for NULL.
+
+        Raises:
+            ValueError: If `chunk_size` is less than 1.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        table = DailyStats.__table__
+        query = (
+            sa.select(table)
+            .where(
+                DailyStats.date.between(
+                    datetime.date.fromisoformat(start_date),
+                    datetime.date.fromisoformat(end_date),
+                )
+            )
+            .order_by(DailyStats.date, DailyStats.campaign_id)
+        )
+        if campaign_ids is not None:
+            query = query.where(DailyStats.campaign_id.in_(list(campaign_ids)))
+        dtypes = {
+            c.name: "Int64" if isinstance(c.type, Integer) else "float64"
+            for c in table.columns
+            if isinstance(c.type, (Integer, Float))
+        }
+
+        with self.engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=chunk_size
+            ).execute(query)
+            for rows in result.partitions():
+                with registry.timed("read_range", rows=len(rows)):
+                    chunk = pd.DataFrame(rows, columns=list(result.keys()))
+                    chunk = chunk.astype({"campaign_id": str, **dtypes}).assign(
+                        date=pd.to_datetime(chunk["date"])
+                    )
+                yield chunk
+
+
+class PostgresRepository(SqlRepository):
     """
     PostgreSQL implementation of the DatabaseRepository.
     Handles reading and writing of daily campaign statistics.
     """
 
-    def __init__(self, engine: sa.Engine):
+    def __init__(
+        self,
+        engine: sa.Engine,
+        bulk: bool = False,
+        batch_size: int = 100_000,
+        partition_by_month: bool = False,
+        delta: bool = False,
+    ):
         """
         Initialize the repository and create necessary tables if not present.
 
         Args:
             engine (sa.Engine): SQLAlchemy database engine.
+            bulk (bool, optional): Route `upsert` through `bulk_upsert`
+                (COPY into a staging table). Defaults to False.
+            batch_size (int, optional): Rows streamed per COPY batch in bulk mode.
+            partition_by_month (bool, optional): Keep `daily_stats` as a table
+                range-partitioned by month, converting an existing plain table
+                and creating missing monthly partitions on each upsert.
+            delta (bool, optional): Skip writes of unchanged rows. Defaults to False.
         """
-        self.engine = engine
-        Base.metadata.create_all(engine)
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.partition_by_month = partition_by_month
+        self._partitions: Set[str] = set()
+        super().__init__(engine, delta=delta)
+        if partition_by_month:
+            partition_daily_stats(engine)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-    def upsert(self, data: pd.DataFrame):
+    def _create_schema(self):
+        """Create missing tables, making a new `daily_stats` partitioned if enabled."""
+        if self.partition_by_month and not sa.inspect(self.engine).has_table(
+            "daily_stats"
+        ):
+            with self.engine.begin() as conn:
+                create_partitioned_daily_stats(conn)
+        super()._create_schema()
+
+    def _ensure_partitions(self, conn: sa.Connection, data: pd.DataFrame) -> Set[str]:
+        """
+        Create the monthly partitions needed by `data` that are not known yet.
+
+        Returns the months created, which the caller records in `_partitions`
+        only once the transaction has committed: a rolled-back write also
+        undoes the CREATE TABLE, so the next attempt must issue it again.
+        """
+        if not self.partition_by_month or data.empty:
+            return set()
+        months = set(pd.to_datetime(data["date"]).dt.strftime("%Y-%m")) - (
+            self._partitions
+        )
+        create_month_partitions(conn, months)
+        return months
+
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2), before_sleep=count_retry)
+    def upsert(self, data: pd.DataFrame) -> Optional[Dict[str, int]]:
         """
         Insert or update campaign data in the PostgreSQL database.
 
         Utilizes PostgreSQL-specific `ON CONFLICT` clause to ensure upsert behavior.
+        Rows are sent in multi-VALUES statements that stay under PostgreSQL's
+        bind-parameter limit, all within a single transaction.
         Retries the operation up to 3 times with 2-second intervals in case of failure.
 
         Args:
             data (pd.DataFrame): DataFrame containing campaign statistics.
+
+        Returns:
+            Optional[Dict[str, int]]: Inserted, updated and unchanged counts
+                                      in delta mode, otherwise None.
         """
-        records = data.to_dict("records")
         with self.engine.begin() as conn:
-            stmt = insert(DailyStats).values(records)
+            months = self._ensure_partitions(conn, data)
+            if self.bulk:
+                counts = self._write(conn, data, self._copy_upsert)
+            else:
+                counts = self._write(conn, data, self._values_upsert)
+        self._partitions |= months
+        self._log_upsert(data, counts, "Upserted")
+        return counts
+
+    def _values_upsert(self, conn: sa.Connection, data: pd.DataFrame):
+        """Upsert through multi-VALUES `INSERT ... ON CONFLICT` statements."""
+        columns = self._columns(data)
+        batch_size = max(1, MAX_BIND_PARAMS // len(columns))
+        for batch in iter_batches(data[columns], batch_size):
+            records = self._records(batch)
+            stmt = postgresql.insert(DailyStats).values(records)
             stmt = stmt.on_conflict_do_update(
                 index_elements=["date", "campaign_id"],
-                set_={
-                    "spend": stmt.excluded.spend,
-                    "conversions": stmt.excluded.conversions,
-                    "cpa": stmt.excluded.cpa,
-                },
+                set_={c: stmt.excluded[c] for c in self._value_columns(columns)},
+                where=self._changed_where(stmt.excluded, columns),
             )
             conn.execute(stmt)
-        logging.info(f"Upserted {len(data)} records.")
 
-    def check_date_exists(self, date: str) -> bool:
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2), before_sleep=count_retry)
+    def bulk_upsert(self, data: pd.DataFrame) -> Optional[Dict[str, int]]:
         """
-        Check if data for the given date already exists in the database.
+        Insert or update campaign data through `COPY FROM STDIN`.
+
+        Rows are streamed as CSV in batches of `batch_size` into a temporary
+        staging table and merged into `daily_stats` with a single
+        `INSERT ... SELECT ... ON CONFLICT` statement, all within one
+        transaction. Avoids the bind-parameter limit and per-row dict building.
+        Retries the operation up to 3 times with 2-second intervals in case of failure.
 
         Args:
-            date (str): Date string in ISO format.
+            data (pd.DataFrame): DataFrame containing campaign statistics.
 
         Returns:
-            bool: True if at least one record for the date exists, else False.
+            Optional[Dict[str, int]]: Inserted, updated and unchanged counts
+                                      in delta mode, otherwise None.
         """
-        with self.engine.connect() as conn:
-            result = conn.execute(
-                sa.select(DailyStats).where(DailyStats.date == date)
-            ).fetchone()
-            return result is not None
+        with self.engine.begin() as conn:
+            months = self._ensure_partitions(conn, data)
+            counts = self._write(conn, data, self._copy_upsert)
+        self._partitions |= months
+        self._log_upsert(data, counts, "Bulk upserted")
+        return counts
+
+    def _copy_upsert(self, conn: sa.Connection, data: pd.DataFrame):
+        """Upsert by COPYing batches into a staging table and merging once."""
+        columns = self._columns(data)
+        column_list = ", ".join(columns)
+        values = self._value_columns(columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in values)
+        changed = ""
+        if self.delta:
+            changed = (
+                f" WHERE (daily_stats.{', daily_stats.'.join(values)}) "
+                f"IS DISTINCT FROM (EXCLUDED.{', EXCLUDED.'.join(values)})"
+            )
+
+        conn.exec_driver_sql(
+            "CREATE TEMP TABLE daily_stats_staging "
+            "(LIKE daily_stats INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        cursor = conn.connection.cursor()
+        try:
+            for batch in iter_batches(data[columns], self.batch_size):
+                buffer = io.StringIO()
+                batch = batch.assign(
+                    date=pd.to_datetime(batch["date"]).dt.strftime("%Y-%m-%d")
+                )
+                # COPY does not cast "14.0" into an INTEGER column
+                batch = batch.assign(
+                    **{
+                        c: batch[c].round().astype("Int64")
+                        for c in columns
+                        if isinstance(DailyStats.__table__.c[c].type, Integer)
+                    }
+                )
+                batch.to_csv(buffer, index=False, header=False, na_rep="\\N")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY daily_stats_staging ({column_list}) FROM STDIN "
+                    "WITH (FORMAT csv, NULL '\\N')",
+                    buffer,
+                )
+        finally:
+            cursor.close()
+        conn.exec_driver_sql(
+            f"INSERT INTO daily_stats ({column_list}) "
+            f"SELECT {column_list} FROM daily_stats_staging "
+            f"ON CONFLICT (date, campaign_id) DO UPDATE SET {updates}{changed}"
+        )
+
+
+class SqliteRepository(SqlRepository):
+    """
+    Embedded SQLite implementation of the DatabaseRepository.
+
+    Runs in WAL mode so readers never block the writer, and writes each
+    upsert as `executemany` batches inside a single transaction. Intended
+    for local runs, tests and reproducible throughput benchmarks.
+    """
+
+    dialect_insert = staticmethod(sqlite.insert)
+
+    def __init__(
+        self, engine: sa.Engine, batch_size: int = 50_000, delta: bool = False
+    ):
+        """
+        Initialize the repository, configure SQLite and create tables and indexes.
+
+        Args:
+            engine (sa.Engine): SQLAlchemy engine for a `sqlite://` URL.
+            batch_size (int, optional): Rows bound per `executemany` call.
+            delta (bool, optional): Skip writes of unchanged rows. Defaults to False.
+        """
+        sa.event.listen(engine, "connect", self._configure_connection)
+        super().__init__(engine, delta=delta)
+        self.batch_size = batch_size
+        with engine.begin() as conn:
+            # Lets date-range reads be answered from the index alone
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS ix_daily_stats_date_campaign "
+                "ON daily_stats (date, campaign_id, spend, conversions, cpa)"
+            )
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        """Enable WAL journaling and a busy timeout on every new connection."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2), before_sleep=count_retry)
+    def upsert(self, data: pd.DataFrame) -> Optional[Dict[str, int]]:
+        """
+        Insert or update campaign data in the SQLite database.
+
+        Rows are bound through `executemany` with `INSERT ... ON CONFLICT DO
+        UPDATE`, all within a single transaction.
+        Retries the operation up to 3 times with 2-second intervals in case of failure.
+
+        Args:
+            data (pd.DataFrame): DataFrame containing campaign statistics.
+
+        Returns:
+            Optional[Dict[str, int]]: Inserted, updated and unchanged counts
+                                      in delta mode, otherwise None.
+        """
+        columns = self._columns(data)
+        stmt = sqlite.insert(DailyStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["date", "campaign_id"],
+            set_={c: stmt.excluded[c] for c in self._value_columns(columns)},
+            where=self._changed_where(stmt.excluded, columns),
+        )
+
+        def write_rows(conn: sa.Connection, data: pd.DataFrame):
+            for batch in iter_batches(data[columns], self.batch_size):
+                conn.execute(stmt, self._records(batch))
+
+        with self.engine.begin() as conn:
+            counts = self._write(conn, data, write_rows)
+        self._log_upsert(data, counts, "Upserted")
+        return counts
+
+
+def create_repository(
+    engine: sa.Engine,
+    bulk: bool = False,
+    partition_by_month: bool = False,
+    delta: bool = False,
+) -> SqlRepository:
+    """
+    Build the repository implementation matching the engine's database.
+
+    Args:
+        engine (sa.Engine): SQLAlchemy engine created from `DB_URL`.
+        bulk (bool, optional): Use COPY-based writes (PostgreSQL only).
+        partition_by_month (bool, optional): Partition `daily_stats` by month
+            (PostgreSQL only).
+        delta (bool, optional): Skip writes of unchanged rows.
+
+    Returns:
+        SqlRepository: A PostgresRepository or SqliteRepository.
+
+    Raises:
+        ValueError: If the database dialect is not supported.
+    """
+    if engine.dialect.name == "postgresql":
+        return PostgresRepository(
+            engine, bulk=bulk, partition_by_month=partition_by_month, delta=delta
+        )
+    if engine.dialect.name == "sqlite":
+        return SqliteRepository(engine, delta=delta)
+    raise ValueError(f"Unsupported database dialect: {engine.dialect.name}")
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_reader import (
+    COUNT_COLUMNS,
+    JsonDataReader,
+    downcast_counts,
+    in_range,
+    value_columns,
+)
+from src.metrics import registry
+
+# Bump when the on-disk layout changes so old entries are never read
+CACHE_VERSION = 2
+
+MANIFEST = "manifest.json"
+
+
+def file_signature(path: str, block_size: int = 1 << 20) -> dict:
+    """
+    Describe a source file by path, size, mtime and content hash.
+
+    Args:
+        path (str): File to describe.
+        block_size (int): Bytes hashed per read.
+
+    Returns:
+        dict: 'path', 'size', 'mtime_ns' and 'sha256' of the file.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+    }
+
+
+class CachedDataReader:
+    """
+    Caches the merged output of another reader as memory-mapped NumPy files.
+
+    Each cache entry is keyed by the signatures of both feeds and holds one
+    directory per date with one float64 `<column>.npy` per value column
+    ('spend', 'conversions' and, if the feeds have them, 'clicks' and
+    'revenue') and `campaign.npy` (int32 codes into the entry's
+    `campaigns.npy`). A hit loads only the
+    requested dates, memory-mapped, without parsing JSON. A miss parses the
+    feeds with the wrapped reader, writes the entry atomically and evicts the
+    least recently used entries once the cache exceeds `max_bytes`. If the
+    wrapped reader is compact, partitions are returned with the compact dtypes
+    straight from the stored codes.
+
+    Attributes:
+        reader (JsonDataReader): Reader used on a cache miss.
+        cache_dir (str): Directory holding the cache entries.
+        max_bytes (int): Size cap of the whole cache.
+        rebuild (bool): Ignore existing entries and rewrite them.
+    """
+
+    def __init__(
+        self,
+        reader: JsonDataReader,
+        cache_dir: str,
+        max_bytes: int = 1 << 30,
+        rebuild: bool = False,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            reader (JsonDataReader): Reader used on a cache miss.
+            cache_dir (str): Directory holding the cache entries.
+            max_bytes (int, optional): Size cap of the cache. Defaults to 1 GiB.
+            rebuild (bool, optional): Rewrite existing entries. Defaults to False.
+        """
+        self.reader = reader
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.rebuild = rebuild
+
+    def read(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Return the merged frame of both feeds, from the cache when possible.
+
+        Args:
+            spend_path (str): Path to the spend feed.
+            conv_path (str): Path to the conversions feed.
+            start_date (str, optional): Drop rows before this date (YYYY-MM-DD).
+            end_date (str, optional): Drop rows after this date (YYYY-MM-DD).
+
+        Returns:
+            pd.DataFrame: The merged DataFrame.
+        """
+        parts = [
+            df
+            for _, df in self.read_partitions(
+                spend_path, conv_path, start_date, end_date
+            )
+        ]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def read_partitions(
+        self,
+        spend_path: str,
+        conv_path: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Yield merged per-date partitions, building the cache entry if needed.
+
+        Args:
+            spend_path (str): Path to the spend feed.
+            conv_path (str): Path to the conversions feed.
+            start_date (str, optional): First date to yield (YYYY-MM-DD).
+            end_date (str, optional): Last date to yield (YYYY-MM-DD).
+
+        Yields:
+            Tuple[str, pd.DataFrame]: (date string, merged partition) pairs
+                                      in ascending date order.
+        """
+        entry = self.ensure(spend_path, conv_path)
+        if entry is None:
+            return
+        manifest = _load_manifest(entry)
+        campaigns = np.load(os.path.join(entry, "campaigns.npy"), mmap_mode="r")
+        # Compact partitions share one categorical index built per read
+        categories = (
+            pd.Index(campaigns, dtype=str)
+            if getattr(self.reader, "compact", False)
+            else None
+        )
+        for date_str in sorted(manifest["dates"]):
+            if not in_range(date_str, start_date, end_date):
+                continue
+            with registry.timed("cache_load", partition=date_str) as timer:
+                df = self._load_partition(
+                    entry, date_str, campaigns, manifest["columns"], categories
+                )
+                timer.rows = len(df)
+            yield date_str, df
+
+    def ensure(self, spend_path: str, conv_path: str) -> Optional[str]:
+        """
+        Return the cache entry for both feeds, building it on a miss.
+
+        Args:
+            spend_path (str): Path to the spend feed.
+            conv_path (str): Path to the conversions feed.
+
+        Returns:
+            Optional[str]: Directory of the cache entry, or None if the feeds
+                           yielded no data.
+        """
+        with registry.timed("cache_key"):
+            sources = [file_signature(spend_path), file_signature(conv_path)]
+        key = hashlib.sha256(
+            json.dumps([CACHE_VERSION, sources], sort_keys=True).encode()
+        ).hexdigest()[:32]
+        entry = os.path.join(self.cache_dir, key)
+
+        if os.path.exists(os.path.join(entry, MANIFEST)) and not self.rebuild:
+            logging.info(f"Feed cache hit: {entry}")
+            # The manifest's mtime is the entry's last use for LRU eviction
+            os.utime(os.path.join(entry, MANIFEST))
+            return entry
+
+        logging.info(f"Feed cache miss; parsing feeds into {entry}")
+        if not self._build(entry, sources, spend_path, conv_path):
+            return None
+        self.rebuild = False
+        self._evict(keep=entry)
+        return entry
+
+    def _build(
+        self, entry: str, sources: List[dict], spend_path: str, conv_path: str
+    ) -> bool:
+        """Parse both feeds into a new entry; return False if there was no data."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".build-", dir=self.cache_dir)
+        try:
+            campaign_codes: Dict[str, int] = {}
+            dates: Dict[str, int] = {}
+            columns: Dict[str, None] = {}
+            for date_str, df in self.reader.read_partitions(spend_path, conv_path):
+                part_dir = os.path.join(tmp, date_str)
+                os.makedirs(part_dir)
+                codes = np.fromiter(
+                    (
+                        campaign_codes.setdefault(cid, len(campaign_codes))
+                        for cid in df["campaign_id"].astype(str)
+                    ),
+                    dtype=np.int32,
+                    count=len(df),
+                )
+                np.save(os.path.join(part_dir, "campaign.npy"), codes)
+                for column in value_columns(df):
+                    columns[column] = None
+                    np.save(
+                        os.path.join(part_dir, f"{column}.npy"),
+                        df[column].to_numpy(dtype=np.float64),
+                    )
+                dates[date_str] = len(df)
+
+            np.save(
+                os.path.join(tmp, "campaigns.npy"),
+                np.array(list(campaign_codes), dtype=str),
+            )
+            with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "sources": sources,
+                        "dates": dates,
+                        "columns": list(columns),
+                    },
+                    f,
+                )
+
+            if not dates:
+                # Nothing parsed (e.g. an unreadable feed); do not cache it
+                shutil.rmtree(tmp)
+                return False
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # Another process finished the same entry first
+                if not os.path.exists(os.path.join(entry, MANIFEST)):
+                    raise
+                shutil.rmtree(tmp)
+            return True
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def _load_partition(
+        entry: str,
+        date_str: str,
+        campaigns: np.ndarray,
+        columns: List[str],
+        categories: Optional[pd.Index] = None,
+    ) -> pd.DataFrame:
+        """
+        Load one date from a cache entry as a reader-compatible frame.
+
+        With `categories`, 'campaign_id' is categorical over them and the
+        count columns are downcast as by a compact reader.
+        """
+        part_dir = os.path.join(entry, date_str)
+        codes = np.load(os.path.join(part_dir, "campaign.npy"), mmap_mode="r")
+        df = {
+            "date": pd.Series(pd.Timestamp(date_str), index=range(len(codes))),
+            "campaign_id": (
+                pd.Series(campaigns[codes], dtype=str)
+                if categories is None
+                else pd.Categorical.from_codes(codes, categories)
+            ),
+        }
+        for column in columns:
+            values = np.load(os.path.join(part_dir, f"{column}.npy"), mmap_mode="r")
+            if categories is not None and column in COUNT_COLUMNS:
+                values = downcast_counts(values)
+            df[column] = values
+        # Keep the value columns backed by the mapped files instead of copies
+        return pd.DataFrame(df, copy=False)
+
+    def _evict(self, keep: str):
+        """Remove least recently used entries until the cache fits `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            manifest = os.path.join(path, MANIFEST)
+            if os.path.exists(manifest):
+                entries.append((os.path.getmtime(manifest), _dir_size(path), path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted feed cache entry {path}")
+
+
+def _load_manifest(entry: str) -> dict:
+    """Read a cache entry's manifest."""
+    with open(os.path.join(entry, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dir_size(path: str) -> int:
+    """Total size of the files below a directory."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
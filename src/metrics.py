@@ -0,0 +1,412 @@
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageTimer:
+    """
+    Handle yielded by `MetricsRegistry.timed`; set `rows` inside the block.
+
+    Attributes:
+        rows (int): Rows handled by the timed block.
+    """
+
+    def __init__(self, rows: int = 0):
+        self.rows = rows
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collector of per-stage timings, throughput and retries.
+
+    Stage totals accumulate for the life of the process. Per-partition
+    timings only cover the current run (see `start_run`), so the number of
+    exported series stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stage -> [calls, seconds, rows, peak RSS when last finished]
+        self._stages: Dict[str, List[float]] = {}
+        # (stage, partition) -> [seconds, rows]
+        self._partitions: Dict[Tuple[str, str], List[float]] = {}
+        self._retries: Dict[str, int] = {}
+        # inserted/updated/unchanged -> rows, from delta-mode upserts
+        self._writes: Dict[str, int] = {}
+        self._runs: Dict[str, int] = {}
+        self._last_run: Optional[Tuple[float, float, bool]] = None
+
+    @contextmanager
+    def timed(
+        self, stage: str, partition: Optional[str] = None, rows: int = 0
+    ) -> Iterator[StageTimer]:
+        """
+        Time a block of work as one call of `stage`.
+
+        Args:
+            stage (str): Stage name, e.g. "read" or "upsert".
+            partition (str, optional): Date partition the work belongs to.
+            rows (int, optional): Rows handled; can also be set on the handle.
+
+        Yields:
+            StageTimer: Handle whose `rows` is recorded when the block exits.
+        """
+        timer = StageTimer(rows)
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            self.record(stage, time.perf_counter() - start, timer.rows, partition)
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        rows: int = 0,
+        partition: Optional[str] = None,
+    ) -> None:
+        """
+        Record one completed call of a stage.
+
+        Args:
+            stage (str): Stage name.
+            seconds (float): Wall time of the call.
+            rows (int, optional): Rows handled by the call.
+            partition (str, optional): Date partition the call belongs to.
+        """
+        rss = peak_rss_bytes() or 0
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += rows
+            totals[3] = rss
+            if partition is not None:
+                part = self._partitions.setdefault((stage, partition), [0.0, 0])
+                part[0] += seconds
+                part[1] += rows
+
+    def record_retry(self, operation: str) -> None:
+        """Count one retry of a failed operation."""
+        with self._lock:
+            self._retries[operation] = self._retries.get(operation, 0) + 1
+
+    def record_writes(self, counts: Dict[str, int]) -> None:
+        """Add the inserted, updated and unchanged row counts of an upsert."""
+        with self._lock:
+            for result, rows in counts.items():
+                self._writes[result] = self._writes.get(result, 0) + rows
+
+    def start_run(self) -> None:
+        """Forget per-partition timings of the previous run."""
+        with self._lock:
+            self._partitions.clear()
+
+    def finish_run(self, started: float, success: bool) -> None:
+        """
+        Record the outcome of a run.
+
+        Args:
+            started (float): `time.time()` when the run started.
+            success (bool): Whether the run completed without error.
+        """
+        status = "success" if success else "failure"
+        with self._lock:
+            self._runs[status] = self._runs.get(status, 0) + 1
+            self._last_run = (time.time(), time.time() - started, success)
+
+    def log_summary(self) -> None:
+        """Log wall time and throughput of every stage seen so far."""
+        with self._lock:
+            stages = {stage: list(totals) for stage, totals in self._stages.items()}
+            retries = dict(self._retries)
+            writes = dict(self._writes)
+        for stage, (calls, seconds, rows, _) in stages.items():
+            rate = rows / seconds if seconds else 0.0
+            logging.info(
+                f"Stage {stage}: {int(calls)} calls, {seconds:.3f}s, "
+                f"{int(rows)} rows, {rate:.0f} rows/s"
+            )
+        for operation, count in retries.items():
+            logging.info(f"Retries of {operation}: {count}")
+        if writes:
+            logging.info(
+                f"Rows written: {writes.get('inserted', 0)} inserted, "
+                f"{writes.get('updated', 0)} updated, "
+                f"{writes.get('unchanged', 0)} unchanged (skipped)"
+            )
+        rss = peak_rss_bytes()
+        if rss is not None:
+            logging.info(f"Peak RSS: {rss / 2**20:.1f} MiB")
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, ending with a newline.
+        """
+        with self._lock:
+            stages = {stage: list(totals) for stage, totals in self._stages.items()}
+            partitions = {key: list(value) for key, value in self._partitions.items()}
+            retries = dict(self._retries)
+            writes = dict(self._writes)
+            runs = dict(self._runs)
+            last_run = self._last_run
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_escape(str(val))}"' for key, val in labels.items()
+                )
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}{suffix} {_format_value(value)}")
+
+        family(
+            "cpasync_stage_calls_total",
+            "counter",
+            "Completed calls per pipeline stage.",
+            [({"stage": s}, t[0]) for s, t in stages.items()],
+        )
+        family(
+            "cpasync_stage_seconds_total",
+            "counter",
+            "Wall time spent per pipeline stage.",
+            [({"stage": s}, t[1]) for s, t in stages.items()],
+        )
+        family(
+            "cpasync_stage_rows_total",
+            "counter",
+            "Rows handled per pipeline stage.",
+            [({"stage": s}, t[2]) for s, t in stages.items()],
+        )
+        family(
+            "cpasync_stage_rows_per_second",
+            "gauge",
+            "Average throughput per pipeline stage.",
+            [({"stage": s}, t[2] / t[1] if t[1] else 0.0) for s, t in stages.items()],
+        )
+        family(
+            "cpasync_stage_peak_rss_bytes",
+            "gauge",
+            "Process peak RSS when the stage last finished.",
+            [({"stage": s}, t[3]) for s, t in stages.items()],
+        )
+        family(
+            "cpasync_partition_stage_seconds",
+            "gauge",
+            "Wall time per stage and date partition in the latest run.",
+            [({"stage": s, "date": d}, v[0]) for (s, d), v in partitions.items()],
+        )
+        family(
+            "cpasync_partition_stage_rows",
+            "gauge",
+            "Rows per stage and date partition in the latest run.",
+            [({"stage": s, "date": d}, v[1]) for (s, d), v in partitions.items()],
+        )
+        family(
+            "cpasync_retries_total",
+            "counter",
+            "Retries of failed operations.",
+            [({"operation": op}, n) for op, n in retries.items()],
+        )
+        family(
+            "cpasync_rows_written_total",
+            "counter",
+            "Rows of delta-mode upserts by result (inserted, updated, unchanged).",
+            [({"result": result}, n) for result, n in writes.items()],
+        )
+        family(
+            "cpasync_runs_total",
+            "counter",
+            "Completed runs by outcome.",
+            [({"status": status}, n) for status, n in runs.items()],
+        )
+        if last_run is not None:
+            finished, duration, success = last_run
+            family(
+                "cpasync_last_run_timestamp_seconds",
+                "gauge",
+                "Unix time the latest run finished.",
+                [({}, finished)],
+            )
+            family(
+                "cpasync_last_run_duration_seconds",
+                "gauge",
+                "Wall time of the latest run.",
+                [({}, duration)],
+            )
+            family(
+                "cpasync_last_run_success",
+                "gauge",
+                "1 if the latest run succeeded, 0 otherwise.",
+                [({}, int(success))],
+            )
+        rss = peak_rss_bytes()
+        if rss is not None:
+            family(
+                "cpasync_peak_rss_bytes",
+                "gauge",
+                "Peak resident set size of the process.",
+                [({}, rss)],
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Atomically write the metrics for the node_exporter textfile collector.
+
+        Args:
+            path (str): Target .prom file.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value without losing precision."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry shared by the reader, pipeline and repository
+registry = MetricsRegistry()
+
+
+def count_retry(retry_state) -> None:
+    """tenacity `before_sleep` hook counting retries in the shared registry."""
+    registry.record_retry(retry_state.fn.__qualname__)
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server exposing a registry at `/metrics` on a daemon thread.
+
+    Attributes:
+        port (int): Port to listen on (0 picks a free port).
+        host (str): Interface to bind to.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        metrics: MetricsRegistry = registry,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            port (int): Port to listen on (0 picks a free port).
+            host (str, optional): Interface to bind to. Defaults to localhost.
+            metrics (MetricsRegistry, optional): Registry to expose.
+        """
+        self.port = port
+        self.host = host
+        self.metrics = metrics
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> int:
+        """
+        Start serving in the background.
+
+        Returns:
+            int: The port actually bound.
+        """
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+        thread.start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+@contextmanager
+def profile_run(output_dir: str, top: int = 20) -> Iterator[None]:
+    """
+    Profile a block with cProfile and tracemalloc.
+
+    Writes `cpasync.prof` (load with pstats or snakeviz) and
+    `tracemalloc.snap` (load with tracemalloc.Snapshot.load) to `output_dir`
+    and logs the largest allocation sites.
+
+    Args:
+        output_dir (str): Directory for the profile files.
+        top (int, optional): Allocation sites to log. Defaults to 20.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(os.path.join(output_dir, "cpasync.prof"))
+        snapshot.dump(os.path.join(output_dir, "tracemalloc.snap"))
+        logging.info(f"Traced Python memory peak: {peak / 2**20:.1f} MiB")
+        for stat in snapshot.statistics("lineno")[:top]:
+            logging.info(f"Allocated: {stat}")
+        logging.info(f"Wrote profile to {output_dir}")
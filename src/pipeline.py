@@ -0,0 +1,201 @@
+import logging
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from src.cpa_calculator import CpaCalculator
+from src.db_repository import DatabaseRepository
+from src.metrics import registry
+
+# Marks the end of a stage's input
+_DONE = object()
+
+# How often blocked stages wake up to check whether the pipeline was aborted
+_POLL_SECONDS = 0.1
+
+
+class ConcurrentPipeline:
+    """
+    Runs per-date partitions through compute and write stages concurrently.
+
+    The caller's partition iterator (read/merge) runs on its own thread and
+    feeds CPA workers, which feed DB writer threads, through bounded queues.
+    Writers share the engine's connection pool, so `write_workers` should not
+    exceed the pool size. At most `max_in_flight` partitions are held in
+    memory at once; when the database falls behind, the reader blocks.
+
+    Completed partitions are reported back in their original order, so the
+    caller's progress output is the same as in a serial run.
+
+    Attributes:
+        calculator (CpaCalculator): Computes CPA for each partition.
+        repository (DatabaseRepository): Persists each computed partition.
+        compute_workers (int): Number of CPA computation threads.
+        write_workers (int): Number of DB writer threads.
+        queue_size (int): Capacity of each inter-stage queue.
+    """
+
+    def __init__(
+        self,
+        calculator: CpaCalculator,
+        repository: DatabaseRepository,
+        compute_workers: int = 1,
+        write_workers: int = 4,
+        queue_size: int = 4,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            calculator (CpaCalculator): Computes CPA for each partition.
+            repository (DatabaseRepository): Persists each computed partition.
+            compute_workers (int, optional): CPA computation threads. Defaults to 1.
+            write_workers (int, optional): DB writer threads. Defaults to 4.
+            queue_size (int, optional): Capacity of each queue. Defaults to 4.
+        """
+        if min(compute_workers, write_workers, queue_size) < 1:
+            raise ValueError("Worker counts and queue size must be at least 1")
+        self.calculator = calculator
+        self.repository = repository
+        self.compute_workers = compute_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+
+    @property
+    def max_in_flight(self) -> int:
+        """Upper bound on partitions held in memory at the same time."""
+        return 2 * self.queue_size + self.compute_workers + self.write_workers
+
+    def run(
+        self,
+        partitions: Iterable[Tuple[str, pd.DataFrame]],
+        on_complete: Callable[[str, pd.DataFrame], None],
+    ) -> None:
+        """
+        Process and store every partition, reporting each one in input order.
+
+        Args:
+            partitions: (date string, merged partition) pairs to process.
+            on_complete: Called on the calling thread with each stored
+                         (date string, computed partition) in input order.
+
+        Raises:
+            Exception: The first error raised by any stage; remaining work
+                       is abandoned.
+        """
+        compute_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        write_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        done_q: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        compute_left = [self.compute_workers]
+        compute_lock = threading.Lock()
+
+        def fail(error: BaseException):
+            stop.set()
+            done_q.put(("error", error))
+
+        def read_stage():
+            count = 0
+            try:
+                for date_str, df in partitions:
+                    while not slots.acquire(timeout=_POLL_SECONDS):
+                        if stop.is_set():
+                            return
+                    if not _put(compute_q, (count, date_str, df), stop):
+                        return
+                    count += 1
+            except BaseException as e:
+                fail(e)
+                return
+            for _ in range(self.compute_workers):
+                _put(compute_q, _DONE, stop)
+            done_q.put(("total", count))
+
+        def compute_stage():
+            try:
+                while (item := _get(compute_q, stop)) not in (None, _DONE):
+                    seq, date_str, df = item
+                    with registry.timed("compute", date_str, len(df)):
+                        df = self.calculator.process(df)
+                    if not _put(write_q, (seq, date_str, df), stop):
+                        return
+            except BaseException as e:
+                fail(e)
+                return
+            with compute_lock:
+                compute_left[0] -= 1
+                last = compute_left[0] == 0
+            if last:
+                for _ in range(self.write_workers):
+                    _put(write_q, _DONE, stop)
+
+        def write_stage():
+            try:
+                while (item := _get(write_q, stop)) not in (None, _DONE):
+                    seq, date_str, df = item
+                    with registry.timed("upsert", date_str, len(df)):
+                        self.repository.upsert(df)
+                    done_q.put(("done", (seq, date_str, df)))
+            except BaseException as e:
+                fail(e)
+
+        threads = [threading.Thread(target=read_stage, name="pipeline-read")]
+        threads += [
+            threading.Thread(target=compute_stage, name=f"pipeline-compute-{i}")
+            for i in range(self.compute_workers)
+        ]
+        threads += [
+            threading.Thread(target=write_stage, name=f"pipeline-write-{i}")
+            for i in range(self.write_workers)
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        pending: Dict[int, Tuple[str, pd.DataFrame]] = {}
+        next_seq = 0
+        total: Optional[int] = None
+        try:
+            while total is None or next_seq < total:
+                kind, payload = done_q.get()
+                if kind == "error":
+                    raise payload
+                if kind == "total":
+                    total = payload
+                    continue
+                seq, date_str, df = payload
+                pending[seq] = (date_str, df)
+                # Report in input order so progress output matches a serial run
+                while next_seq in pending:
+                    on_complete(*pending.pop(next_seq))
+                    slots.release()
+                    next_seq += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        logging.info(f"Pipeline stored {next_seq} partitions")
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put an item on a bounded queue, giving up if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Take an item from a queue, returning None if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return None
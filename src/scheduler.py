@@ -1,19 +1,76 @@
 from apscheduler.schedulers.background import BackgroundScheduler
+import datetime
 import logging
-from typing import Callable
+from typing import Callable, Optional, Tuple
+
+
+def plan_catch_up(
+    watermark: Optional[str],
+    today: datetime.date,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Optional[Tuple[str, str]]:
+    """
+    Plan the single range a scheduled run must cover.
+
+    The range starts the day after the watermark and ends yesterday, the
+    last complete day, so every day missed during downtime is covered by
+    one coalesced run.
+
+    Args:
+        watermark (str, optional): Last fully processed date (YYYY-MM-DD).
+        today (datetime.date): Current date.
+        start_date (str, optional): First date to process when there is no
+                                    watermark yet. Defaults to yesterday.
+        end_date (str, optional): Never plan past this date.
+
+    Returns:
+        Optional[Tuple[str, str]]: (start, end) dates, or None if there is
+                                   nothing left to process.
+    """
+    yesterday = today - datetime.timedelta(days=1)
+    if watermark is not None:
+        start = datetime.date.fromisoformat(watermark) + datetime.timedelta(days=1)
+    elif start_date is not None:
+        start = datetime.date.fromisoformat(start_date)
+    else:
+        start = yesterday
+    end = yesterday
+    if end_date is not None:
+        end = min(end, datetime.date.fromisoformat(end_date))
+    if start > end:
+        return None
+    return start.isoformat(), end.isoformat()
 
 
 class Scheduler:
     """
     A wrapper around APScheduler's BackgroundScheduler to schedule a daily task.
 
+    Only one instance of the task runs at a time. Fire times missed while
+    a run was still going, or while the process was suspended, are
+    coalesced into a single run if it can start within
+    `misfire_grace_time`. The task should plan its own range (see
+    `plan_catch_up`), so one run recovers every missed day.
+
     Attributes:
         main_task (Callable): The task function to be executed daily.
         hour (int): Hour at which the task should run (0-23).
         minute (int): Minute at which the task should run (0-59).
+        misfire_grace_time (int): Seconds a late run may still start.
+        jitter (int): Up to this many seconds of random delay per run.
+        run_at_start (bool): Also run the task as soon as the scheduler starts.
     """
 
-    def __init__(self, main_task: Callable, hour: int = 0, minute: int = 0):
+    def __init__(
+        self,
+        main_task: Callable,
+        hour: int = 0,
+        minute: int = 0,
+        misfire_grace_time: int = 3600,
+        jitter: int = 0,
+        run_at_start: bool = False,
+    ):
         """
         Initialize the Scheduler.
 
@@ -21,24 +78,42 @@ class Scheduler:
             main_task (Callable): The task to be scheduled.
             hour (int, optional): Hour of the day when the task should run. Defaults to 0.
             minute (int, optional): Minute of the hour when the task should run. Defaults to 0.
+            misfire_grace_time (int, optional): Seconds a late run may still
+                                                start. Defaults to 3600.
+            jitter (int, optional): Random delay of up to this many seconds.
+                                    Defaults to 0.
+            run_at_start (bool, optional): Also run once at start, e.g. to
+                                           catch up. Defaults to False.
         """
         self.scheduler = BackgroundScheduler()
         self.main_task = main_task
         self.hour = hour
         self.minute = minute
+        self.misfire_grace_time = misfire_grace_time
+        self.jitter = jitter
+        self.run_at_start = run_at_start
 
     def start(self):
         """
         Start the scheduler and schedule the main task as a daily cron job.
         """
         try:
+            # An explicit next_run_time of None would pause the job
+            first_run = (
+                {"next_run_time": datetime.datetime.now()} if self.run_at_start else {}
+            )
             self.scheduler.add_job(
                 self.main_task,
                 trigger="cron",
                 hour=self.hour,
                 minute=self.minute,
+                jitter=self.jitter or None,
                 id="daily_main_task",
                 replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=self.misfire_grace_time,
+                **first_run,
             )
             self.scheduler.start()
             logging.info(
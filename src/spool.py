@@ -0,0 +1,584 @@
+import datetime
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from src.data_reader import MERGE_KEYS
+from src.metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+SEGMENT_MAGIC = b"CPASPL1\n"
+SEGMENT_SUFFIX = ".seg"
+LOCK_FILE = "replay.lock"
+WATERMARK_FILE = "watermarks.json"
+
+# Errors of a database that is down or refusing connections
+UNAVAILABLE = (sa.exc.SQLAlchemyError, OSError)
+
+
+class CorruptSegmentError(ValueError):
+    """Raised when a spool segment is truncated or fails its checksum."""
+
+
+def encode_segment(data: pd.DataFrame) -> bytes:
+    """
+    Serialize a frame as one columnar spool segment.
+
+    Layout: magic, header length (uint32), JSON header, the column buffers
+    back to back, and a CRC-32 (uint32) of header and buffers. Dates are
+    stored as datetime64[us], text columns as int64 end offsets followed by
+    their UTF-8 bytes, and numeric columns as raw little-endian arrays.
+
+    Args:
+        data (pd.DataFrame): Rows to serialize.
+
+    Returns:
+        bytes: The encoded segment.
+    """
+    columns = []
+    buffers = []
+    for name in data.columns:
+        series = data[name]
+        if name == "date" or pd.api.types.is_datetime64_any_dtype(series):
+            values = pd.to_datetime(series).to_numpy(dtype="datetime64[us]")
+            buffers.append(values.tobytes())
+            columns.append(
+                {"name": name, "kind": "datetime", "nbytes": len(buffers[-1])}
+            )
+        elif pd.api.types.is_numeric_dtype(series) and not isinstance(
+            series.dtype, pd.CategoricalDtype
+        ):
+            if isinstance(series.dtype, np.dtype):
+                values = series.to_numpy()
+            else:
+                # Nullable extension dtypes; NA is stored as NaN
+                values = series.to_numpy(dtype="float64", na_value=np.nan)
+            values = values.astype(values.dtype.newbyteorder("<"))
+            buffers.append(values.tobytes())
+            columns.append(
+                {
+                    "name": name,
+                    "kind": "numeric",
+                    "dtype": values.dtype.str,
+                    "nbytes": len(buffers[-1]),
+                }
+            )
+        else:
+            encoded = [str(value).encode("utf-8") for value in series.astype(str)]
+            ends = np.cumsum([len(value) for value in encoded], dtype="<i8")
+            buffers.append(ends.tobytes() + b"".join(encoded))
+            columns.append({"name": name, "kind": "text", "nbytes": len(buffers[-1])})
+
+    header = json.dumps({"rows": len(data), "columns": columns}).encode("utf-8")
+    body = header + b"".join(buffers)
+    return (
+        SEGMENT_MAGIC
+        + struct.pack("<I", len(header))
+        + body
+        + struct.pack("<I", zlib.crc32(body))
+    )
+
+
+def decode_segment(raw: bytes) -> pd.DataFrame:
+    """
+    Parse a segment written by `encode_segment`.
+
+    Args:
+        raw (bytes): Contents of the segment file.
+
+    Returns:
+        pd.DataFrame: The stored rows.
+
+    Raises:
+        CorruptSegmentError: If the segment is truncated or fails its checksum.
+    """
+    prefix = len(SEGMENT_MAGIC) + 4
+    if len(raw) < prefix + 4 or not raw.startswith(SEGMENT_MAGIC):
+        raise CorruptSegmentError("not a spool segment or truncated")
+    (header_len,) = struct.unpack_from("<I", raw, len(SEGMENT_MAGIC))
+    body = raw[prefix:-4]
+    (checksum,) = struct.unpack_from("<I", raw, len(raw) - 4)
+    if len(body) < header_len or zlib.crc32(body) != checksum:
+        raise CorruptSegmentError("checksum mismatch")
+
+    header = json.loads(body[:header_len])
+    rows = header["rows"]
+    offset = header_len
+    data = {}
+    for column in header["columns"]:
+        buffer = body[offset : offset + column["nbytes"]]
+        offset += column["nbytes"]
+        if column["kind"] == "datetime":
+            data[column["name"]] = np.frombuffer(buffer, dtype="datetime64[us]").copy()
+        elif column["kind"] == "numeric":
+            data[column["name"]] = np.frombuffer(buffer, dtype=column["dtype"]).copy()
+        else:
+            ends = np.frombuffer(buffer, dtype="<i8", count=rows)
+            text = buffer[8 * rows :]
+            starts = np.concatenate([[0], ends[:-1]]) if rows else ends
+            data[column["name"]] = pd.array(
+                [text[s:e].decode("utf-8") for s, e in zip(starts, ends)], dtype=str
+            )
+    return pd.DataFrame(data)
+
+
+class Spool:
+    """
+    Append-only, crash-safe log of pending upserts in a local directory.
+
+    Each `append` writes one segment file: it is written to a temporary
+    name, fsynced, renamed into place and the directory is fsynced, so a
+    segment is either fully durable or absent. Segment names start with a
+    nanosecond timestamp and sort in append order.
+
+    Attributes:
+        directory (str): Directory holding the segments.
+        fsync (bool): Flush every segment to disk before `append` returns.
+    """
+
+    def __init__(self, directory: str, fsync: bool = True):
+        """
+        Initialize the spool, creating its directory if needed.
+
+        Args:
+            directory (str): Directory holding the segments.
+            fsync (bool, optional): Flush segments to disk. Defaults to True.
+        """
+        self.directory = directory
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._last_stamp = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, data: pd.DataFrame) -> str:
+        """
+        Durably store a frame as a new segment.
+
+        Args:
+            data (pd.DataFrame): Rows to spool.
+
+        Returns:
+            str: Path of the new segment.
+        """
+        raw = encode_segment(data)
+        with self._lock:
+            # Strictly increasing even if the clock does not advance
+            self._last_stamp = max(time.time_ns(), self._last_stamp + 1)
+            name = f"{self._last_stamp:020d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if self.fsync:
+            _fsync_dir(self.directory)
+        return path
+
+    def segments(self) -> List[str]:
+        """Return the paths of all committed segments, oldest first."""
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if name.endswith(SEGMENT_SUFFIX)
+        ]
+
+    def read(self, path: str) -> pd.DataFrame:
+        """
+        Load one segment, verifying its checksum.
+
+        Args:
+            path (str): Segment path.
+
+        Returns:
+            pd.DataFrame: The spooled rows.
+
+        Raises:
+            CorruptSegmentError: If the segment is damaged.
+        """
+        with open(path, "rb") as f:
+            return decode_segment(f.read())
+
+    def remove(self, paths: List[str]) -> None:
+        """Delete replayed segments."""
+        for path in paths:
+            os.remove(path)
+        if self.fsync and paths:
+            _fsync_dir(self.directory)
+
+    def quarantine(self, path: str) -> None:
+        """Move a damaged segment aside so it no longer blocks the replay."""
+        os.replace(path, f"{path}.corrupt")
+        logging.error(f"Quarantined corrupt spool segment {path}")
+
+
+def _fsync_dir(directory: str) -> None:
+    """Persist renames and deletions in a directory."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def coalesce(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate spooled frames, keeping the latest row of each key.
+
+    Args:
+        frames (List[pd.DataFrame]): Frames in append order.
+
+    Returns:
+        pd.DataFrame: One row per ('date', 'campaign_id').
+    """
+    data = pd.concat(frames, ignore_index=True)
+    return data.drop_duplicates(MERGE_KEYS, keep="last").reset_index(drop=True)
+
+
+class SpoolReplayer:
+    """
+    Drains a Spool into a repository on a background thread.
+
+    Segments are replayed oldest first in batches of up to `batch_rows`
+    rows, coalesced to the latest value per key, and deleted only after the
+    repository's upsert has committed. A crash between the commit and the
+    deletion replays the same latest values again: delivery is at-least-once,
+    and the idempotent keyed upsert leaves every key with its last value.
+    An advisory lock on the spool directory keeps concurrent processes from
+    replaying the same segments.
+
+    Attributes:
+        spool (Spool): Spool to drain.
+        repository: Repository whose `upsert` receives the batches.
+        batch_rows (int): Rows replayed per upsert.
+        interval (float): Seconds between attempts while the database is down.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        repository,
+        batch_rows: int = 500_000,
+        interval: float = 5.0,
+    ):
+        """
+        Initialize the replayer.
+
+        Args:
+            spool (Spool): Spool to drain.
+            repository: Repository whose `upsert` receives the batches.
+            batch_rows (int, optional): Rows per upsert. Defaults to 500000.
+            interval (float, optional): Retry interval in seconds. Defaults to 5.
+        """
+        self.spool = spool
+        self.repository = repository
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def replay_once(self) -> int:
+        """
+        Replay the oldest batch of segments.
+
+        Returns:
+            int: Rows upserted; 0 if the spool is empty or locked elsewhere.
+        """
+        with _ReplayLock(self.spool.directory) as locked:
+            if not locked:
+                return 0
+            paths, frames = self._next_batch()
+            if not frames:
+                return 0
+            data = coalesce(frames)
+            with registry.timed("replay", rows=len(data)):
+                self.repository.upsert(data)
+            self.spool.remove(paths)
+        logging.info(
+            f"Replayed {len(paths)} spool segments ({len(data)} rows) to the database"
+        )
+        return len(data)
+
+    def _next_batch(self) -> Tuple[List[str], List[pd.DataFrame]]:
+        """Load the oldest segments up to `batch_rows` rows, skipping corrupt ones."""
+        paths, frames, rows = [], [], 0
+        for path in self.spool.segments():
+            try:
+                df = self.spool.read(path)
+            except CorruptSegmentError:
+                self.spool.quarantine(path)
+                continue
+            if frames and rows + len(df) > self.batch_rows:
+                break
+            paths.append(path)
+            frames.append(df)
+            rows += len(df)
+        return paths, frames
+
+    def drain(self) -> int:
+        """
+        Replay until the spool is empty.
+
+        Returns:
+            int: Rows upserted.
+        """
+        total = 0
+        while rows := self.replay_once():
+            total += rows
+        return total
+
+    def notify(self) -> None:
+        """Wake the background thread after a new segment was appended."""
+        self._wake.set()
+
+    def start(self) -> None:
+        """Start draining in the background."""
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="spool-replayer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        Stop the background thread after a last attempt to drain the spool.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the drain.
+
+        Returns:
+            int: Segments still pending, replayed by a later run.
+        """
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        pending = len(self.spool.segments())
+        if pending:
+            logging.warning(
+                f"{pending} spool segments are still pending in "
+                f"{self.spool.directory}; they will be replayed by a later run"
+            )
+        return pending
+
+    def _run(self) -> None:
+        """Drain whenever woken, backing off while the database is down."""
+        while True:
+            self._wake.clear()
+            # Once stopping, one last drain is attempted before exiting
+            stopping = self._stopping.is_set()
+            try:
+                self.drain()
+            except Exception:
+                logging.warning("Spool replay failed; retrying later", exc_info=True)
+                if stopping:
+                    return
+                self._stopping.wait(self.interval)
+                continue
+            if stopping:
+                return
+            self._wake.wait(self.interval)
+
+
+class _ReplayLock:
+    """Non-blocking advisory lock on a spool directory; yields whether it was taken."""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, LOCK_FILE)
+        self._file = None
+
+    def __enter__(self) -> bool:
+        self._file = open(self.path, "a")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def __exit__(self, *exc) -> None:
+        self._file.close()
+
+
+class LazyRepository:
+    """
+    Repository built on first use.
+
+    Creating a SqlRepository creates and migrates the schema, which needs
+    the database. Deferring it lets a process start while the database is
+    down; a failed build is retried on the next use, so a later run or the
+    replayer sets up the schema once the database is back.
+
+    Attributes:
+        engine (sa.Engine): Engine the repository is built on.
+    """
+
+    def __init__(self, engine: sa.Engine, factory: Callable[[sa.Engine], object]):
+        """
+        Initialize without touching the database.
+
+        Args:
+            engine (sa.Engine): Engine the repository is built on.
+            factory (Callable): Builds the repository from the engine.
+        """
+        self.engine = engine
+        self._factory = factory
+        self._repository = None
+        self._lock = threading.Lock()
+
+    @property
+    def repository(self):
+        """The repository, built now if it does not exist yet."""
+        with self._lock:
+            if self._repository is None:
+                self._repository = self._factory(self.engine)
+            return self._repository
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+
+class SpooledRepository:
+    """
+    Write-behind front of a repository.
+
+    `upsert` appends the rows to the spool and returns once they are on
+    disk; a SpoolReplayer writes them to the database. Every other method
+    is delegated to the wrapped repository.
+
+    Planning a run must not wait on the database either. While it is
+    unavailable, `get_fingerprints` reports no stored fingerprints (every
+    date is recomputed and spooled, which the idempotent upsert absorbs),
+    and the watermark is read from and advanced in a copy kept in the
+    spool directory.
+
+    Attributes:
+        repository: Repository that receives the replayed rows.
+        spool (Spool): Spool the upserts are appended to.
+        replayer (SpoolReplayer, optional): Replayer woken after each append.
+    """
+
+    def __init__(
+        self, repository, spool: Spool, replayer: Optional[SpoolReplayer] = None
+    ):
+        self.repository = repository
+        self.spool = spool
+        self.replayer = replayer
+
+    def upsert(self, data: pd.DataFrame):
+        """
+        Durably spool rows for a later write.
+
+        Args:
+            data (pd.DataFrame): DataFrame containing campaign statistics.
+        """
+        with registry.timed("spool", rows=len(data)):
+            path = self.spool.append(data)
+        logging.info(f"Spooled {len(data)} records to {path}")
+        if self.replayer is not None:
+            self.replayer.notify()
+
+    def get_fingerprints(
+        self, start_date: str, end_date: str
+    ) -> Dict[str, Optional[str]]:
+        """
+        Fetch stored fingerprints, or none while the database is unavailable.
+
+        Args:
+            start_date (str): Start date (ISO format).
+            end_date (str): End date (ISO format).
+
+        Returns:
+            Dict[str, Optional[str]]: Fingerprints keyed by date string.
+        """
+        try:
+            return self.repository.get_fingerprints(start_date, end_date)
+        except UNAVAILABLE:
+            logging.warning(
+                "Database unavailable; planning without stored fingerprints",
+                exc_info=True,
+            )
+            return {}
+
+    def get_watermark(self, name: str = "daily") -> Optional[str]:
+        """
+        Return the later of the database's and the spool's watermark.
+
+        Args:
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            Optional[str]: The date (YYYY-MM-DD), or None before the first run.
+        """
+        dates = [self._local_watermarks().get(name)]
+        try:
+            dates.append(self.repository.get_watermark(name))
+        except UNAVAILABLE:
+            logging.warning("Database unavailable; using the spooled watermark")
+        dates = [date for date in dates if date is not None]
+        return max(dates) if dates else None
+
+    def advance_watermark(
+        self, start_date: str, end_date: str, name: str = "daily"
+    ) -> bool:
+        """
+        Move the watermark to the end of a range whose rows are spooled.
+
+        The spool's copy follows the same rule as the database: it only
+        moves forward and never past a gap. The database's watermark is
+        advanced too when it is reachable.
+
+        Args:
+            start_date (str): First date of the processed range (ISO format).
+            end_date (str): Last date of the processed range (ISO format).
+            name (str, optional): Watermark name. Defaults to "daily".
+
+        Returns:
+            bool: True if the watermark moved.
+        """
+        current = self.get_watermark(name)
+        previous = datetime.date.fromisoformat(start_date) - datetime.timedelta(days=1)
+        advanced = current is None or previous.isoformat() <= current < end_date
+        if advanced:
+            watermarks = self._local_watermarks()
+            watermarks[name] = end_date
+            path = os.path.join(self.spool.directory, WATERMARK_FILE)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(watermarks, f)
+            os.replace(f"{path}.tmp", path)
+        try:
+            self.repository.advance_watermark(start_date, end_date, name)
+        except UNAVAILABLE:
+            logging.warning("Database unavailable; watermark kept in the spool")
+        return advanced
+
+    def _local_watermarks(self) -> Dict[str, str]:
+        """Watermarks kept in the spool directory."""
+        try:
+            with open(os.path.join(self.spool.directory, WATERMARK_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
@@ -0,0 +1,284 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable sketch for approximate quantiles.
+
+    Values are counted in logarithmic buckets of their magnitude, so every
+    reported quantile is within `relative_accuracy` of a value that was
+    actually observed. Negative values (e.g. CPA of refunded spend) go to a
+    mirrored store and zeros are counted apart. Memory is bounded by
+    `max_buckets` per store; past that, the buckets nearest zero are folded
+    together, which only degrades accuracy there. Two sketches with the same
+    accuracy can be merged, e.g. to combine results from workers.
+
+    Attributes:
+        relative_accuracy (float): Relative error bound of reported quantiles.
+        max_buckets (int): Maximum number of buckets kept.
+        count (int): Number of values added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy (float, optional): Relative error bound. Defaults to 0.01.
+            max_buckets (int, optional): Bucket limit. Defaults to 2048.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.negative_buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, values: Iterable[float]) -> None:
+        """
+        Add values to the sketch. NaN values are ignored.
+
+        Args:
+            values: Values to count.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        negative = values[values < 0]
+        self.zero_count += len(values) - len(positive) - len(negative)
+        self.count += len(values)
+        self._add_to(self.buckets, positive)
+        self._add_to(self.negative_buckets, -negative)
+        self._collapse()
+
+    def _add_to(self, buckets: Dict[int, int], magnitudes: np.ndarray) -> None:
+        """Count positive magnitudes into their logarithmic buckets."""
+        keys, counts = np.unique(
+            np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+            return_counts=True,
+        )
+        for key, n in zip(keys.tolist(), counts.tolist()):
+            buckets[key] = buckets.get(key, 0) + n
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other (QuantileSketch): Sketch built with the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        for key, n in other.negative_buckets.items():
+            self.negative_buckets[key] = self.negative_buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            Optional[float]: Estimated value, or None if the sketch is empty.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative first, i.e. largest magnitude of the mirrored store
+        for key in sorted(self.negative_buckets, reverse=True):
+            seen += self.negative_buckets[key]
+            if rank < seen:
+                return -self._midpoint(key)
+        seen += self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return self._midpoint(key)
+        return self._midpoint(max(self.buckets))
+
+    def _midpoint(self, key: int) -> float:
+        """Midpoint of the bucket (gamma^(k-1), gamma^k] in relative terms."""
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def _collapse(self) -> None:
+        """Merge the lowest buckets until at most `max_buckets` remain per store."""
+        for buckets in (self.buckets, self.negative_buckets):
+            if len(buckets) <= self.max_buckets:
+                continue
+            keys = sorted(buckets)
+            folded = keys[: len(keys) - self.max_buckets + 1]
+            for key in folded[:-1]:
+                buckets[folded[-1]] += buckets.pop(key)
+
+
+class SummaryStats:
+    """
+    Streaming summary of processed records and their CPA.
+
+    Keeps running totals, CPA min/max/mean, approximate CPA percentiles and
+    per-campaign spend and conversions. Memory does not grow with the number
+    of records; only with the number of distinct campaigns. Summaries built
+    on separate workers can be combined with `merge`.
+
+    Attributes:
+        records (int): Number of records seen.
+        cpa_count (int): Number of records with a defined CPA.
+        cpa_sum (float): Sum of defined CPA values.
+        cpa_min (Optional[float]): Smallest CPA seen.
+        cpa_max (Optional[float]): Largest CPA seen.
+        spend (float): Spend of records with a defined CPA.
+        conversions (float): Conversions of records with a defined CPA.
+        sketch (QuantileSketch): CPA distribution.
+        campaigns (Dict[str, List[float]]): [records, spend, conversions]
+                                           per campaign.
+    """
+
+    PERCENTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty summary.
+
+        Args:
+            relative_accuracy (float, optional): Percentile accuracy. Defaults to 0.01.
+        """
+        self.records = 0
+        self.cpa_count = 0
+        self.cpa_sum = 0.0
+        self.cpa_min: Optional[float] = None
+        self.cpa_max: Optional[float] = None
+        self.spend = 0.0
+        self.conversions = 0.0
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.campaigns: Dict[str, List[float]] = {}
+
+    @classmethod
+    def from_values(cls, cpa_values: Iterable[float]) -> "SummaryStats":
+        """
+        Build a summary from bare CPA values (no per-campaign breakdown).
+
+        Args:
+            cpa_values: CPA values; None/NaN are ignored.
+
+        Returns:
+            SummaryStats: Summary of the values.
+        """
+        stats = cls()
+        values = np.array(
+            [np.nan if v is None else v for v in cpa_values], dtype=np.float64
+        )
+        stats._add_cpa(values[~np.isnan(values)])
+        return stats
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        Add a processed partition to the summary.
+
+        Args:
+            df (pd.DataFrame): Rows with campaign_id, spend, conversions and cpa.
+        """
+        self.records += len(df)
+        cpa = df["cpa"].to_numpy(dtype=np.float64, na_value=np.nan)
+        defined = ~np.isnan(cpa)
+        self._add_cpa(cpa[defined])
+        self.spend += float(df["spend"].to_numpy()[defined].sum())
+        self.conversions += float(df["conversions"].to_numpy()[defined].sum())
+
+        per_campaign = df.groupby("campaign_id", sort=False, observed=True).agg(
+            records=("spend", "size"),
+            spend=("spend", "sum"),
+            conversions=("conversions", "sum"),
+        )
+        for campaign_id, row in zip(
+            per_campaign.index.tolist(), per_campaign.itertuples(index=False)
+        ):
+            totals = self.campaigns.setdefault(str(campaign_id), [0, 0.0, 0.0])
+            totals[0] += int(row.records)
+            totals[1] += float(row.spend)
+            totals[2] += float(row.conversions)
+
+    def merge(self, other: "SummaryStats") -> None:
+        """
+        Fold another summary into this one.
+
+        Args:
+            other (SummaryStats): Summary built on another worker.
+        """
+        self.records += other.records
+        self.cpa_count += other.cpa_count
+        self.cpa_sum += other.cpa_sum
+        self.cpa_min = _combine(min, self.cpa_min, other.cpa_min)
+        self.cpa_max = _combine(max, self.cpa_max, other.cpa_max)
+        self.spend += other.spend
+        self.conversions += other.conversions
+        self.sketch.merge(other.sketch)
+        for campaign_id, (records, spend, conversions) in other.campaigns.items():
+            totals = self.campaigns.setdefault(campaign_id, [0, 0.0, 0.0])
+            totals[0] += records
+            totals[1] += spend
+            totals[2] += conversions
+
+    @property
+    def average_cpa(self) -> Optional[float]:
+        """Mean of the defined per-record CPA values."""
+        return self.cpa_sum / self.cpa_count if self.cpa_count else None
+
+    @property
+    def overall_cpa(self) -> Optional[float]:
+        """Total spend over total conversions, i.e. CPA weighted by volume."""
+        return self.spend / self.conversions if self.conversions else None
+
+    def percentiles(self) -> Dict[float, Optional[float]]:
+        """Approximate CPA percentiles keyed by quantile."""
+        return {q: self.sketch.quantile(q) for q in self.PERCENTILES}
+
+    def top_campaigns(self, limit: int) -> List[Tuple[str, int, float, float]]:
+        """
+        Campaigns with the highest spend.
+
+        Args:
+            limit (int): Maximum number of campaigns returned.
+
+        Returns:
+            List of (campaign_id, records, spend, conversions), by spend.
+        """
+        ranked = sorted(self.campaigns.items(), key=lambda item: -item[1][1])
+        return [(cid, int(r), s, c) for cid, (r, s, c) in ranked[:limit]]
+
+    def _add_cpa(self, values: np.ndarray) -> None:
+        """Add defined CPA values to the running statistics."""
+        if len(values) == 0:
+            return
+        self.cpa_count += len(values)
+        self.cpa_sum += float(values.sum())
+        self.cpa_min = _combine(min, self.cpa_min, float(values.min()))
+        self.cpa_max = _combine(max, self.cpa_max, float(values.max()))
+        self.sketch.add(values)
+
+
+def _combine(func, a: Optional[float], b: Optional[float]) -> Optional[float]:
+    """Apply min/max to two optional values."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return func(a, b)
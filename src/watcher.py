@@ -0,0 +1,347 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import (
+    FEED_COLUMNS,
+    MERGE_KEYS,
+    detect_format,
+    filter_date_range,
+    normalize_feed,
+    value_columns,
+)
+from src.db_repository import DatabaseRepository
+from src.metrics import registry
+
+# A (date string, campaign ID) key
+Key = Tuple[str, str]
+
+
+class FeedTail:
+    """
+    Reads the NDJSON records appended to a feed since the previous call.
+
+    The byte offset of the last complete line is kept between calls; a
+    trailing line without its newline is left for the next call. If the
+    file is truncated or replaced (a smaller size or a new inode), reading
+    starts again from the beginning and `poll` reports a reset.
+
+    Attributes:
+        path (str): Path of the feed.
+        offset (int): Bytes consumed so far.
+        max_bytes (int): Most bytes read per call, bounding catch-up memory.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 << 20):
+        """
+        Initialize the tail at the start of the file.
+
+        Args:
+            path (str): Path of an NDJSON feed.
+            max_bytes (int, optional): Most bytes read per call. Defaults to 64 MiB.
+        """
+        self.path = path
+        self.offset = 0
+        self.max_bytes = max_bytes
+        self._inode: Optional[int] = None
+
+    def poll(self) -> Tuple[pd.DataFrame, bool]:
+        """
+        Read the complete records appended since the last call.
+
+        Returns:
+            Tuple[pd.DataFrame, bool]: The new records (normalized like
+                `NdjsonFormat`), and whether the file was truncated or
+                replaced so that the records start from its beginning.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=MERGE_KEYS), False
+        reset = self._inode is not None and (
+            stat.st_ino != self._inode or stat.st_size < self.offset
+        )
+        if reset:
+            logging.warning(f"{self.path} was truncated or replaced; re-reading it")
+            self.offset = 0
+        self._inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return pd.DataFrame(columns=MERGE_KEYS), reset
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(self.max_bytes)
+        end = data.rfind(b"\n") + 1
+        if not end:
+            if len(data) == self.max_bytes:
+                raise ValueError(
+                    f"{self.path}: line at byte {self.offset} is longer than "
+                    f"{self.max_bytes} bytes"
+                )
+            return pd.DataFrame(columns=MERGE_KEYS), reset
+        self.offset += end
+        return parse_records(data[:end], self.path), reset
+
+
+def parse_records(data: bytes, path: str) -> pd.DataFrame:
+    """
+    Parse complete NDJSON lines, skipping (and logging) malformed ones.
+
+    Args:
+        data (bytes): One or more newline-terminated records.
+        path (str): Feed path, for log messages.
+
+    Returns:
+        pd.DataFrame: The records, normalized like `NdjsonFormat`.
+    """
+    if not data.strip():
+        return pd.DataFrame(columns=MERGE_KEYS)
+    try:
+        df = pd.read_json(io.BytesIO(data), lines=True, dtype={"campaign_id": str})
+    except ValueError:
+        # One bad line must not stall the tail; keep every line that parses
+        records = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping malformed record in {path}: {line[:80]!r}")
+        df = pd.DataFrame.from_records(records)
+    if not set(MERGE_KEYS) <= set(df.columns):
+        return pd.DataFrame(columns=MERGE_KEYS)
+    return normalize_feed(df.dropna(subset=MERGE_KEYS))
+
+
+class FeedWatcher:
+    """
+    Keeps `daily_stats` current by tailing appended NDJSON feed records.
+
+    Each feed is tailed by byte offset (see `FeedTail`) and its value columns
+    are summed per (date, campaign_id) in memory, as `collapse_duplicates`
+    would. Keys touched by new records are collected and flushed as one
+    micro-batch once `flush_rows` keys are pending or the oldest has waited
+    `flush_seconds`: the batch is merged from the running totals, its metrics
+    are computed and it is upserted. Only the touched keys are written, so
+    database load follows the append rate rather than the feed size.
+
+    When a feed is truncated or replaced, its totals are rebuilt from the new
+    file. Keys that are not (yet) in the new file keep their earlier totals
+    for that feed, so a rotation never writes a zero over stored values.
+
+    Attributes:
+        calculator (CpaCalculator): Computes the metrics of each batch.
+        repository (DatabaseRepository): Receives the batches.
+        flush_rows (int): Pending keys that trigger a flush.
+        flush_seconds (float): Longest a pending key waits for its flush.
+        poll_interval (float): Seconds between polls of the feeds.
+        start_date (str, optional): Ignore records before this date.
+        end_date (str, optional): Ignore records after this date.
+    """
+
+    def __init__(
+        self,
+        spend_path: str,
+        conv_path: str,
+        calculator: CpaCalculator,
+        repository: DatabaseRepository,
+        flush_rows: int = 10_000,
+        flush_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the watcher.
+
+        Args:
+            spend_path (str): Path of the NDJSON spend feed.
+            conv_path (str): Path of the NDJSON conversions feed.
+            calculator (CpaCalculator): Computes the metrics of each batch.
+            repository (DatabaseRepository): Receives the batches.
+            flush_rows (int, optional): Pending keys that trigger a flush.
+                                        Defaults to 10000.
+            flush_seconds (float, optional): Longest wait before a flush.
+                                             Defaults to 60.
+            poll_interval (float, optional): Seconds between polls. Defaults to 1.
+            start_date (str, optional): Ignore records before this date.
+            end_date (str, optional): Ignore records after this date.
+            clock (Callable, optional): Monotonic clock, replaceable in tests.
+
+        Raises:
+            ValueError: If a feed is not NDJSON or a setting is not positive.
+        """
+        for path in (spend_path, conv_path):
+            if os.path.exists(path) and detect_format(path).name != "ndjson":
+                raise ValueError(f"Watch mode needs NDJSON feeds, got {path}")
+        if flush_rows < 1 or flush_seconds <= 0 or poll_interval <= 0:
+            raise ValueError(
+                "flush_rows, flush_seconds and poll_interval must be positive"
+            )
+        self.calculator = calculator
+        self.repository = repository
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.poll_interval = poll_interval
+        self.start_date = start_date
+        self.end_date = end_date
+        self._clock = clock
+        self._tails = {"spend": FeedTail(spend_path), "conv": FeedTail(conv_path)}
+        self._totals: Dict[str, Dict[Key, Dict[str, float]]] = {
+            side: {} for side in self._tails
+        }
+        # Totals read before a feed was truncated or replaced
+        self._previous: Dict[str, Dict[Key, Dict[str, float]]] = {
+            side: {} for side in self._tails
+        }
+        self._columns: Dict[str, None] = dict.fromkeys(["spend", "conversions"])
+        self._pending: Set[Key] = set()
+        self._pending_since: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of keys waiting for the next flush."""
+        return len(self._pending)
+
+    def poll(self) -> int:
+        """
+        Read both feeds' new records into the running totals.
+
+        Returns:
+            int: Number of pending keys afterwards.
+        """
+        with registry.timed("tail") as timer:
+            for side, tail in self._tails.items():
+                df, reset = tail.poll()
+                timer.rows += len(df)
+                if reset:
+                    # Rebuild this feed's totals from the new file; until a key
+                    # reappears in it, its stored values are left untouched
+                    self._previous[side].update(self._totals[side])
+                    self._totals[side] = {}
+                self._add(side, filter_date_range(df, self.start_date, self.end_date))
+        return len(self._pending)
+
+    def _add(self, side: str, df: pd.DataFrame):
+        """Add a feed's new records to its totals and mark their keys pending."""
+        columns = value_columns(df)
+        if df.empty or not columns:
+            return
+        self._columns.update(dict.fromkeys(columns))
+        keys = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+        sums = (
+            df[columns]
+            .apply(pd.to_numeric, errors="coerce")
+            .fillna(0)
+            .groupby([keys, df["campaign_id"]], sort=False)
+            .sum()
+        )
+        totals = self._totals[side]
+        for key, values in zip(sums.index, sums.to_dict("records")):
+            row = totals.setdefault(key, {})
+            for column, value in values.items():
+                row[column] = row.get(column, 0.0) + value
+        self._touch(sums.index)
+
+    def _touch(self, keys):
+        if len(keys) and self._pending_since is None:
+            self._pending_since = self._clock()
+        self._pending.update(keys)
+
+    def due(self) -> bool:
+        """Whether the pending keys should be flushed now."""
+        return bool(self._pending) and (
+            len(self._pending) >= self.flush_rows
+            or self._clock() - self._pending_since >= self.flush_seconds
+        )
+
+    def batch(self) -> pd.DataFrame:
+        """
+        Merge the pending keys' totals into one frame, as `merge_feeds` would.
+
+        Returns:
+            pd.DataFrame: One row per pending key present in either feed.
+        """
+        columns = [c for c in FEED_COLUMNS if c in self._columns]
+        rows: List[dict] = []
+        for key in sorted(self._pending):
+            spend, conv = (self._side_totals(side, key) for side in self._tails)
+            if spend is None and conv is None:
+                continue
+            row = dict.fromkeys(columns, 0.0)
+            row.update(spend or {})
+            row.update(conv or {})
+            rows.append({"date": key[0], "campaign_id": key[1], **row})
+        df = pd.DataFrame(rows, columns=MERGE_KEYS + columns)
+        return df.assign(date=pd.to_datetime(df["date"]))
+
+    def _side_totals(self, side: str, key: Key) -> Optional[Dict[str, float]]:
+        """A key's totals in one feed, falling back to those read before a reset."""
+        totals = self._totals[side].get(key)
+        return self._previous[side].get(key) if totals is None else totals
+
+    def flush(self) -> int:
+        """
+        Compute and upsert the pending keys.
+
+        If the upsert fails, the keys stay pending and are retried after
+        `flush_seconds`.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if not self._pending:
+            return 0
+        df = self.batch()
+        keys, self._pending, self._pending_since = self._pending, set(), None
+        if df.empty:
+            return 0
+        try:
+            with registry.timed("compute", rows=len(df)):
+                df = self.calculator.process(df)
+            with registry.timed("upsert", rows=len(df)):
+                self.repository.upsert(df)
+        except Exception:
+            self._touch(keys | self._pending)
+            raise
+        logging.info(f"Flushed {len(df)} changed (date, campaign_id) rows")
+        return len(df)
+
+    def run(self, stop: threading.Event, on_flush: Optional[Callable] = None):
+        """
+        Poll and flush until `stop` is set, then flush what is pending.
+
+        Errors while flushing are logged and retried on a later flush.
+
+        Args:
+            stop (threading.Event): Set to end the loop.
+            on_flush (Callable, optional): Called with each written row count.
+        """
+        logging.info(
+            f"Watching feeds every {self.poll_interval:g}s, flushing at "
+            f"{self.flush_rows} keys or {self.flush_seconds:g}s"
+        )
+        while True:
+            stopping = stop.is_set()
+            try:
+                self.poll()
+                if self.due() or (stopping and self._pending):
+                    written = self.flush()
+                    if on_flush is not None:
+                        on_flush(written)
+            except Exception:
+                if stopping:
+                    raise
+                logging.exception("Watch flush failed; retrying later.")
+            if stopping:
+                return
+            stop.wait(self.poll_interval)
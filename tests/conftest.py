@@ -0,0 +1,22 @@
+import pytest
+
+from tests.helpers import write_feed
+
+
+@pytest.fixture
+def write_feeds(tmp_path):
+    """
+    Factory writing a spend and a conversions feed into `tmp_path`.
+
+    Call it with the records of both feeds and, optionally, the two file
+    names (an `.ndjson` name writes NDJSON). Returns both paths.
+    """
+
+    def write(spend, conv, names=("spend.json", "conv.json")):
+        spend_name, conv_name = names
+        return (
+            write_feed(tmp_path / spend_name, spend),
+            write_feed(tmp_path / conv_name, conv),
+        )
+
+    return write
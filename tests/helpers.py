@@ -0,0 +1,25 @@
+"""Helpers shared by the test modules."""
+
+import json
+
+import pandas as pd
+
+
+def write_feed(path, records):
+    """Write records as NDJSON for `.ndjson`/`.jsonl` paths, else as a JSON array."""
+    if path.suffix in (".ndjson", ".jsonl"):
+        path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    else:
+        path.write_text(json.dumps(records, indent=2))
+    return str(path)
+
+
+def normalize(df: pd.DataFrame, columns=("spend", "conversions")) -> pd.DataFrame:
+    """Feed rows with float values in a canonical order, for frame comparisons."""
+    columns = list(columns)
+    return (
+        df[["date", "campaign_id", *columns]]
+        .astype({"campaign_id": str, **{c: float for c in columns}})
+        .sort_values(["date", "campaign_id"])
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from src.backfill import ShardedBackfill, split_shards
+from src.db_repository import DateLease, SqliteRepository, utcnow
+
+SPEND_PATH = "data/fb_spend.json"
+CONV_PATH = "data/network_conv.json"
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'stats.db'}"
+
+
+@pytest.fixture
+def repo(db_url):
+    return SqliteRepository(sa.create_engine(db_url))
+
+
+def stored_dates(repo):
+    with repo.engine.connect() as conn:
+        return sorted(
+            str(row.date)
+            for row in conn.execute(sa.text("SELECT DISTINCT date FROM daily_stats"))
+        )
+
+
+def put_lease(repo, date, owner, expires_in):
+    with repo.engine.begin() as conn:
+        conn.execute(
+            sa.insert(DateLease).values(
+                date=date,
+                owner=owner,
+                expires_at=utcnow() + datetime.timedelta(seconds=expires_in),
+                attempts=1,
+            )
+        )
+
+
+def test_claim_renew_release(repo):
+    assert repo.claim_date("2025-06-04", "a", 60) == 1
+    assert repo.claim_date("2025-06-04", "b", 60) is None
+    assert repo.renew_leases(["2025-06-04"], "b", 60) == 0
+    assert repo.renew_leases(["2025-06-04"], "a", 60) == 1
+
+    repo.release_date("2025-06-04", "a", completed=False)
+    assert repo.claim_date("2025-06-04", "b", 60) == 2
+    repo.release_date("2025-06-04", "b", completed=True)
+    assert repo.claim_date("2025-06-04", "a", 60) == 1
+
+
+def test_expired_lease_can_be_taken_over(repo):
+    put_lease(repo, "2025-06-04", "crashed", expires_in=-1)
+    assert repo.claim_date("2025-06-04", "b", 60) == 2
+
+
+def test_split_shards():
+    dates = [f"2025-06-0{i}" for i in range(1, 8)]
+    assert split_shards(dates, 3) == [dates[:3], dates[3:6], dates[6:]]
+
+
+def test_backfill_processes_range_once(repo, db_url, capsys):
+    backfill = ShardedBackfill(db_url, SPEND_PATH, CONV_PATH, workers=2)
+    printed = []
+    stats = backfill.run(
+        "2025-06-03", "2025-06-07", lambda d, n: printed.append((d, n))
+    )
+    assert sorted(printed) == [("2025-06-04", 2), ("2025-06-05", 3), ("2025-06-06", 2)]
+    assert stats.records == 7
+    assert round(stats.average_cpa, 2) == 4.51
+    assert stored_dates(repo) == ["2025-06-04", "2025-06-05", "2025-06-06"]
+
+    # A second instance finds every date already stored
+    printed.clear()
+    assert backfill.run("2025-06-03", "2025-06-07", printed.append).records == 0
+    assert printed == []
+
+
+def test_backfill_retries_abandoned_date(repo, db_url):
+    put_lease(repo, "2025-06-05", "crashed", expires_in=-1)
+    ShardedBackfill(db_url, SPEND_PATH, CONV_PATH, workers=1).run(
+        "2025-06-04", "2025-06-06"
+    )
+    assert stored_dates(repo) == ["2025-06-04", "2025-06-05", "2025-06-06"]
+    with repo.engine.connect() as conn:
+        lease = conn.execute(
+            sa.select(DateLease).where(DateLease.date == "2025-06-05")
+        ).one()
+    assert lease.owner is None
+    assert lease.attempts == 0
+
+
+def test_backfill_leaves_date_leased_elsewhere(repo, db_url):
+    put_lease(repo, "2025-06-05", "other-replica", expires_in=600)
+    stats = ShardedBackfill(
+        db_url, SPEND_PATH, CONV_PATH, workers=1, max_attempts=2, retry_interval=0
+    ).run("2025-06-04", "2025-06-06")
+    assert stats.records == 4
+    assert stored_dates(repo) == ["2025-06-04", "2025-06-06"]
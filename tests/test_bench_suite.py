@@ -0,0 +1,64 @@
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from benchmarks import bench_suite
+from benchmarks.bench_suite import DEFAULT_BASELINE, find_regressions, generate_feeds
+
+
+def test_generate_feeds_is_seeded(tmp_path):
+    first = tmp_path / "a"
+    second = tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    spend_a, conv_a = generate_feeds(str(first), campaigns=20, days=5, seed=1)
+    spend_b, conv_b = generate_feeds(str(second), campaigns=20, days=5, seed=1)
+    assert open(spend_a).read() == open(spend_b).read()
+    assert open(conv_a).read() == open(conv_b).read()
+
+
+def test_generate_feeds_overlap(tmp_path):
+    spend_path, conv_path = generate_feeds(
+        str(tmp_path), campaigns=50, days=20, overlap=0.6
+    )
+    spend = pd.read_json(spend_path)
+    conv = pd.read_json(conv_path)
+    keys = ["date", "campaign_id"]
+    both = spend.merge(conv, on=keys)
+    union = spend[keys].merge(conv[keys], on=keys, how="outer")
+    assert len(union) == 50 * 20
+    assert 0.5 < len(both) / len(union) < 0.7
+
+
+def test_find_regressions():
+    baseline = {"read/1x1": {"seconds": 1.0}, "run/1x1": {"seconds": 0.001}}
+    results = {
+        "read/1x1": {"seconds": 1.3},
+        "run/1x1": {"seconds": 0.003},
+        "new/1x1": {"seconds": 9.0},
+    }
+    regressions = find_regressions(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("read/1x1")
+
+
+def test_committed_baseline_covers_default_scales():
+    with open(DEFAULT_BASELINE, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    assert {
+        f"{step}/{scale}"
+        for step in ("read", "process", "upsert", "run")
+        for scale in ("100x30", "1000x90")
+    } <= set(baseline)
+
+
+def test_missing_baseline_fails_before_timing(tmp_path, monkeypatch, mocker):
+    bench_scale = mocker.patch.object(bench_suite, "bench_scale")
+    missing = str(tmp_path / "baseline.json")
+    monkeypatch.setattr(sys, "argv", ["bench_suite", "--baseline", missing])
+    with pytest.raises(SystemExit) as exit_info:
+        bench_suite.main()
+    assert exit_info.value.code == 1
+    bench_scale.assert_not_called()
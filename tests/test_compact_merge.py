@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import (
+    JsonDataReader,
+    StreamingJsonDataReader,
+    merge_feeds,
+    merge_feeds_compact,
+    partition_fingerprint,
+)
+from src.db_repository import DailyStats, SqliteRepository
+from src.feed_cache import CachedDataReader
+
+SPEND = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 37.5},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "spend": 19.9},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": 42.1},
+    {"date": "2025-06-05", "campaign_id": "CAMP-789", "spend": 11.0},
+    {"date": "2025-06-06", "campaign_id": "CAMP-999", "spend": 5.25},
+]
+CONV = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 14},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "conversions": 3},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "conversions": 10},
+    {"date": "2025-06-05", "campaign_id": "CAMP-456", "conversions": 5},
+    {"date": "2025-06-07", "campaign_id": "CAMP-888", "conversions": 7},
+]
+
+
+@pytest.fixture
+def feeds(write_feeds):
+    return write_feeds(SPEND, CONV)
+
+
+def decoded(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({"campaign_id": str, "conversions": "float64"})
+
+
+def random_feeds(seed: int, rows: int, campaigns: int, days: int):
+    rng = np.random.default_rng(seed)
+
+    def keys():
+        return pd.DataFrame(
+            {
+                "date": pd.Timestamp("2025-01-01")
+                + pd.to_timedelta(rng.integers(0, days, rows), unit="D"),
+                "campaign_id": [f"C{i}" for i in rng.integers(0, campaigns, rows)],
+            }
+        ).drop_duplicates()
+
+    spend_df = keys()
+    spend_df["spend"] = np.round(rng.uniform(0, 100, len(spend_df)), 2)
+    conv_df = keys()
+    conv_df["conversions"] = rng.integers(0, 20, len(conv_df)).astype(float)
+    return spend_df, conv_df
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize(
+    "campaigns, days",
+    [(20, 5), (5000, 400)],  # dense and sparse key spaces
+)
+def test_compact_merge_matches_merge_feeds(seed, campaigns, days):
+    spend_df, conv_df = random_feeds(seed, 200, campaigns, days)
+    result = merge_feeds_compact(spend_df, conv_df)
+    assert isinstance(result["campaign_id"].dtype, pd.CategoricalDtype)
+    assert result["conversions"].dtype == np.int32
+    pd.testing.assert_frame_equal(decoded(result), merge_feeds(spend_df, conv_df))
+
+
+def test_compact_merge_keeps_duplicates_and_fractions():
+    spend_df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-06-04", "2025-06-04"]),
+            "campaign_id": ["A", "A"],
+            "spend": [1.0, 2.0],
+        }
+    )
+    conv_df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-06-04", "2025-06-05"]),
+            "campaign_id": ["A", "B"],
+            "conversions": [1.5, np.nan],
+        }
+    )
+    result = merge_feeds_compact(spend_df, conv_df)
+    # Fractional conversions are not downcast
+    assert result["conversions"].dtype == np.float64
+    pd.testing.assert_frame_equal(
+        result.astype({"campaign_id": str}), merge_feeds(spend_df, conv_df)
+    )
+
+
+def test_compact_merge_with_empty_side():
+    spend_df = pd.DataFrame(SPEND).assign(date=lambda df: pd.to_datetime(df["date"]))
+    conv_df = pd.DataFrame(
+        {
+            "date": pd.Series(dtype="datetime64[us]"),
+            "campaign_id": pd.Series(dtype=str),
+            "conversions": pd.Series(dtype=float),
+        }
+    )
+    result = merge_feeds_compact(spend_df, conv_df)
+    pd.testing.assert_frame_equal(decoded(result), merge_feeds(spend_df, conv_df))
+
+
+@pytest.mark.parametrize(
+    "make_reader",
+    [
+        JsonDataReader,
+        lambda compact: StreamingJsonDataReader(chunk_size=2, compact=compact),
+    ],
+)
+def test_compact_partitions_match(feeds, make_reader):
+    expected = dict(make_reader(compact=False).read_partitions(*feeds))
+    result = dict(make_reader(compact=True).read_partitions(*feeds))
+    assert list(result) == list(expected)
+    for date_str, df in result.items():
+        pd.testing.assert_frame_equal(
+            decoded(df).reset_index(drop=True),
+            decoded(expected[date_str]).reset_index(drop=True),
+        )
+        assert partition_fingerprint(df) == partition_fingerprint(expected[date_str])
+        np.testing.assert_array_equal(
+            CpaCalculator().process(df.copy())["cpa"],
+            CpaCalculator().process(expected[date_str].copy())["cpa"],
+        )
+
+
+def test_cached_compact_partitions(feeds, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    expected = dict(JsonDataReader().read_partitions(*feeds))
+    reader = CachedDataReader(JsonDataReader(compact=True), cache_dir)
+    for _ in range(2):
+        result = dict(reader.read_partitions(*feeds))
+        assert list(result) == list(expected)
+        for date_str, df in result.items():
+            assert df["conversions"].dtype == np.int32
+            pd.testing.assert_frame_equal(
+                decoded(df), expected[date_str].reset_index(drop=True)
+            )
+
+
+def test_compact_rows_are_stored_identically(feeds):
+    stored = []
+    for compact in (False, True):
+        engine = create_engine("sqlite://")
+        repository = SqliteRepository(engine)
+        df = CpaCalculator().process(JsonDataReader(compact=compact).read(*feeds))
+        repository.upsert(df)
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(DailyStats).order_by(DailyStats.date, DailyStats.campaign_id)
+            ).all()
+        stored.append([tuple(row) for row in rows])
+    assert stored[0] == stored[1]
@@ -3,10 +3,16 @@ import pytest
 import pandas as pd
 from run import print_summary
 from src.cpa_calculator import calculate_cpa, CpaCalculator
-from src.data_reader import JsonDataReader
-from src.db_repository import PostgresRepository
+from src.data_reader import JsonDataReader, partition_fingerprint
+from src.db_repository import (
+    PostgresRepository,
+    SqliteRepository,
+    create_month_partitions,
+    create_repository,
+)
 import json
 import sqlalchemy as sa
+from tenacity import wait_none
 from unittest.mock import Mock
 
 
@@ -74,6 +80,27 @@ def test_merge_data(sample_data):
     assert df.iloc[1]["conversions"] == 3
 
 
+def test_read_partitions(tmp_path):
+    spend_data = [
+        {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 37.5},
+        {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": 42.1},
+    ]
+    conv_data = [
+        {"date": "2025-06-04", "campaign_id": "CAMP-456", "conversions": 3},
+        {"date": "2025-06-05", "campaign_id": "CAMP-123", "conversions": 10},
+    ]
+    spend_path = tmp_path / "spend.json"
+    conv_path = tmp_path / "conv.json"
+    spend_path.write_text(json.dumps(spend_data))
+    conv_path.write_text(json.dumps(conv_data))
+
+    partitions = dict(JsonDataReader().read_partitions(str(spend_path), str(conv_path)))
+    assert list(partitions) == ["2025-06-04", "2025-06-05"]
+    assert len(partitions["2025-06-04"]) == 2
+    assert len(partitions["2025-06-05"]) == 1
+    assert partitions["2025-06-05"].iloc[0]["conversions"] == 10
+
+
 def test_merge_data_invalid_json(tmp_path):
     reader = JsonDataReader()
     invalid_json = tmp_path / "invalid.json"
@@ -113,6 +140,67 @@ def test_postgres_repository_upsert(mocker):
     assert mock_conn.execute.called
 
 
+def mock_connection(mocker, engine):
+    mock_conn = Mock()
+    mock_conn.__enter__ = Mock(return_value=mock_conn)
+    mock_conn.__exit__ = Mock(return_value=None)
+
+    mock_transaction = Mock()
+    mock_transaction.__enter__ = Mock(return_value=mock_transaction)
+    mock_transaction.__exit__ = Mock(return_value=None)
+    mock_conn.begin = Mock(return_value=mock_transaction)
+    mocker.patch.object(engine, "connect", return_value=mock_conn)
+    return mock_conn
+
+
+def test_postgres_repository_upsert_batches(mocker):
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine)
+    rows = 30_000
+    df = pd.DataFrame(
+        {
+            "date": "2025-06-04",
+            "campaign_id": [f"CAMP-{i}" for i in range(rows)],
+            "spend": 1.0,
+            "conversions": 1,
+            "cpa": 1.0,
+        }
+    )
+    mock_conn = mock_connection(mocker, engine)
+    repo.upsert(df)
+    # 65535 bind parameters / 5 columns -> 13107 rows per statement
+    tables = [c.args[0].table.name for c in mock_conn.execute.call_args_list]
+    assert tables.count("daily_stats") == 3
+
+
+def test_postgres_repository_bulk_upsert(mocker):
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine, bulk=True, batch_size=2)
+    df = pd.DataFrame(
+        [
+            {
+                "date": "2025-06-04",
+                "campaign_id": f"CAMP-{i}",
+                "spend": 10.0,
+                "conversions": float(i),
+                "cpa": 10.0 / i if i else float("nan"),
+            }
+            for i in range(5)
+        ]
+    )
+    mock_conn = mock_connection(mocker, engine)
+    cursor = mock_conn.connection.cursor.return_value
+    repo.upsert(df)
+
+    assert cursor.copy_expert.call_count == 3
+    first_batch = cursor.copy_expert.call_args_list[0].args[1].getvalue()
+    assert first_batch.splitlines()[0] == "2025-06-04,CAMP-0,10.0,0,\\N"
+    statements = [c.args[0] for c in mock_conn.exec_driver_sql.call_args_list]
+    assert statements[0].startswith("CREATE TEMP TABLE daily_stats_staging")
+    assert "ON CONFLICT (date, campaign_id) DO UPDATE" in statements[-1]
+    cursor.close.assert_called_once()
+
+
 def test_postgres_repository_check_date(mocker):
     engine = sa.create_engine("sqlite:///:memory:")
     repo = PostgresRepository(engine)
@@ -124,6 +212,29 @@ def test_postgres_repository_check_date(mocker):
     assert repo.check_date_exists("2025-06-04") is False
 
 
+def test_postgres_repository_processed_dates():
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine)
+    df = pd.DataFrame(
+        {
+            "date": ["2025-06-04", "2025-06-05", "2025-06-05"],
+            "campaign_id": ["CAMP-123", "CAMP-123", "CAMP-456"],
+            "spend": [37.5, 42.1, 0.0],
+            "conversions": [14, 10, 5],
+            "cpa": [37.5 / 14, 4.21, None],
+        }
+    )
+    repo.upsert(df)
+
+    assert repo.get_processed_dates("2025-06-01", "2025-06-30") == {
+        "2025-06-04",
+        "2025-06-05",
+    }
+    assert repo.get_processed_dates("2025-06-05", "2025-06-06") == {"2025-06-05"}
+    assert repo.check_date_exists("2025-06-05") is True
+    assert repo.check_date_exists("2025-06-06") is False
+
+
 def test_print_summary(capsys):
     print_summary(3, [2.68, 6.63, 4.21])
     captured = capsys.readouterr()
@@ -132,3 +243,161 @@ def test_print_summary(capsys):
     print_summary(0, [])
     captured = capsys.readouterr()
     assert "Summary: No records processed." in captured.out
+
+
+def test_partition_fingerprint_and_storage():
+    df = pd.DataFrame(
+        {
+            "date": ["2025-06-04", "2025-06-04"],
+            "campaign_id": ["CAMP-123", "CAMP-456"],
+            "spend": [37.5, 19.9],
+            "conversions": [14, 3],
+        }
+    )
+    shuffled = df.iloc[::-1].astype({"conversions": float})
+    late = df.assign(conversions=[14, 4])
+    assert partition_fingerprint(df) == partition_fingerprint(shuffled)
+    assert partition_fingerprint(df) != partition_fingerprint(late)
+
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine)
+    repo.upsert(CpaCalculator().process(df.copy()))
+    stored = repo.get_fingerprints("2025-06-01", "2025-06-30")
+    assert stored == {"2025-06-04": partition_fingerprint(df)}
+
+
+def test_sqlite_repository_upsert(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    repo = create_repository(engine)
+    assert isinstance(repo, SqliteRepository)
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-06-04", "2025-06-04"]),
+            "campaign_id": ["CAMP-123", "CAMP-456"],
+            "spend": [37.5, 19.9],
+            "conversions": [14.0, 0.0],
+        }
+    )
+    repo.upsert(CpaCalculator().process(df.copy()))
+    repo.upsert(CpaCalculator().process(df.assign(conversions=[14.0, 3.0])))
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT campaign_id, conversions, cpa FROM daily_stats ORDER BY 1"
+        ).fetchall()
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    assert rows[0] == ("CAMP-123", 14, pytest.approx(37.5 / 14))
+    assert rows[1] == ("CAMP-456", 3, pytest.approx(19.9 / 3))
+    assert journal_mode == "wal"
+    assert repo.check_date_exists("2025-06-04") is True
+
+
+def test_sqlite_migrates_text_dates(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_stats (date VARCHAR NOT NULL, "
+            "campaign_id VARCHAR NOT NULL, spend FLOAT, conversions INTEGER, "
+            "cpa FLOAT, PRIMARY KEY (date, campaign_id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO daily_stats VALUES "
+            "('2025-06-04 00:00:00', 'CAMP-123', 37.5, 14, 2.68)"
+        )
+    SqliteRepository(engine)
+
+    inspector = sa.inspect(engine)
+    assert isinstance(inspector.get_columns("daily_stats")[0]["type"], sa.Date)
+    assert "ix_daily_stats_campaign_id" in {
+        index["name"] for index in inspector.get_indexes("daily_stats")
+    }
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT date FROM daily_stats").scalar() == (
+            "2025-06-04"
+        )
+
+
+def test_existing_dates_are_seeded_as_processed(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'upgraded.db'}")
+    with engine.begin() as conn:
+        # An install from before processed_partitions existed
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_stats (date DATE NOT NULL, "
+            "campaign_id VARCHAR NOT NULL, spend FLOAT, conversions INTEGER, "
+            "cpa FLOAT, PRIMARY KEY (date, campaign_id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO daily_stats VALUES "
+            "('2025-06-04', 'CAMP-123', 37.5, 14, 2.68), "
+            "('2025-06-04', 'CAMP-456', 19.9, 0, NULL), "
+            "('2025-06-05', 'CAMP-123', 42.1, 10, 4.21)"
+        )
+    repo = SqliteRepository(engine)
+    assert repo.get_processed_dates("2025-06-01", "2025-06-30") == {
+        "2025-06-04",
+        "2025-06-05",
+    }
+    assert repo.get_fingerprints("2025-06-01", "2025-06-30") == {
+        "2025-06-04": None,
+        "2025-06-05": None,
+    }
+
+    # Seeding happens once; later writes are recorded as usual
+    repo.upsert(
+        pd.DataFrame(
+            {
+                "date": ["2025-06-06"],
+                "campaign_id": ["CAMP-123"],
+                "spend": [1.0],
+                "conversions": [1],
+                "cpa": [1.0],
+            }
+        )
+    )
+    SqliteRepository(engine)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT date, records FROM processed_partitions ORDER BY date"
+        ).all()
+    assert rows == [("2025-06-04", 2), ("2025-06-05", 1), ("2025-06-06", 1)]
+
+
+def test_create_month_partitions():
+    conn = Mock()
+    create_month_partitions(conn, {"2025-12", "2025-11"})
+    statements = [c.args[0] for c in conn.exec_driver_sql.call_args_list]
+    assert statements == [
+        "CREATE TABLE IF NOT EXISTS daily_stats_y2025m11 PARTITION OF daily_stats "
+        "FOR VALUES FROM ('2025-11-01') TO ('2025-12-01')",
+        "CREATE TABLE IF NOT EXISTS daily_stats_y2025m12 PARTITION OF daily_stats "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')",
+    ]
+
+
+def test_partitions_are_recreated_after_a_failed_write(mocker):
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine)
+    repo.partition_by_month = True
+    mock_connection(mocker, engine)
+    create = mocker.patch("src.db_repository.create_month_partitions")
+    mocker.patch.object(
+        repo, "_write", side_effect=[sa.exc.OperationalError("", {}, None), None, None]
+    )
+    df = pd.DataFrame(
+        [
+            {
+                "date": "2025-06-04",
+                "campaign_id": "CAMP-1",
+                "spend": 1.0,
+                "conversions": 1,
+                "cpa": 1.0,
+            }
+        ]
+    )
+    PostgresRepository.upsert.retry_with(wait=wait_none())(repo, df)
+
+    # The rolled-back first attempt also undid its CREATE TABLE
+    assert [c.args[1] for c in create.call_args_list] == [{"2025-06"}, {"2025-06"}]
+    assert repo._partitions == {"2025-06"}
+    repo.upsert(df)
+    assert create.call_args_list[-1].args[1] == set()
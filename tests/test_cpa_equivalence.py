@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cpa_calculator import CpaCalculator, calculate_cpa, calculate_cpa_vectorized
+
+
+def random_frame(seed: int, rows: int) -> pd.DataFrame:
+    """Build a random campaign frame with a healthy share of zero values."""
+    rng = np.random.default_rng(seed)
+    spend = np.round(rng.uniform(0, 500, rows), 2)
+    conversions = rng.integers(0, 50, rows).astype(float)
+    spend[rng.random(rows) < 0.2] = 0.0
+    conversions[rng.random(rows) < 0.2] = 0.0
+    return pd.DataFrame(
+        {
+            "date": "2025-06-04",
+            "campaign_id": [f"CAMP-{i}" for i in range(rows)],
+            "spend": spend,
+            "conversions": conversions,
+        }
+    )
+
+
+def scalar_reference(df: pd.DataFrame) -> np.ndarray:
+    values = [calculate_cpa(s, c) for s, c in zip(df["spend"], df["conversions"])]
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("rows", [1, 17, 1000])
+def test_vectorized_matches_scalar(seed, rows):
+    df = random_frame(seed, rows)
+    expected = scalar_reference(df)
+    result = CpaCalculator().process(df.copy())["cpa"].to_numpy()
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_vectorized_zero_and_nan_inputs():
+    spend = np.array([0.0, 10.0, 0.0, np.nan, 5.0])
+    conversions = np.array([0.0, 0.0, 3.0, 2.0, np.nan])
+    result = calculate_cpa_vectorized(spend, conversions)
+    expected = [calculate_cpa(s, c) for s, c in zip(spend, conversions)]
+    assert all(np.isnan(result[:3]))
+    assert np.isnan(result[3]) and np.isnan(expected[3])
+    assert np.isnan(result[4]) and np.isnan(expected[4])
+
+
+def test_vectorized_empty_frame():
+    df = pd.DataFrame(columns=["date", "campaign_id", "spend", "conversions"])
+    result = CpaCalculator().process(df)
+    assert "cpa" in result.columns
+    assert result.empty
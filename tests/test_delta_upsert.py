@@ -0,0 +1,102 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from src.cpa_calculator import CpaCalculator
+from src.db_repository import PostgresRepository, SqliteRepository, WeeklyStats
+from src.metrics import registry
+
+
+def frame(spend, conversions, campaigns=("CAMP-1", "CAMP-2", "CAMP-3")):
+    return CpaCalculator().process(
+        pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2025-06-04"] * len(campaigns)),
+                "campaign_id": list(campaigns),
+                "spend": np.asarray(spend, dtype=float),
+                "conversions": np.asarray(conversions, dtype=float),
+            }
+        )
+    )
+
+
+def count_written_rows(engine):
+    """Count rows bound to INSERT INTO daily_stats statements."""
+    written = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO daily_stats"):
+            written.append(len(parameters) if executemany else 1)
+
+    sa.event.listen(engine, "before_cursor_execute", before_execute)
+    return written
+
+
+def test_delta_upsert_skips_unchanged_rows(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    repo = SqliteRepository(engine, delta=True)
+    written = count_written_rows(engine)
+
+    # CAMP-3 has no conversions, so its NULL CPA must compare as unchanged
+    first = frame([10.0, 20.0, 5.0], [2, 4, 0])
+    assert repo.upsert(first) == {"inserted": 3, "updated": 0, "unchanged": 0}
+    assert repo.upsert(first) == {"inserted": 0, "updated": 0, "unchanged": 3}
+    assert sum(written) == 3
+
+    second = frame(
+        [10.0, 25.0, 5.0, 1.0], [2, 4, 0, 1], ("CAMP-1", "CAMP-2", "CAMP-3", "CAMP-4")
+    )
+    assert repo.upsert(second) == {"inserted": 1, "updated": 1, "unchanged": 2}
+    assert sum(written) == 5
+
+    with engine.connect() as conn:
+        stored = conn.execute(
+            sa.text("SELECT campaign_id, spend FROM daily_stats ORDER BY 1")
+        ).all()
+        weekly = conn.execute(
+            sa.select(WeeklyStats.campaign_id, WeeklyStats.spend).order_by(
+                WeeklyStats.campaign_id
+            )
+        ).all()
+    expected = [("CAMP-1", 10.0), ("CAMP-2", 25.0), ("CAMP-3", 5.0), ("CAMP-4", 1.0)]
+    assert [tuple(row) for row in stored] == expected
+    # Rollups only saw the changed rows and still match the daily table
+    assert [tuple(row) for row in weekly] == expected
+    assert 'cpasync_rows_written_total{result="unchanged"}' in registry.render()
+
+
+def test_delta_upsert_processed_dates_follow_full_partition(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    repo = SqliteRepository(engine, delta=True)
+    df = frame([10.0, 20.0, 5.0], [2, 4, 0])
+    repo.upsert(df)
+    repo.upsert(df)
+    fingerprints = repo.get_fingerprints("2025-06-04", "2025-06-04")
+    assert list(fingerprints) == ["2025-06-04"]
+    assert repo.check_date_exists("2025-06-04")
+
+
+def test_postgres_delta_statements():
+    engine = sa.create_engine("sqlite:///:memory:")
+    repo = PostgresRepository(engine, delta=True, batch_size=2)
+    df = frame([10.0, 20.0, 5.0], [2, 4, 0])
+
+    conn = Mock()
+    repo._values_upsert(conn, df)
+    sql = str(conn.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert (
+        "WHERE daily_stats.spend IS DISTINCT FROM excluded.spend "
+        "OR daily_stats.conversions IS DISTINCT FROM excluded.conversions "
+        "OR daily_stats.cpa IS DISTINCT FROM excluded.cpa"
+    ) in sql
+
+    conn = Mock()
+    repo._copy_upsert(conn, df)
+    merge = conn.exec_driver_sql.call_args_list[-1].args[0]
+    assert merge.endswith(
+        "WHERE (daily_stats.spend, daily_stats.conversions, daily_stats.cpa) "
+        "IS DISTINCT FROM (EXCLUDED.spend, EXCLUDED.conversions, EXCLUDED.cpa)"
+    )
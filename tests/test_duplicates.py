@@ -0,0 +1,85 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import (
+    JsonDataReader,
+    StreamingJsonDataReader,
+    collapse_duplicates,
+)
+from src.db_repository import DailyStats, SqliteRepository
+from tests.helpers import normalize
+
+SPEND = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 10.0},
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 27.5},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "spend": 19.9},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": 42.1},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": None},
+]
+CONV = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 4},
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 6},
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 4},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "conversions": 10},
+]
+EXPECTED = pd.DataFrame(
+    {
+        "date": pd.to_datetime(["2025-06-04", "2025-06-04", "2025-06-05"]),
+        "campaign_id": ["CAMP-123", "CAMP-456", "CAMP-123"],
+        "spend": [37.5, 19.9, 42.1],
+        "conversions": [14.0, 0.0, 10.0],
+    }
+)
+
+
+@pytest.fixture
+def feeds(write_feeds):
+    return write_feeds(SPEND, CONV)
+
+
+def test_collapse_duplicates_sums_per_key():
+    df = pd.DataFrame(CONV).assign(date=lambda d: pd.to_datetime(d["date"]))
+    result, collapsed = collapse_duplicates(df)
+    assert collapsed == 2
+    assert result["conversions"].tolist() == [14, 10]
+
+
+def test_collapse_duplicates_returns_unique_feed_unchanged():
+    df = pd.DataFrame(CONV[2:])
+    result, collapsed = collapse_duplicates(df)
+    assert collapsed == 0
+    assert result is df
+
+
+@pytest.mark.parametrize(
+    "reader",
+    [
+        JsonDataReader(),
+        JsonDataReader(compact=True),
+        StreamingJsonDataReader(chunk_size=2),
+        StreamingJsonDataReader(chunk_size=2, compact=True),
+    ],
+)
+def test_readers_merge_each_key_once(feeds, reader, caplog):
+    with caplog.at_level(logging.WARNING):
+        result = reader.read(*feeds)
+    pd.testing.assert_frame_equal(normalize(result), EXPECTED)
+    assert not result.duplicated(["date", "campaign_id"]).any()
+    assert "Collapsed 2 duplicate (date, campaign_id) rows" in caplog.text
+
+
+def test_collapsed_rows_upsert_once(feeds):
+    engine = create_engine("sqlite://")
+    df = CpaCalculator().process(JsonDataReader().read(*feeds))
+    SqliteRepository(engine).upsert(df)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(DailyStats)).scalar() == 3
+        cpa = conn.execute(
+            select(DailyStats.cpa).where(DailyStats.campaign_id == "CAMP-123")
+        ).scalars()
+        np.testing.assert_allclose(sorted(cpa), [37.5 / 14, 4.21])
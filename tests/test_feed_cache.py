@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_reader import JsonDataReader
+from src.feed_cache import CachedDataReader
+
+SPEND = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 37.5},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "spend": 19.9},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": 42.1},
+]
+CONV = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 14},
+    {"date": "2025-06-05", "campaign_id": "CAMP-789", "conversions": 5},
+    {"date": "2025-06-06", "campaign_id": "CAMP-888", "conversions": 7},
+]
+
+
+def write_feeds(tmp_path, spend=SPEND, conv=CONV):
+    spend_path = tmp_path / "spend.json"
+    conv_path = tmp_path / "conv.json"
+    spend_path.write_text(json.dumps(spend))
+    conv_path.write_text(json.dumps(conv))
+    return str(spend_path), str(conv_path)
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if not name.startswith("."))
+
+
+def mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_cached_partitions_match_reader(tmp_path, mocker):
+    spend_path, conv_path = write_feeds(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    expected = dict(JsonDataReader().read_partitions(spend_path, conv_path))
+
+    inner = JsonDataReader()
+    spy = mocker.spy(inner, "read_partitions")
+    for _ in range(2):
+        cached = dict(
+            CachedDataReader(inner, cache_dir).read_partitions(spend_path, conv_path)
+        )
+        assert list(cached) == list(expected)
+        for date_str, df in cached.items():
+            pd.testing.assert_frame_equal(df, expected[date_str].reset_index(drop=True))
+    # The second read was served from the cache without parsing
+    assert spy.call_count == 1
+    # and its values are views of the mapped files, not copies
+    assert mapped(cached["2025-06-04"]["spend"].to_numpy())
+
+
+def test_cached_reader_filters_range(tmp_path):
+    spend_path, conv_path = write_feeds(tmp_path)
+    reader = CachedDataReader(JsonDataReader(), str(tmp_path / "cache"))
+    dates = [d for d, _ in reader.read_partitions(spend_path, conv_path, "2025-06-05")]
+    assert dates == ["2025-06-05", "2025-06-06"]
+    assert len(reader.read(spend_path, conv_path)) == 5
+
+
+def test_changed_feed_gets_new_entry_and_lru_eviction(tmp_path):
+    spend_path, conv_path = write_feeds(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    reader = CachedDataReader(JsonDataReader(), cache_dir, max_bytes=1)
+    first = reader.ensure(spend_path, conv_path)
+
+    write_feeds(tmp_path, spend=SPEND[:1])
+    second = reader.ensure(spend_path, conv_path)
+    assert second != first
+    # Over the size cap only the entry in use survives
+    assert entries(cache_dir) == [os.path.basename(second)]
+
+
+def test_rebuild_reparses(tmp_path, mocker):
+    spend_path, conv_path = write_feeds(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    CachedDataReader(JsonDataReader(), cache_dir).ensure(spend_path, conv_path)
+
+    inner = JsonDataReader()
+    spy = mocker.spy(inner, "read_partitions")
+    reader = CachedDataReader(inner, cache_dir, rebuild=True)
+    reader.ensure(spend_path, conv_path)
+    reader.ensure(spend_path, conv_path)
+    assert spy.call_count == 1
+    assert len(entries(cache_dir)) == 1
+
+
+def test_unreadable_feed_is_not_cached(tmp_path):
+    spend_path = tmp_path / "spend.json"
+    conv_path = tmp_path / "conv.json"
+    spend_path.write_text("{ invalid json }")
+    conv_path.write_text("[]")
+    cache_dir = tmp_path / "cache"
+    reader = CachedDataReader(JsonDataReader(), str(cache_dir))
+    assert list(reader.read_partitions(str(spend_path), str(conv_path))) == []
+    assert entries(cache_dir) == []
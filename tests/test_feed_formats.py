@@ -0,0 +1,110 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.data_reader import (
+    FEED_FORMATS,
+    FeedFormat,
+    JsonDataReader,
+    StreamingJsonDataReader,
+    detect_format,
+)
+from src.feed_cache import CachedDataReader
+
+SPEND_PATH = "data/fb_spend.json"
+CONV_PATH = "data/network_conv.json"
+
+
+def convert(path, out_path, fmt):
+    df = pd.read_json(path)
+    if fmt == "ndjson":
+        df.to_json(out_path, orient="records", lines=True, date_format="iso")
+    elif fmt == "csv":
+        df.to_csv(out_path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(out_path, index=False, row_group_size=2)
+    return str(out_path)
+
+
+@pytest.fixture(params=["ndjson", "csv", "parquet"])
+def feeds(request, tmp_path):
+    fmt = request.param
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    extension = {"ndjson": "jsonl", "csv": "csv", "parquet": "parquet"}[fmt]
+    return (
+        fmt,
+        convert(SPEND_PATH, tmp_path / f"spend.{extension}", fmt),
+        convert(CONV_PATH, tmp_path / f"conv.{extension}", fmt),
+    )
+
+
+def test_formats_produce_same_merged_frame(feeds):
+    fmt, spend_path, conv_path = feeds
+    assert detect_format(spend_path).name == fmt
+    expected = JsonDataReader().read(SPEND_PATH, CONV_PATH)
+    pd.testing.assert_frame_equal(
+        JsonDataReader().read(spend_path, conv_path), expected
+    )
+
+
+def test_formats_prune_date_range(feeds):
+    _, spend_path, conv_path = feeds
+    df = JsonDataReader().read(spend_path, conv_path, "2025-06-05", "2025-06-05")
+    assert set(df["date"].dt.strftime("%Y-%m-%d")) == {"2025-06-05"}
+    assert len(df) == 3
+
+
+@pytest.mark.parametrize(
+    "make_reader",
+    [
+        lambda tmp_path: StreamingJsonDataReader(chunk_size=2),
+        lambda tmp_path: CachedDataReader(JsonDataReader(), str(tmp_path / "cache")),
+    ],
+    ids=["streaming", "cached"],
+)
+def test_readers_accept_date_range(tmp_path, make_reader):
+    expected = JsonDataReader().read(SPEND_PATH, CONV_PATH, "2025-06-05", "2025-06-05")
+    df = make_reader(tmp_path).read(SPEND_PATH, CONV_PATH, "2025-06-05", "2025-06-05")
+    assert len(df) == len(expected) == 3
+    pd.testing.assert_frame_equal(
+        df.sort_values("campaign_id", ignore_index=True),
+        expected.sort_values("campaign_id", ignore_index=True),
+    )
+
+
+def test_streaming_reader_accepts_formats(feeds):
+    _, spend_path, conv_path = feeds
+    expected = dict(JsonDataReader().read_partitions(SPEND_PATH, CONV_PATH))
+    streamed = dict(
+        StreamingJsonDataReader(chunk_size=2).read_partitions(spend_path, conv_path)
+    )
+    assert list(streamed) == list(expected)
+    for date_str, df in streamed.items():
+        assert len(df) == len(expected[date_str])
+
+
+def test_detect_format_sniffs_content(tmp_path):
+    ndjson = convert(SPEND_PATH, tmp_path / "spend.ndjson", "ndjson")
+    csv = convert(SPEND_PATH, tmp_path / "spend.csv", "csv")
+    for source, name, expected in [
+        (SPEND_PATH, "array.dat", "json"),
+        (ndjson, "lines.dat", "ndjson"),
+        (ndjson, "lines.json", "ndjson"),
+        (csv, "table.txt", "csv"),
+    ]:
+        target = tmp_path / name
+        shutil.copy(source, target)
+        assert detect_format(str(target)) is FEED_FORMATS[expected]
+
+
+def test_incomplete_format_cannot_be_instantiated():
+    class LoadOnly(FeedFormat):
+        name = "load-only"
+
+        def load(self, path, start_date=None, end_date=None):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError, match="iter_chunks"):
+        LoadOnly()
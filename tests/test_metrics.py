@@ -0,0 +1,68 @@
+import urllib.request
+
+import pytest
+from tenacity import retry, stop_after_attempt, wait_none
+
+from src.metrics import MetricsRegistry, MetricsServer, count_retry, registry
+
+
+def test_timed_records_stage_and_partition():
+    metrics = MetricsRegistry()
+    with metrics.timed("upsert", "2025-06-04") as timer:
+        timer.rows = 3
+    metrics.record("upsert", 0.5, 2, "2025-06-05")
+    with pytest.raises(RuntimeError):
+        with metrics.timed("compute", "2025-06-04", rows=4):
+            raise RuntimeError("boom")
+
+    text = metrics.render()
+    assert 'cpasync_stage_calls_total{stage="upsert"} 2' in text
+    assert 'cpasync_stage_rows_total{stage="upsert"} 5' in text
+    assert 'cpasync_stage_calls_total{stage="compute"} 1' in text
+    assert 'cpasync_partition_stage_rows{stage="upsert",date="2025-06-05"} 2' in text
+    assert "# TYPE cpasync_stage_seconds_total counter" in text
+
+    metrics.start_run()
+    assert "cpasync_partition_stage_rows{" not in metrics.render()
+    assert 'cpasync_stage_rows_total{stage="upsert"} 5' in metrics.render()
+
+
+def test_finish_run_and_textfile(tmp_path):
+    metrics = MetricsRegistry()
+    metrics.finish_run(0.0, success=False)
+    path = tmp_path / "cpasync.prom"
+    metrics.write_textfile(str(path))
+    text = path.read_text()
+    assert 'cpasync_runs_total{status="failure"} 1' in text
+    assert "cpasync_last_run_success 0" in text
+    assert text.endswith("\n")
+    assert [p.name for p in tmp_path.iterdir()] == ["cpasync.prom"]
+
+
+def test_retry_hook_counts_retries():
+    attempts = []
+
+    @retry(stop=stop_after_attempt(3), wait=wait_none(), before_sleep=count_retry)
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("transient")
+
+    flaky()
+    assert 'operation="test_retry_hook_counts_retries.<locals>.flaky"} 2' in (
+        registry.render()
+    )
+
+
+def test_metrics_server():
+    metrics = MetricsRegistry()
+    metrics.record("read", 1.0, 10)
+    server = MetricsServer(0, metrics=metrics)
+    port = server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            body = resp.read().decode()
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert 'cpasync_stage_rows_per_second{stage="read"} 10' in body
+    finally:
+        server.stop()
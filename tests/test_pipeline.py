@@ -0,0 +1,70 @@
+import random
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.cpa_calculator import CpaCalculator
+from src.pipeline import ConcurrentPipeline
+
+
+class RecordingRepository:
+    """Collects upserted frames, sleeping a random moment to shuffle completion."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.dates = []
+
+    def upsert(self, data):
+        time.sleep(random.uniform(0, 0.01))
+        date_str = data["date"].iloc[0]
+        if date_str == self.fail_on:
+            raise RuntimeError(f"write failed for {date_str}")
+        with self.lock:
+            self.dates.append(date_str)
+
+
+def make_partitions(days):
+    for day in range(1, days + 1):
+        date_str = f"2025-06-{day:02d}"
+        yield (
+            date_str,
+            pd.DataFrame(
+                {
+                    "date": [date_str],
+                    "campaign_id": ["CAMP-123"],
+                    "spend": [float(day)],
+                    "conversions": [2.0],
+                }
+            ),
+        )
+
+
+def test_pipeline_reports_in_input_order():
+    repository = RecordingRepository()
+    pipeline = ConcurrentPipeline(
+        CpaCalculator(), repository, compute_workers=2, write_workers=4, queue_size=2
+    )
+    reported = []
+    pipeline.run(make_partitions(20), lambda d, df: reported.append((d, df)))
+
+    assert [d for d, _ in reported] == [f"2025-06-{day:02d}" for day in range(1, 21)]
+    assert sorted(repository.dates) == [d for d, _ in reported]
+    assert reported[3][1].iloc[0]["cpa"] == pytest.approx(2.0)
+
+
+def test_pipeline_propagates_stage_errors():
+    repository = RecordingRepository(fail_on="2025-06-05")
+    pipeline = ConcurrentPipeline(CpaCalculator(), repository, write_workers=2)
+    with pytest.raises(RuntimeError, match="2025-06-05"):
+        pipeline.run(make_partitions(30), lambda d, df: None)
+
+
+def test_pipeline_with_no_partitions():
+    reported = []
+    ConcurrentPipeline(CpaCalculator(), RecordingRepository()).run(
+        iter([]), lambda d, df: reported.append(d)
+    )
+    assert reported == []
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from src.cpa_calculator import CpaCalculator, Ratio, calculate_cpa_vectorized
+from src.data_reader import JsonDataReader, StreamingJsonDataReader
+from src.db_repository import SqliteRepository
+from src.feed_cache import CachedDataReader
+from tests.helpers import normalize
+
+SPEND = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-1", "spend": 10.0, "clicks": 40},
+    {"date": "2025-06-04", "campaign_id": "CAMP-2", "spend": 0.0, "clicks": 0},
+    {"date": "2025-06-05", "campaign_id": "CAMP-1", "spend": 12.0, "clicks": 30},
+]
+CONV = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-1", "conversions": 4, "revenue": 25.0},
+    {"date": "2025-06-04", "campaign_id": "CAMP-3", "conversions": 2, "revenue": 9.0},
+    {"date": "2025-06-06", "campaign_id": "CAMP-1", "conversions": 1, "revenue": 3.0},
+]
+
+COLUMNS = ["spend", "conversions", "clicks", "revenue"]
+
+
+@pytest.fixture
+def feeds(write_feeds):
+    return write_feeds(SPEND, CONV)
+
+
+def test_ratios_are_null_where_denominator_is_zero():
+    df = pd.DataFrame(
+        {
+            "spend": [10.0, 0.0, 6.0, 5.0],
+            "conversions": [4, 2, 0, 1],
+            "clicks": [40, 0, 12, 0],
+            "revenue": [25.0, 9.0, 0.0, 2.0],
+        }
+    )
+    result = CpaCalculator(["cpa", "cpc", "cvr", "roas"]).process(df)
+    np.testing.assert_allclose(result["cpa"], [2.5, np.nan, np.nan, 5.0])
+    np.testing.assert_allclose(result["cpc"], [0.25, np.nan, 0.5, np.nan])
+    np.testing.assert_allclose(result["cvr"], [0.1, np.nan, 0.0, np.nan])
+    np.testing.assert_allclose(result["roas"], [2.5, np.nan, 0.0, 0.4])
+
+
+def test_default_calculator_matches_cpa():
+    df = pd.DataFrame({"spend": [10.0, 0.0, 5.0], "conversions": [4, 3, 0]})
+    result = CpaCalculator().process(df.copy())
+    assert list(result.columns) == ["spend", "conversions", "cpa"]
+    np.testing.assert_array_equal(
+        result["cpa"], calculate_cpa_vectorized(df["spend"], df["conversions"])
+    )
+
+
+def test_custom_ratio_expression():
+    calculator = CpaCalculator([("rpc", "revenue / clicks")])
+    result = calculator.process(pd.DataFrame({"revenue": [8.0], "clicks": [4]}))
+    assert result["rpc"].tolist() == [2.0]
+
+
+@pytest.mark.parametrize("expression", ["spend", "spend / clicks / 2", "spend / 2x"])
+def test_invalid_ratio_expression(expression):
+    with pytest.raises(ValueError, match="Invalid ratio expression"):
+        Ratio.compile(expression)
+
+
+def test_unknown_metric_and_missing_input():
+    with pytest.raises(ValueError, match="Unknown metric"):
+        CpaCalculator(["ctr"])
+    with pytest.raises(ValueError, match="needs column 'clicks'"):
+        CpaCalculator(["cpc"]).process(pd.DataFrame({"spend": [1.0]}))
+
+
+@pytest.mark.parametrize(
+    "reader",
+    [
+        JsonDataReader(compact=True),
+        StreamingJsonDataReader(chunk_size=2),
+        StreamingJsonDataReader(chunk_size=2, compact=True),
+    ],
+)
+def test_readers_carry_optional_columns(feeds, reader):
+    expected = normalize(JsonDataReader().read(*feeds), COLUMNS)
+    assert expected["clicks"].tolist() == [40, 0, 0, 30, 0]
+    assert expected["revenue"].tolist() == [25.0, 0.0, 9.0, 0.0, 3.0]
+    pd.testing.assert_frame_equal(normalize(reader.read(*feeds), COLUMNS), expected)
+
+
+def test_cached_partitions_carry_optional_columns(feeds, tmp_path):
+    reader = CachedDataReader(JsonDataReader(), str(tmp_path / "cache"))
+    expected = normalize(JsonDataReader().read(*feeds), COLUMNS)
+    reader.read(*feeds)
+    pd.testing.assert_frame_equal(normalize(reader.read(*feeds), COLUMNS), expected)
+
+
+def test_configured_metrics_are_persisted(feeds, tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    with engine.begin() as conn:
+        # A table from before the optional metric columns existed
+        conn.exec_driver_sql(
+            "CREATE TABLE daily_stats (date DATE NOT NULL, "
+            "campaign_id VARCHAR NOT NULL, spend FLOAT, conversions INTEGER, "
+            "cpa FLOAT, PRIMARY KEY (date, campaign_id))"
+        )
+    repo = SqliteRepository(engine)
+    df = JsonDataReader().read(*feeds)
+    repo.upsert(CpaCalculator(["cpa", "cpc", "roas"]).process(df))
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT campaign_id, clicks, revenue, cpa, cpc, cvr, roas "
+            "FROM daily_stats WHERE date = '2025-06-04' ORDER BY 1"
+        ).all()
+    assert rows == [
+        ("CAMP-1", 40, 25.0, 2.5, 0.25, None, 2.5),
+        ("CAMP-2", 0, 0.0, None, None, None, None),
+        ("CAMP-3", 0, 9.0, None, None, None, None),
+    ]
+
+
+def test_wider_metric_set_reprocesses_stored_dates(feeds, tmp_path):
+    from run import select_changed_partitions
+
+    repo = SqliteRepository(sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}"))
+    reader = JsonDataReader()
+    repo.upsert(CpaCalculator().process(reader.read(*feeds)))
+
+    def changed(metrics):
+        fingerprints = repo.get_fingerprints("2025-06-04", "2025-06-06")
+        partitions = reader.read_partitions(*feeds)
+        return [
+            date_str
+            for date_str, _ in select_changed_partitions(
+                partitions, fingerprints, "2025-06-04", "2025-06-06", metrics=metrics
+            )
+        ]
+
+    assert changed(("cpa",)) == []
+    assert changed(("cpa", "cpc", "roas")) == ["2025-06-04", "2025-06-05", "2025-06-06"]
+
+    repo.upsert(CpaCalculator(["roas", "cpa", "cpc"]).process(reader.read(*feeds)))
+    assert changed(("cpa", "cpc", "roas")) == []
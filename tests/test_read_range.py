@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from src.cpa_calculator import CpaCalculator
+from src.db_repository import SqliteRepository
+
+
+@pytest.fixture
+def repo(tmp_path):
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(
+        [
+            (d, f"CAMP-{c}")
+            for d in pd.date_range("2025-06-01", "2025-06-30")
+            for c in range(4)
+        ],
+        columns=["date", "campaign_id"],
+    )
+    df["spend"] = np.round(rng.uniform(0, 100, len(df)), 2)
+    df["conversions"] = rng.integers(0, 5, len(df)).astype(float)
+    repo = SqliteRepository(sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}"))
+    repo.upsert(CpaCalculator().process(df))
+    return repo
+
+
+def expected_rows(repo, start, end):
+    with repo.engine.connect() as conn:
+        return pd.read_sql(
+            sa.text(
+                "SELECT date, campaign_id, spend, conversions, cpa FROM daily_stats "
+                "WHERE date BETWEEN :start AND :end ORDER BY date, campaign_id"
+            ),
+            conn,
+            params={"start": start, "end": end},
+        )
+
+
+def test_read_range_streams_ordered_typed_chunks(repo):
+    chunks = list(repo.read_range("2025-06-03", "2025-06-12", chunk_size=7))
+    assert [len(c) for c in chunks] == [7] * 5 + [5]
+
+    result = pd.concat(chunks, ignore_index=True)
+    assert result["date"].dtype.kind == "M"
+    assert result["conversions"].dtype == "Int64"
+    assert result["cpc"].dtype == "float64" and result["cpc"].isna().all()
+
+    expected = expected_rows(repo, "2025-06-03", "2025-06-12")
+    pd.testing.assert_frame_equal(
+        result[["spend", "conversions", "cpa"]].astype({"conversions": "int64"}),
+        expected[["spend", "conversions", "cpa"]],
+    )
+    assert result["date"].dt.strftime("%Y-%m-%d").tolist() == expected["date"].tolist()
+    assert result["campaign_id"].tolist() == expected["campaign_id"].tolist()
+
+
+def query_plan(repo, **kwargs):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, *_):
+        statements.append((statement, parameters))
+
+    sa.event.listen(repo.engine, "before_cursor_execute", capture)
+    result = pd.concat(repo.read_range("2025-06-01", "2025-06-30", **kwargs))
+    sa.event.remove(repo.engine, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    with repo.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return result, " ".join(row[-1] for row in rows)
+
+
+def test_read_range_pushes_filters_to_indexes(repo):
+    # The primary key serves both the range and the order: no sort step
+    result, plan = query_plan(repo)
+    assert len(result) == 120
+    assert plan.startswith("SEARCH daily_stats USING INDEX") and "TEMP" not in plan
+
+    result, plan = query_plan(repo, campaign_ids=["CAMP-1", "CAMP-3"])
+    assert set(result["campaign_id"]) == {"CAMP-1", "CAMP-3"}
+    assert len(result) == 60
+    assert plan.startswith("SEARCH daily_stats USING INDEX")
+
+
+def test_read_range_is_lazy_and_empty_outside_data(repo):
+    chunks = repo.read_range("2025-06-01", "2025-06-30", chunk_size=10)
+    first = next(chunks)
+    assert first["date"].min() == pd.Timestamp("2025-06-01")
+    chunks.close()
+
+    assert list(repo.read_range("2024-01-01", "2024-12-31")) == []
+    with pytest.raises(ValueError):
+        next(repo.read_range("2025-06-01", "2025-06-30", chunk_size=0))
@@ -0,0 +1,150 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from src.cpa_calculator import CpaCalculator
+from src.db_repository import SqliteRepository, plan_rollup_segments
+
+
+def make_days(start, end, seed):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end)
+    df = pd.DataFrame(
+        [(d, f"CAMP-{c}") for d in dates for c in range(3)],
+        columns=["date", "campaign_id"],
+    )
+    df["spend"] = np.round(rng.uniform(0, 100, len(df)), 2)
+    df["conversions"] = rng.integers(0, 10, len(df)).astype(float)
+    return CpaCalculator().process(df)
+
+
+def totals_from_daily(engine, start, end):
+    with engine.connect() as conn:
+        df = pd.read_sql(
+            sa.text(
+                "SELECT campaign_id, SUM(spend) AS spend, "
+                "SUM(conversions) AS conversions FROM daily_stats "
+                "WHERE date BETWEEN :start AND :end GROUP BY campaign_id"
+            ),
+            conn,
+            params={"start": start, "end": end},
+        )
+    return df.sort_values("campaign_id").reset_index(drop=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    repo = SqliteRepository(engine)
+    repo.upsert(make_days("2025-05-20", "2025-07-10", seed=1))
+    # Late data rewrites part of the range with different values
+    repo.upsert(make_days("2025-06-01", "2025-06-12", seed=2))
+    return repo
+
+
+def test_plan_rollup_segments():
+    assert plan_rollup_segments("2025-05-28", "2025-07-14") == [
+        ("day", datetime.date(2025, 5, 28), datetime.date(2025, 5, 31)),
+        ("month", datetime.date(2025, 6, 1), datetime.date(2025, 6, 1)),
+        ("day", datetime.date(2025, 7, 1), datetime.date(2025, 7, 6)),
+        ("week", datetime.date(2025, 7, 7), datetime.date(2025, 7, 7)),
+        ("day", datetime.date(2025, 7, 14), datetime.date(2025, 7, 14)),
+    ]
+    assert plan_rollup_segments("2025-06-03", "2025-06-04") == [
+        ("day", datetime.date(2025, 6, 3), datetime.date(2025, 6, 4)),
+    ]
+
+
+def test_rollups_match_daily_after_updates(repo):
+    with repo.engine.connect() as conn:
+        monthly = pd.read_sql(
+            "SELECT campaign_id, spend, conversions, cpa FROM monthly_stats "
+            "WHERE period_start = '2025-06-01' ORDER BY campaign_id",
+            conn,
+        )
+    expected = totals_from_daily(repo.engine, "2025-06-01", "2025-06-30")
+    np.testing.assert_allclose(monthly["spend"], expected["spend"])
+    np.testing.assert_array_equal(monthly["conversions"], expected["conversions"])
+    np.testing.assert_allclose(
+        monthly["cpa"], expected["spend"] / expected["conversions"]
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end",
+    [
+        ("2025-05-20", "2025-07-10"),
+        ("2025-06-01", "2025-06-30"),
+        ("2025-06-02", "2025-06-15"),
+        ("2025-06-03", "2025-06-04"),
+    ],
+)
+def test_read_totals_matches_daily(repo, start, end):
+    totals = repo.read_totals(start, end)
+    expected = totals_from_daily(repo.engine, start, end)
+    assert list(totals["campaign_id"]) == list(expected["campaign_id"])
+    np.testing.assert_allclose(totals["spend"], expected["spend"])
+    np.testing.assert_array_equal(totals["conversions"], expected["conversions"])
+
+
+def test_read_totals_filters_campaigns(repo):
+    totals = repo.read_totals("2025-06-01", "2025-06-30", campaign_ids=["CAMP-1"])
+    assert list(totals["campaign_id"]) == ["CAMP-1"]
+
+
+def test_rollups_rebuilt_for_existing_data(repo):
+    with repo.engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE weekly_stats")
+        conn.exec_driver_sql("DROP TABLE monthly_stats")
+    reopened = SqliteRepository(repo.engine)
+    totals = reopened.read_totals("2025-06-01", "2025-06-30")
+    expected = totals_from_daily(repo.engine, "2025-06-01", "2025-06-30")
+    np.testing.assert_allclose(totals["spend"], expected["spend"])
+
+
+def stored_rollups(engine, table):
+    with engine.connect() as conn:
+        return pd.read_sql(
+            f"SELECT period_start, campaign_id, spend, conversions, cpa FROM {table} "
+            "ORDER BY period_start, campaign_id",
+            conn,
+        )
+
+
+def assert_cpa_from_totals(rollups):
+    expected = rollups["spend"] / rollups["conversions"]
+    expected[(rollups["spend"] == 0) | (rollups["conversions"] == 0)] = np.nan
+    np.testing.assert_allclose(rollups["cpa"].astype(float), expected)
+
+
+def test_buckets_written_once_get_cpa(tmp_path):
+    repo = SqliteRepository(sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}"))
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-07-01", "2025-07-02", "2025-07-01"]),
+            "campaign_id": ["A", "A", "B"],
+            "spend": [10.0, 20.0, 0.0],
+            "conversions": [2, 3, 4],
+        }
+    )
+    repo.upsert(CpaCalculator().process(df))
+    with repo.engine.connect() as conn:
+        monthly = conn.exec_driver_sql(
+            "SELECT * FROM monthly_stats ORDER BY campaign_id"
+        ).all()
+    assert monthly == [
+        ("2025-07-01", "A", 30.0, 5, 6.0),
+        ("2025-07-01", "B", 0.0, 4, None),
+    ]
+    assert_cpa_from_totals(stored_rollups(repo.engine, "weekly_stats"))
+
+
+def test_rebuilt_rollups_get_cpa(repo):
+    repo.rebuild_rollups()
+    for table in ("weekly_stats", "monthly_stats"):
+        rollups = stored_rollups(repo.engine, table)
+        assert rollups["cpa"].notna().all()
+        assert_cpa_from_totals(rollups)
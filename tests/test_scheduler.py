@@ -0,0 +1,56 @@
+import datetime
+from unittest.mock import Mock
+
+import pytest
+import sqlalchemy as sa
+
+from src.db_repository import SqliteRepository
+from src.scheduler import Scheduler, plan_catch_up
+
+TODAY = datetime.date(2025, 6, 10)
+
+
+@pytest.mark.parametrize(
+    "watermark, start_date, end_date, expected",
+    [
+        (None, None, None, ("2025-06-09", "2025-06-09")),
+        (None, "2025-06-01", None, ("2025-06-01", "2025-06-09")),
+        ("2025-06-02", "2025-06-01", None, ("2025-06-03", "2025-06-09")),
+        ("2025-06-02", None, "2025-06-05", ("2025-06-03", "2025-06-05")),
+        ("2025-06-09", None, None, None),
+        ("2025-06-05", None, "2025-06-05", None),
+    ],
+)
+def test_plan_catch_up(watermark, start_date, end_date, expected):
+    assert plan_catch_up(watermark, TODAY, start_date, end_date) == expected
+
+
+def test_watermark_only_advances_over_contiguous_ranges():
+    repo = SqliteRepository(sa.create_engine("sqlite://"))
+    assert repo.get_watermark() is None
+    assert repo.advance_watermark("2025-06-01", "2025-06-03")
+    # Overlapping and adjacent ranges move it forward
+    assert repo.advance_watermark("2025-06-02", "2025-06-05")
+    assert repo.advance_watermark("2025-06-06", "2025-06-06")
+    # A gap, or an older range, leaves it where it is
+    assert not repo.advance_watermark("2025-06-08", "2025-06-09")
+    assert not repo.advance_watermark("2025-06-01", "2025-06-02")
+    assert repo.get_watermark() == "2025-06-06"
+    assert repo.get_watermark("hourly") is None
+
+
+def test_scheduler_job_policy():
+    task = Mock()
+    scheduler = Scheduler(task, misfire_grace_time=600, jitter=120, run_at_start=True)
+    scheduler.scheduler.start(paused=True)
+    scheduler.scheduler.start = Mock()
+    scheduler.start()
+    job = scheduler.scheduler.get_job("daily_main_task")
+    scheduler.scheduler.shutdown(wait=False)
+
+    assert job.max_instances == 1
+    assert job.coalesce is True
+    assert job.misfire_grace_time == 600
+    assert job.trigger.jitter == 120
+    # The catch-up run is due immediately, before the first cron fire time
+    assert job.next_run_time <= datetime.datetime.now(job.next_run_time.tzinfo)
@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+from src.db_repository import DailyStats, SqliteRepository
+from src.spool import (
+    CorruptSegmentError,
+    Spool,
+    SpooledRepository,
+    SpoolReplayer,
+    _ReplayLock,
+    decode_segment,
+    encode_segment,
+)
+
+
+def partition(date_str, spend, campaigns=("CAMP-1", "CAMP-2")):
+    spend = np.asarray(spend, dtype=float)
+    conversions = np.array([4.0, 0.0])[: len(campaigns)]
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime([date_str] * len(campaigns)),
+            "campaign_id": list(campaigns),
+            "spend": spend,
+            "conversions": conversions,
+            "cpa": np.where(
+                conversions > 0, spend / np.maximum(conversions, 1), np.nan
+            ),
+        }
+    )
+
+
+def stored_rows(engine):
+    with engine.connect() as conn:
+        return [
+            tuple(row)
+            for row in conn.execute(
+                select(
+                    DailyStats.date,
+                    DailyStats.campaign_id,
+                    DailyStats.spend,
+                    DailyStats.conversions,
+                ).order_by(DailyStats.date, DailyStats.campaign_id)
+            )
+        ]
+
+
+class FlakyRepository:
+    """Fails the first `failures` upserts, then writes through."""
+
+    def __init__(self, repository, failures):
+        self.repository = repository
+        self.failures = failures
+        self.calls = 0
+
+    def upsert(self, data):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("database unavailable")
+        self.repository.upsert(data)
+
+
+def test_segment_round_trip():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-06-04", "2025-06-05", "2025-06-05"]),
+            "campaign_id": pd.Categorical(["CAMP-é", "B", "CAMP-é"]),
+            "spend": [1.5, 0.0, np.nan],
+            "conversions": np.array([3, 0, 7], dtype=np.int32),
+            "clicks": pd.array([1, None, 2], dtype="Int64"),
+        }
+    )
+    result = decode_segment(encode_segment(df))
+    pd.testing.assert_frame_equal(
+        result,
+        df.astype(
+            {
+                "date": "datetime64[us]",
+                "campaign_id": str,
+                "clicks": "float64",
+            }
+        ),
+    )
+    assert decode_segment(encode_segment(df.iloc[:0])).empty
+
+
+@pytest.mark.parametrize("damage", ["truncate", "flip"])
+def test_corrupt_segment_is_detected(damage):
+    raw = bytearray(encode_segment(partition("2025-06-04", [1.0, 2.0])))
+    if damage == "truncate":
+        raw = raw[:-10]
+    else:
+        raw[len(raw) // 2] ^= 0xFF
+    with pytest.raises(CorruptSegmentError):
+        decode_segment(bytes(raw))
+
+
+def test_replay_keeps_latest_value_per_key(tmp_path):
+    engine = create_engine("sqlite://")
+    spool = Spool(str(tmp_path / "spool"), fsync=False)
+    spool.append(partition("2025-06-04", [1.0, 2.0]))
+    spool.append(partition("2025-06-05", [3.0, 4.0]))
+    spool.append(partition("2025-06-04", [5.0, 6.0]))
+
+    replayer = SpoolReplayer(spool, SqliteRepository(engine))
+    assert replayer.drain() == 4
+    assert spool.segments() == []
+    assert [row[2] for row in stored_rows(engine)] == [5.0, 6.0, 3.0, 4.0]
+
+
+def test_failed_replay_keeps_segments_and_crash_after_commit_is_harmless(
+    tmp_path, mocker
+):
+    engine = create_engine("sqlite://")
+    spool = Spool(str(tmp_path / "spool"), fsync=False)
+    spool.append(partition("2025-06-04", [1.0, 2.0]))
+    repository = FlakyRepository(SqliteRepository(engine), failures=1)
+    replayer = SpoolReplayer(spool, repository)
+
+    with pytest.raises(ConnectionError):
+        replayer.replay_once()
+    assert len(spool.segments()) == 1
+
+    # The upsert commits but the process dies before deleting the segment
+    mocker.patch.object(spool, "remove", side_effect=OSError("crash"))
+    with pytest.raises(OSError):
+        replayer.replay_once()
+    first = stored_rows(engine)
+    mocker.stopall()
+
+    assert replayer.drain() == 2
+    assert stored_rows(engine) == first
+    assert spool.segments() == []
+
+
+def test_corrupt_segment_is_quarantined(tmp_path):
+    engine = create_engine("sqlite://")
+    spool = Spool(str(tmp_path / "spool"), fsync=False)
+    bad = spool.append(partition("2025-06-04", [1.0, 2.0]))
+    spool.append(partition("2025-06-05", [3.0, 4.0]))
+    with open(bad, "r+b") as f:
+        f.truncate(20)
+
+    assert SpoolReplayer(spool, SqliteRepository(engine)).drain() == 2
+    assert os.path.exists(f"{bad}.corrupt")
+    assert {row[0] for row in stored_rows(engine)} == {
+        pd.Timestamp("2025-06-05").date()
+    }
+
+
+def test_replay_skips_while_locked(tmp_path):
+    spool = Spool(str(tmp_path / "spool"), fsync=False)
+    spool.append(partition("2025-06-04", [1.0, 2.0]))
+    repository = SqliteRepository(create_engine("sqlite://"))
+    with _ReplayLock(spool.directory):
+        assert SpoolReplayer(spool, repository).replay_once() == 0
+    assert SpoolReplayer(spool, repository).replay_once() == 2
+
+
+def test_spooled_upserts_are_replayed_in_background(tmp_path):
+    # A file database, as in-memory SQLite is private to each thread
+    engine = create_engine(f"sqlite:///{tmp_path / 'cpa.db'}")
+    spool = Spool(str(tmp_path / "spool"))
+    backend = FlakyRepository(SqliteRepository(engine), failures=1)
+    replayer = SpoolReplayer(spool, backend, interval=0.05)
+    repository = SpooledRepository(backend.repository, spool, replayer)
+    replayer.start()
+
+    repository.upsert(partition("2025-06-04", [1.0, 2.0]))
+    repository.upsert(partition("2025-06-05", [3.0, 4.0]))
+    # Reads still go to the database
+    assert repository.get_processed_dates("2025-06-01", "2025-06-30") == set()
+
+    assert replayer.stop(timeout=10) == 0
+    assert backend.calls >= 2
+    assert len(stored_rows(engine)) == 4
@@ -0,0 +1,179 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.data_reader import (
+    JsonDataReader,
+    StreamingJsonDataReader,
+    align_to_dates,
+    iter_json_records,
+    partition_fingerprint,
+)
+from tests.helpers import normalize
+
+SPEND = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "spend": 37.5},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "spend": 19.9},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "spend": 42.1},
+    {"date": "2025-06-05", "campaign_id": "CAMP-789", "spend": 11.0},
+    {"date": "2025-06-06", "campaign_id": "CAMP-999", "spend": 5.25},
+]
+CONV = [
+    {"date": "2025-06-04", "campaign_id": "CAMP-123", "conversions": 14},
+    {"date": "2025-06-04", "campaign_id": "CAMP-456", "conversions": 3},
+    {"date": "2025-06-05", "campaign_id": "CAMP-123", "conversions": 10},
+    {"date": "2025-06-05", "campaign_id": "CAMP-456", "conversions": 5},
+    {"date": "2025-06-07", "campaign_id": "CAMP-888", "conversions": 7},
+]
+
+
+@pytest.fixture
+def feeds(write_feeds):
+    # The conversions feed is read as NDJSON
+    return write_feeds(SPEND, CONV, names=("spend.json", "conv.ndjson"))
+
+
+@pytest.mark.parametrize("block_size", [7, 64, 1 << 20])
+def test_iter_json_records_array(tmp_path, block_size):
+    path = tmp_path / "spend.json"
+    path.write_text(json.dumps(SPEND, indent=2))
+    assert list(iter_json_records(str(path), block_size)) == SPEND
+
+
+def test_iter_json_records_invalid(tmp_path):
+    path = tmp_path / "invalid.json"
+    path.write_text('[{"date": "2025-06-04"')
+    with pytest.raises(ValueError):
+        list(iter_json_records(str(path), block_size=8))
+
+
+# The 'é' is two bytes in UTF-8, so byte offsets are one past the character count
+RECORD = '{"date": "2025-06-04", "campaign_id": "CAMP-é", "spend": 1.0}'
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        (f"[{RECORD},,{RECORD}]", f"Unexpected ',' .* at byte {len(RECORD) + 3}"),
+        (f"[,{RECORD}]", "Unexpected ',' .* at byte 1"),
+        (f"[{RECORD},]", f"Unexpected ']' .* at byte {len(RECORD) + 3}"),
+        (f"[{RECORD} {RECORD}]", f"Expected ',' or ']' .* at byte {len(RECORD) + 3}"),
+        (f"[{RECORD},\r\n{{'date': 1}}]", f"Invalid JSON .* at byte {len(RECORD) + 6}"),
+        (f"{RECORD}\n{{\n", f"Invalid JSON .* at byte {len(RECORD) + 4}"),
+    ],
+)
+@pytest.mark.parametrize("block_size", [5, 1 << 20])
+def test_iter_json_records_rejects_malformed_input(tmp_path, text, message, block_size):
+    path = tmp_path / "invalid.json"
+    path.write_bytes(text.encode("utf-8"))
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_records(str(path), block_size))
+
+
+class CountingFile:
+    def __init__(self, f, reads):
+        self.f = f
+        self.reads = reads
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return self.f.read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+
+def test_iter_json_records_stops_at_bad_record(tmp_path, mocker):
+    path = tmp_path / "spend.json"
+    path.write_text(f'[{RECORD}, {{"spend": x}}' + f", {RECORD}" * 10_000 + "]")
+    reads = []
+    mocker.patch(
+        "src.data_reader.open",
+        lambda *args, **kwargs: CountingFile(open(*args, **kwargs), reads),
+        create=True,
+    )
+    with pytest.raises(ValueError, match="Invalid JSON record"):
+        list(iter_json_records(str(path), block_size=64))
+    # Only the block after the error is read to rule out a truncated record
+    assert len(reads) <= 3
+
+
+def test_readers_handle_malformed_feeds_alike(tmp_path, caplog):
+    spend_path = tmp_path / "spend.json"
+    spend_path.write_text(f"[{RECORD},,{RECORD}]")
+    conv_path = tmp_path / "conv.json"
+    conv_path.write_text(json.dumps(CONV))
+    for reader in (JsonDataReader(), StreamingJsonDataReader(chunk_size=2)):
+        assert list(reader.read_partitions(str(spend_path), str(conv_path))) == []
+    assert len([r for r in caplog.records if r.levelname == "ERROR"]) == 2
+
+
+def test_streaming_matches_in_memory(tmp_path, feeds):
+    spend_path, conv_path = feeds
+    conv_array = tmp_path / "conv.json"
+    conv_array.write_text(json.dumps(CONV))
+
+    expected = JsonDataReader().read(spend_path, str(conv_array))
+    reader = StreamingJsonDataReader(chunk_size=2, spill_dir=str(tmp_path))
+    partitions = list(reader.read_partitions(spend_path, conv_path))
+
+    assert [d for d, _ in partitions] == [
+        "2025-06-04",
+        "2025-06-05",
+        "2025-06-06",
+        "2025-06-07",
+    ]
+    streamed = pd.concat([df for _, df in partitions], ignore_index=True)
+    pd.testing.assert_frame_equal(normalize(streamed), normalize(expected))
+
+
+@pytest.mark.parametrize("suffix", [".json", ".ndjson"])
+def test_streaming_fingerprints_match_in_memory(write_feeds, suffix):
+    spend = [
+        {"date": "2025-06-04", "campaign_id": "00123", "spend": 12.123456789012345},
+        {"date": "2025-06-04", "campaign_id": "CAMP-1", "spend": 1 / 3},
+        {"date": "2025-06-05", "campaign_id": "456", "spend": 2.5},
+    ]
+    conv = [
+        {"date": "2025-06-04", "campaign_id": "00123", "conversions": 3},
+        {"date": "2025-06-05", "campaign_id": "456", "conversions": 2},
+    ]
+    paths = write_feeds(spend, conv, names=(f"spend{suffix}", f"conv{suffix}"))
+
+    expected = dict(JsonDataReader().read_partitions(*paths))
+    streamed = dict(StreamingJsonDataReader(chunk_size=2).read_partitions(*paths))
+
+    assert list(streamed) == list(expected)
+    for date_str, df in streamed.items():
+        assert partition_fingerprint(df) == partition_fingerprint(expected[date_str])
+    first = streamed["2025-06-04"].set_index("campaign_id")
+    assert first.loc["00123", "spend"] == 12.123456789012345
+    assert first.loc["CAMP-1", "spend"] == 1 / 3
+
+
+def test_streaming_date_range_and_alignment(feeds):
+    spend_path, conv_path = feeds
+    reader = StreamingJsonDataReader(chunk_size=3)
+    partitions = reader.read_partitions(
+        spend_path, conv_path, "2025-06-05", "2025-06-08"
+    )
+    aligned = list(align_to_dates(partitions, "2025-06-05", "2025-06-08"))
+
+    assert [d for d, _ in aligned] == [
+        "2025-06-05",
+        "2025-06-06",
+        "2025-06-07",
+        "2025-06-08",
+    ]
+    assert len(aligned[0][1]) == 3
+    assert aligned[3][1] is None
+    camp_888 = aligned[2][1].iloc[0]
+    assert camp_888["spend"] == 0
+    assert camp_888["conversions"] == 7
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from run import print_summary
+from src.summary import QuantileSketch, SummaryStats
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(mean=2, sigma=1.5, size=50_000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for chunk in np.array_split(values, 10):
+        sketch.add(chunk)
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert len(sketch.buckets) <= sketch.max_buckets
+
+
+def test_sketch_merge_matches_single_sketch():
+    rng = np.random.default_rng(3)
+    values = np.concatenate([np.zeros(100), rng.uniform(0, 50, 5_000)])
+    whole = QuantileSketch()
+    whole.add(values)
+    left, right = QuantileSketch(), QuantileSketch()
+    left.add(values[:2_000])
+    right.add(values[2_000:])
+    left.merge(right)
+    assert left.count == whole.count
+    assert left.buckets == whole.buckets
+    assert left.quantile(0.01) == 0.0
+
+
+def test_sketch_bucket_limit():
+    sketch = QuantileSketch(max_buckets=16)
+    sketch.add(np.geomspace(1e-3, 1e6, 1_000))
+    assert len(sketch.buckets) == 16
+    assert sketch.count == 1_000
+    assert sketch.quantile(1.0) == pytest.approx(1e6, rel=0.01)
+
+
+def test_sketch_negative_values():
+    rng = np.random.default_rng(5)
+    values = np.concatenate(
+        [-rng.uniform(1, 20, 1_000), np.zeros(500), rng.uniform(1, 20, 1_000)]
+    )
+    sketch = QuantileSketch()
+    sketch.add(values[::2])
+    other = QuantileSketch()
+    other.add(values[1::2])
+    sketch.merge(other)
+    assert sketch.count == 2_500
+    for q in (0.0, 0.1, 0.39, 0.5, 0.9, 1.0):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+
+def test_summary_with_negative_spend():
+    df = pd.DataFrame(
+        {
+            "campaign_id": ["A", "B"],
+            "spend": [-5.0, 10.0],
+            "conversions": [2.0, 2.0],
+            "cpa": [-2.5, 5.0],
+        }
+    )
+    stats = SummaryStats()
+    stats.update(df)
+    assert (stats.cpa_min, stats.cpa_max) == (-2.5, 5.0)
+    assert stats.average_cpa == pytest.approx(1.25)
+    assert stats.percentiles()[0.5] == pytest.approx(-2.5, rel=0.01)
+
+
+def test_summary_update_and_merge():
+    df = pd.DataFrame(
+        {
+            "campaign_id": ["A", "B", "A", "C"],
+            "spend": [10.0, 20.0, 30.0, 5.0],
+            "conversions": [2.0, 4.0, 3.0, 0.0],
+            "cpa": [5.0, 5.0, 10.0, np.nan],
+        }
+    )
+    whole = SummaryStats()
+    whole.update(df)
+    left, right = SummaryStats(), SummaryStats()
+    left.update(df.iloc[:2])
+    right.update(df.iloc[2:])
+    left.merge(right)
+
+    for stats in (whole, left):
+        assert stats.records == 4
+        assert stats.cpa_count == 3
+        assert stats.average_cpa == pytest.approx(20 / 3)
+        assert (stats.cpa_min, stats.cpa_max) == (5.0, 10.0)
+        assert stats.overall_cpa == pytest.approx(60 / 9)
+        assert stats.campaigns["A"] == [2, 40.0, 5.0]
+        assert stats.top_campaigns(2) == [("A", 2, 40.0, 5.0), ("B", 1, 20.0, 4.0)]
+
+
+def test_print_summary_with_stats(capsys):
+    stats = SummaryStats()
+    stats.update(
+        pd.DataFrame(
+            {
+                "campaign_id": ["A", "B", "C"],
+                "spend": [10.0, 20.0, 1.0],
+                "conversions": [2.0, 4.0, 0.0],
+                "cpa": [5.0, 5.0, np.nan],
+            }
+        )
+    )
+    print_summary(stats.records, stats, top_campaigns=2)
+    out = capsys.readouterr().out
+    assert "Summary: Processed 3 records, Average CPA: 5.00" in out
+    assert "CPA min/p50/p95/p99/max: 5.00/" in out
+    assert "  B: 1 records, spend 20.00, conversions 4, CPA 5.00" in out
+    assert "  ... and 1 more campaigns" in out
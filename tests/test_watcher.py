@@ -0,0 +1,174 @@
+import json
+import threading
+
+import pandas as pd
+import pytest
+import sqlalchemy as sa
+
+from src.cpa_calculator import CpaCalculator
+from src.data_reader import JsonDataReader
+from src.db_repository import SqliteRepository
+from src.watcher import FeedTail, FeedWatcher
+
+
+def append(path, records, tail=""):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records) + tail)
+
+
+def spend(date, campaign, amount):
+    return {"date": date, "campaign_id": campaign, "spend": amount}
+
+
+def conv(date, campaign, count):
+    return {"date": date, "campaign_id": campaign, "conversions": count}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def feeds(tmp_path):
+    spend_path, conv_path = tmp_path / "spend.jsonl", tmp_path / "conv.jsonl"
+    append(spend_path, [spend("2025-06-04", "CAMP-1", 10.0)])
+    append(conv_path, [conv("2025-06-04", "CAMP-1", 4)])
+    return str(spend_path), str(conv_path)
+
+
+def stored(engine):
+    with engine.connect() as conn:
+        return {
+            (str(row[0]), row[1]): tuple(row[2:])
+            for row in conn.exec_driver_sql(
+                "SELECT date, campaign_id, spend, conversions, cpa FROM daily_stats"
+            )
+        }
+
+
+def test_tail_reads_complete_lines_once(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    append(path, [spend("2025-06-04", "CAMP-1", 1.0)], tail='{"date": "2025-06-0')
+    tail = FeedTail(str(path))
+
+    df, reset = tail.poll()
+    assert df["spend"].tolist() == [1.0] and not reset
+    assert tail.poll()[0].empty
+
+    # The partial line is read once its newline arrives
+    with open(path, "a") as f:
+        f.write('5", "campaign_id": 7, "spend": 2.0}\nnot json\n')
+    df, _ = tail.poll()
+    assert df["campaign_id"].tolist() == ["7"]
+    assert df["date"].tolist() == [pd.Timestamp("2025-06-05")]
+
+    path.write_text(json.dumps(spend("2025-06-06", "CAMP-2", 3.0)) + "\n")
+    df, reset = tail.poll()
+    assert reset and df["spend"].tolist() == [3.0]
+
+
+def test_appended_records_update_only_their_keys(feeds, tmp_path, mocker):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    repository = SqliteRepository(engine)
+    upsert = mocker.spy(repository, "upsert")
+    clock = FakeClock()
+    watcher = FeedWatcher(
+        *feeds,
+        CpaCalculator(),
+        repository,
+        flush_rows=3,
+        flush_seconds=30,
+        clock=clock,
+    )
+
+    assert watcher.poll() == 1
+    assert not watcher.due()
+    clock.now = 30
+    assert watcher.due()
+    assert watcher.flush() == 1
+
+    # A second row for CAMP-1 adds to its totals, as a batch run would sum it
+    append(feeds[0], [spend("2025-06-04", "CAMP-1", 6.0)])
+    append(feeds[0], [spend("2025-06-05", "CAMP-2", 5.0)])
+    append(feeds[1], [conv("2025-06-05", "CAMP-3", 2)])
+    assert watcher.poll() == 3
+    assert watcher.due()
+    assert watcher.flush() == 3
+    assert len(upsert.call_args.args[0]) == 3
+
+    append(feeds[1], [conv("2025-06-05", "CAMP-2", 1)])
+    watcher.poll()
+    clock.now = 60
+    watcher.flush()
+    assert upsert.call_args.args[0]["campaign_id"].tolist() == ["CAMP-2"]
+
+    expected = CpaCalculator().process(JsonDataReader().read(*feeds))
+    assert stored(engine) == {
+        (row.date.strftime("%Y-%m-%d"), row.campaign_id): (
+            row.spend,
+            row.conversions,
+            None if pd.isna(row.cpa) else row.cpa,
+        )
+        for row in expected.itertuples()
+    }
+
+
+def test_failed_flush_keeps_keys_pending(feeds, mocker):
+    repository = mocker.Mock()
+    repository.upsert.side_effect = ConnectionError("database unavailable")
+    watcher = FeedWatcher(*feeds, CpaCalculator(), repository, flush_rows=1)
+    watcher.poll()
+    with pytest.raises(ConnectionError):
+        watcher.flush()
+    assert watcher.pending == 1
+
+
+def test_run_flushes_pending_keys_when_stopped(feeds, tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    watcher = FeedWatcher(
+        *feeds, CpaCalculator(), SqliteRepository(engine), flush_seconds=3600
+    )
+    stop = threading.Event()
+    stop.set()
+    flushed = []
+    watcher.run(stop, flushed.append)
+    assert flushed == [1]
+    assert stored(engine) == {("2025-06-04", "CAMP-1"): (10.0, 4, 2.5)}
+
+
+def test_watch_requires_ndjson(tmp_path):
+    path = tmp_path / "spend.json"
+    path.write_text("[]")
+    with pytest.raises(ValueError, match="NDJSON"):
+        FeedWatcher(str(path), str(path), CpaCalculator(), None)
+
+
+def test_rotating_one_feed_keeps_the_other_sides_values(tmp_path):
+    spend_path, conv_path = tmp_path / "spend.jsonl", tmp_path / "conv.jsonl"
+    append(spend_path, [spend("2025-06-01", "A", 10.0)])
+    append(conv_path, [conv("2025-06-01", "A", 2)])
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    watcher = FeedWatcher(
+        str(spend_path), str(conv_path), CpaCalculator(), SqliteRepository(engine)
+    )
+    watcher.poll()
+    watcher.flush()
+
+    # The rotated spend feed no longer holds A; A's stored spend must survive
+    (tmp_path / "spend.jsonl").replace(tmp_path / "spend.jsonl.1")
+    append(spend_path, [spend("2025-06-02", "B", 3.0)])
+    watcher.poll()
+    watcher.flush()
+    assert stored(engine) == {
+        ("2025-06-01", "A"): (10.0, 2, 5.0),
+        ("2025-06-02", "B"): (3.0, 0, None),
+    }
+
+    append(conv_path, [conv("2025-06-01", "A", 3)])
+    watcher.poll()
+    watcher.flush()
+    assert stored(engine)[("2025-06-01", "A")] == (10.0, 5, 2.0)
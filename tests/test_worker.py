@@ -0,0 +1,173 @@
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import sqlalchemy as sa
+
+import run
+from src.cpa_calculator import RATIOS
+from src.db_repository import Base
+from src.metrics import registry
+
+
+@pytest.fixture
+def args(tmp_path, monkeypatch):
+    spend_path, conv_path = tmp_path / "spend.json", tmp_path / "conv.json"
+    spend_path.write_text(
+        json.dumps([{"date": "2025-06-04", "campaign_id": "CAMP-1", "spend": 10.0}])
+    )
+    conv_path.write_text(
+        json.dumps([{"date": "2025-06-04", "campaign_id": "CAMP-1", "conversions": 4}])
+    )
+    monkeypatch.setenv("DB_URL", f"sqlite:///{tmp_path / 'stats.db'}")
+    monkeypatch.setenv("SPEND_PATH", str(spend_path))
+    monkeypatch.setenv("CONV_PATH", str(conv_path))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "run.py",
+            "--start-date",
+            "2025-06-04",
+            "--end-date",
+            "2025-06-04",
+            "--cache-dir",
+            str(tmp_path / "cache"),
+        ],
+    )
+    return run.parse_arguments()
+
+
+class FixedDatetime(datetime.datetime):
+    today_date = datetime.date(2025, 6, 5)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.combine(cls.today_date, datetime.time(0, 5))
+
+
+def test_worker_reuses_engine_and_schema_across_runs(args, mocker, capsys):
+    mocker.patch.object(run, "datetime", FixedDatetime)
+    worker = run.Worker(args)
+    create_all = mocker.spy(Base.metadata, "create_all")
+    create_engine = mocker.spy(sa, "create_engine")
+
+    worker.run()
+    worker.run()
+    worker.close()
+
+    # The schema is set up by the first run only
+    assert create_all.call_count == 1
+    assert create_engine.call_count == 0
+    assert capsys.readouterr().out.count("Processed 2025-06-04: 1 records") == 1
+
+
+def test_worker_catches_up_missed_days_in_one_run(args, mocker):
+    mocker.patch.object(run, "datetime", FixedDatetime)
+    args.end_date = None
+    worker = run.Worker(args)
+    process = mocker.spy(run, "process")
+
+    worker.run()
+    assert worker.repository.get_watermark() == "2025-06-04"
+
+    # A week of downtime is recovered by a single run over all missed days
+    mocker.patch.object(FixedDatetime, "today_date", datetime.date(2025, 6, 12))
+    with open(os.environ["SPEND_PATH"], "w") as f:
+        json.dump(
+            [
+                {"date": date, "campaign_id": "CAMP-1", "spend": 10.0}
+                for date in ("2025-06-04", "2025-06-11")
+            ],
+            f,
+        )
+    worker.run()
+    worker.close()
+
+    ranges = [(c.args[0].start_date, c.args[0].end_date) for c in process.mock_calls]
+    assert ranges == [("2025-06-04", "2025-06-04"), ("2025-06-05", "2025-06-11")]
+    assert worker.repository.get_watermark() == "2025-06-11"
+
+
+def test_cli_starts_without_heavy_imports():
+    code = "import sys, run; print(sorted({'pandas', 'sqlalchemy'} & set(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+    assert set(run.KPI_NAMES) == set(RATIOS)
+
+
+def test_spooled_run_does_not_need_the_database(args, tmp_path, monkeypatch, mocker):
+    mocker.patch.object(run, "datetime", FixedDatetime)
+    # The database's directory does not exist yet, so every connection fails
+    db_path = tmp_path / "down" / "stats.db"
+    monkeypatch.setenv("DB_URL", f"sqlite:///{db_path}")
+    args.spool_dir = str(tmp_path / "spool")
+    args.spool_drain_seconds = 1
+    args.end_date = None
+    worker = run.Worker(args)
+    worker.replayer.stop()
+
+    worker.run()
+    assert len(worker.replayer.spool.segments()) == 1
+    assert worker.repository.get_watermark() == "2025-06-04"
+
+    # Once the database is back, the replay creates the schema and the rows
+    db_path.parent.mkdir()
+    assert worker.replayer.drain() == 1
+    worker.close()
+    with sa.create_engine(f"sqlite:///{db_path}").connect() as conn:
+        rows = conn.exec_driver_sql("SELECT campaign_id, cpa FROM daily_stats").all()
+    assert rows == [("CAMP-1", 2.5)]
+
+
+def test_watermark_stops_before_days_without_data(args, mocker):
+    # Yesterday's feed has not landed yet when the 06-06 run fires
+    mocker.patch.object(run, "datetime", FixedDatetime)
+    mocker.patch.object(FixedDatetime, "today_date", datetime.date(2025, 6, 6))
+    args.end_date = None
+    worker = run.Worker(args)
+    process = mocker.spy(run, "process")
+
+    worker.run()
+    assert worker.repository.get_watermark() == "2025-06-04"
+
+    # The missing day is planned again on the next run
+    worker.run()
+    worker.close()
+    ranges = [(c.args[0].start_date, c.args[0].end_date) for c in process.mock_calls]
+    assert ranges == [("2025-06-04", "2025-06-05"), ("2025-06-05", "2025-06-05")]
+
+
+def test_worker_starts_before_the_database_is_up(args, tmp_path, monkeypatch, mocker):
+    mocker.patch.object(run, "datetime", FixedDatetime)
+    db_path = tmp_path / "down" / "stats.db"
+    monkeypatch.setenv("DB_URL", f"sqlite:///{db_path}")
+    args.end_date = None
+    worker = run.Worker(args)
+
+    # The scheduled run fails and logs; the process keeps going
+    with pytest.raises(sa.exc.OperationalError):
+        worker.run()
+
+    db_path.parent.mkdir()
+    worker.run()
+    worker.close()
+    with sa.create_engine(f"sqlite:///{db_path}").connect() as conn:
+        rows = conn.exec_driver_sql("SELECT campaign_id, cpa FROM daily_stats").all()
+    assert rows == [("CAMP-1", 2.5)]
+
+
+def test_run_without_dates_is_recorded_as_failed(args, mocker, capsys):
+    args.start_date = None
+    finish_run = mocker.patch.object(registry, "finish_run")
+    with pytest.raises(SystemExit):
+        run.process(args)
+    assert "Error: A run needs both a start date and an end date" in (
+        capsys.readouterr().out
+    )
+    finish_run.assert_called_once_with(mocker.ANY, False)